@@ -1,5 +1,5 @@
 import os
-import json, jsonlines
+import jsonlines
 import pandas as pd
 from collections import defaultdict
 from tqdm import tqdm
@@ -12,12 +12,6 @@ import pickle
 data_path = "/scratch/datasets/aw588/unarXive/"
 
 
-def read_jsonl(file_path):
-    with open(file_path, "r") as f:
-        data = [json.loads(line) for line in f]
-    return data
-
-
 if __name__ == "__main__":
     # Load the data
     years_of_interest = ['02', '07', '12', '17', '22']
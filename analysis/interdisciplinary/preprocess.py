@@ -1,70 +1,128 @@
 import os
-import json
+import sys
 import pandas as pd
+from array import array
 from collections import defaultdict
+from functools import partial
 from tqdm import tqdm
 
-
-data_path = "/scratch/datasets/aw588/unarXive/"
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'dynamics_collab'))
+from corpus import get_full_year, get_jsonl_fps
+from citation_graph import count_discipline_pairs, load_citation_graph
+from manifest import Manifest
+from scanner import Accumulator, scan
 
 
-def read_jsonl(file_path):
-    with open(file_path, "r") as f:
-        data = [json.loads(line) for line in f]
-    return data
-
-
-def preprocess_data(year_range):
-    data = []
-    # Add tqdm to show progress when iterating over year
-
-    # For each year, count the number of cited paper where there's no discipline info
-    no_discipline_info = []
-
-    for year in tqdm(year_range):
-        folder_path = f'{data_path}/{year}'
-        discipline_info_no_field = 0
-        discipline_info_empty = 0
-        total_papers = 0
-        for file in os.listdir(folder_path):
-            if file.endswith(".jsonl"):
-                file_path = os.path.join(folder_path, file)
-                print(f"Reading {file_path}")
-                papers = read_jsonl(file_path)
-                total_papers += len(papers)
-                for paper in papers:
-                    if "categories" not in paper["metadata"]:
-                        paper_subjects = []
-                    else:
-                        paper_subjects = paper["metadata"]["categories"].split(" ")
-                
-                    for cited_paper_id, cited_paper_info in paper["bib_entries"].items():
-                        # import pdb; pdb.set_trace()
-                        # TODO: count
-                        if 'discipline' not in cited_paper_info:
-                            discipline_info_no_field += 1
-                            continue
-                        if cited_paper_info['discipline'] == '':
-                            discipline_info_empty += 1
-                            continue
-
-                        data.append({
-                            "year": str(year), # TODO: str vs. int?
-                            "paper_id": paper["paper_id"],
-                            "paper_discipline": paper["discipline"],
-                            "paper_subjects": paper_subjects,
-                            "cited_paper_id": cited_paper_id,
-                            "cited_paper_discipline": cited_paper_info["discipline"]
-                        })
-        no_discipline_info.append({
-            "year": year,
-            "total": total_papers,
-            "no_discipline_info": discipline_info_no_field,
-            "no_discipline_info_ratio": round(discipline_info_no_field / total_papers * 100, 2),
-            "empty_discipline_info": discipline_info_empty,
-            "empty_discipline_info_ratio": round(discipline_info_empty / total_papers * 100, 2)
-        })
-    return pd.DataFrame(data), pd.DataFrame(no_discipline_info)
+data_path = "/scratch/datasets/aw588/unarXive/"
+# Years whose files did not change since the last run are skipped (see dynamics_collab/manifest.py)
+manifest_path = "manifest.json"
+
+
+class InterdisciplinaryAccumulator(Accumulator):
+    """
+    Citing/cited discipline of each reference and per year counts of
+    references without discipline info, see preprocess_data
+
+    References are kept in compact per year columns (the citing paper's
+    index, cited paper ID and discipline as shared strings) instead of one
+    dict per reference, and finalize builds the DataFrame of one year at a
+    time
+    """
+    fields = ["paper_id", "discipline", "metadata", "bib_entries"]
+    columns = ["year", "paper_id", "paper_discipline", "paper_subjects", "cited_paper_id", "cited_paper_discipline"]
+
+    def __init__(self, year_range):
+        self.year_range = year_range
+        # Per year: (paper_id, paper_discipline, paper_subjects) of the citing papers
+        self.papers = defaultdict(list)
+        # Per year and reference: index into papers, cited paper ID and discipline
+        self.ref_papers = defaultdict(partial(array, "i"))
+        self.cited_paper_ids = defaultdict(list)
+        self.cited_paper_disciplines = defaultdict(list)
+        # For each year, count the number of cited paper where there's no discipline info
+        self.discipline_info_no_field = defaultdict(int)
+        self.discipline_info_empty = defaultdict(int)
+        self.total_papers = defaultdict(int)
+
+    def update(self, paper, year):
+        if year not in self.year_range:
+            return
+        self.total_papers[year] += 1
+        if "categories" not in paper["metadata"]:
+            paper_subjects = []
+        else:
+            paper_subjects = paper["metadata"]["categories"].split(" ")
+
+        paper_index = len(self.papers[year])
+        num_refs = 0
+        for cited_paper_id, cited_paper_info in paper["bib_entries"].items():
+            if 'discipline' not in cited_paper_info:
+                self.discipline_info_no_field[year] += 1
+                continue
+            if cited_paper_info['discipline'] == '':
+                self.discipline_info_empty[year] += 1
+                continue
+
+            # Bib entry keys (b0, b1, ...) and disciplines repeat, share the strings
+            self.cited_paper_ids[year].append(sys.intern(cited_paper_id))
+            self.cited_paper_disciplines[year].append(sys.intern(cited_paper_info["discipline"]))
+            num_refs += 1
+        if num_refs > 0:
+            self.papers[year].append((paper["paper_id"], paper["discipline"], paper_subjects))
+            self.ref_papers[year].extend([paper_index] * num_refs)
+
+    def merge(self, other):
+        for year in other.total_papers:
+            offset = len(self.papers[year])
+            self.papers[year].extend(other.papers[year])
+            self.ref_papers[year].extend(index + offset for index in other.ref_papers[year])
+            self.cited_paper_ids[year].extend(other.cited_paper_ids[year])
+            self.cited_paper_disciplines[year].extend(other.cited_paper_disciplines[year])
+            self.discipline_info_no_field[year] += other.discipline_info_no_field[year]
+            self.discipline_info_empty[year] += other.discipline_info_empty[year]
+            self.total_papers[year] += other.total_papers[year]
+
+    def get_year_df(self, year):
+        # One row per reference with discipline info (columns as in self.columns)
+        papers = self.papers[year]
+        ref_papers = self.ref_papers[year]
+        return pd.DataFrame({
+            "year": [str(year)] * len(ref_papers), # TODO: str vs. int?
+            "paper_id": [papers[i][0] for i in ref_papers],
+            "paper_discipline": [papers[i][1] for i in ref_papers],
+            "paper_subjects": [papers[i][2] for i in ref_papers],
+            "cited_paper_id": self.cited_paper_ids[year],
+            "cited_paper_discipline": self.cited_paper_disciplines[year]
+        }, columns=self.columns)
+
+    def iter_year_dfs(self):
+        # (year, DataFrame of the year) for each year, built when needed
+        for year in self.year_range:
+            yield year, self.get_year_df(year)
+
+    def finalize(self):
+        no_discipline_info = []
+        for year in self.year_range:
+            total_papers = self.total_papers[year]
+            discipline_info_no_field = self.discipline_info_no_field[year]
+            discipline_info_empty = self.discipline_info_empty[year]
+            # Years without papers (e.g. not in the data) get ratios of 0
+            denominator = max(total_papers, 1)
+            no_discipline_info.append({
+                "year": year,
+                "total": total_papers,
+                "no_discipline_info": discipline_info_no_field,
+                "no_discipline_info_ratio": round(discipline_info_no_field / denominator * 100, 2),
+                "empty_discipline_info": discipline_info_empty,
+                "empty_discipline_info_ratio": round(discipline_info_empty / denominator * 100, 2)
+            })
+        return self.iter_year_dfs(), pd.DataFrame(no_discipline_info)
+
+
+def preprocess_data(year_range, workers=1):
+    year_dfs, no_discipline_df = scan(data_path, [InterdisciplinaryAccumulator(year_range)],
+                                      years=year_range, workers=workers)[0]
+    return pd.concat([df for _, df in year_dfs], ignore_index=True), no_discipline_df
 
 
 def calculate_interdisciplinarity(df):
@@ -93,6 +151,18 @@ def count_interdisciplinary_combinations(data_df, year):
     return interdisciplinary_combinations
 
 
+def count_interdisciplinary_combinations_from_graph(graph_dir, year):
+    # Same as count_interdisciplinary_combinations, but from the citation graph
+    # built by dynamics_collab/citation_graph.py instead of the full data
+    graph = load_citation_graph(graph_dir)
+    pair_counts = count_discipline_pairs(graph, years=[get_full_year(year)])
+    interdisciplinary_combinations = pd.DataFrame(
+        [(src, dst, count) for (src, dst), count in sorted(pair_counts.items()) if src != dst],
+        columns=['paper_discipline', 'cited_paper_discipline', 'count']
+    )
+    return interdisciplinary_combinations
+
+
 if __name__ == "__main__":
     # Load the data
     # full_year_range = ['00']
@@ -101,8 +171,16 @@ if __name__ == "__main__":
                   '11', '12', '13', '14', '15', '16', '17', '18', '19', '20', 
                   '21', '22']
 
+    manifest = Manifest(manifest_path, data_path)
+
     for year in tqdm(full_year_range):
         print(f"Year: {year}")
+        year_jsons = get_jsonl_fps(data_path, years=[year])
+        output_files = [f"general/data_{year}_df.csv", f"general/no_discipline_info_{year}_df.csv",
+                        f"interdisciplinary_combinations/interdisciplinary_combinations_{year}.csv"]
+        if not manifest.is_stale(f"interdisciplinary/{year}", year_jsons, output_files):
+            print(f"{year} is up to date, skipping")
+            continue
 
         year_range = [year]
         df, no_discipline_df = preprocess_data(year_range)
@@ -122,6 +200,8 @@ if __name__ == "__main__":
         print(interdisciplinary_combinations.head())
         # Save the data
         interdisciplinary_combinations.to_csv(f"interdisciplinary_combinations/interdisciplinary_combinations_{year}.csv", index=False)
+        manifest.record(f"interdisciplinary/{year}", year_jsons, output_files)
+        manifest.save()
 
         print("==================================================================")
 
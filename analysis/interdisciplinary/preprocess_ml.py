@@ -1,5 +1,4 @@
 import os
-import json
 import pandas as pd
 from collections import defaultdict
 from tqdm import tqdm
@@ -9,12 +8,6 @@ import ast
 data_path = "/scratch/datasets/aw588/unarXive/"
 
 
-def read_jsonl(file_path):
-    with open(file_path, "r") as f:
-        data = [json.loads(line) for line in f]
-    return data
-
-
 desired_categories = ["cs.AI", "cs.CL", "cs.CV", "cs.LG", "stat.ML"]
 
 # Function to check if there's an intersection between desired_categories and paper_subjects
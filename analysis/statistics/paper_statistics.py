@@ -0,0 +1,132 @@
+import os
+import sys
+import pandas as pd
+from collections import defaultdict
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'dynamics_collab'))
+from corpus import get_full_year
+from metadata_store import load_metadata
+from scanner import Accumulator, scan
+
+
+year_range = ['93', '97', '98', '00', '01', '02', '03', '04', '05', '06', '07', '08', '09', '10', '11', '12', '13', '14', '15', '16', '17', '18', '19', '20', '21', '22']
+
+
+############################################
+# General
+############################################
+
+class PaperCountAccumulator(Accumulator):
+    """
+    Total number of papers and number of papers by discipline
+    """
+    fields = ["discipline"]
+
+    def __init__(self):
+        self.total_papers = 0
+        self.papers_by_discipline = defaultdict(int)
+
+    def update(self, paper, year):
+        paper_discipline = paper["discipline"]
+        self.total_papers += 1
+        self.papers_by_discipline[paper_discipline] += 1
+
+    def merge(self, other):
+        self.total_papers += other.total_papers
+        for discipline, count in other.papers_by_discipline.items():
+            self.papers_by_discipline[discipline] += count
+
+    def finalize(self):
+        return self.total_papers, dict(self.papers_by_discipline)
+
+
+def count_papers(data_path, workers=1):
+    return scan(data_path, [PaperCountAccumulator()], years=year_range, workers=workers, report=False)[0]
+
+
+def count_papers_from_store(store_dir):
+    """
+    Same as count_papers, but reads the disciplines from the metadata store
+    (see dynamics_collab/metadata_store.py) instead of the full text
+    """
+    years = [get_full_year(year) for year in year_range]
+    df = load_metadata(store_dir, years=years, columns=["discipline"])
+    # Papers without a discipline are counted under None, as in count_papers
+    papers_by_discipline = {
+        (None if pd.isna(discipline) else discipline): count
+        for discipline, count in df["discipline"].value_counts(dropna=False).items()
+    }
+
+    return len(df), papers_by_discipline
+
+############################################
+# CS-specific
+############################################
+
+class CSSubjectsAccumulator(Accumulator):
+    """
+    Number of CS papers in each cs.* category
+    """
+    fields = ["discipline", "metadata"]
+
+    def __init__(self):
+        self.cs_categories = defaultdict(int)
+
+    def update(self, paper, year):
+        # Sanity check
+        if paper["discipline"] != "Computer Science":
+            return
+
+        categories = paper["metadata"].get("categories", "").split(" ")
+
+        for category in categories:
+            if category.startswith("cs."):
+                self.cs_categories[category] += 1
+
+    def merge(self, other):
+        for category, count in other.cs_categories.items():
+            self.cs_categories[category] += count
+
+    def finalize(self):
+        return dict(self.cs_categories)
+
+
+# Check the number of subjects for CS
+def count_cs_subjects(data_path, workers=1):
+    """
+    Get all the subjects for CS papers
+    """
+    return scan(data_path, [CSSubjectsAccumulator()], years=year_range, workers=workers, report=False)[0]
+
+
+if __name__ == "__main__":
+    data_path = "../data/"
+    output_path = "../analysis/statistics"
+
+    ##############################
+    # General
+    ##############################
+
+    # total_papers, papers_by_discipline = count_papers(data_path)
+    # total_papers, papers_by_discipline = count_papers_from_store("../data_metadata/")
+
+    # print(f"Total citing papers: {total_papers}")
+    # print("Citing papers by discipline:")
+    # for discipline, count in papers_by_discipline.items():
+    #     print(f"{discipline}: {count}")
+
+    ##############################
+    # CS-specific
+    ##############################
+
+    # Get all the categories for CS papers, in the format: {"cs.CL": 100, "cs.CV": 200, ...}
+    # Result: Total number of CS subjects: 39
+
+    # cs_categories = count_cs_subjects(data_path)
+    # # Dump the results
+    # with open(os.path.join(output_path, "cs_categories.json"), "w") as f:
+    #     json.dump(cs_categories, f, indent=4)
+    
+    # with open(os.path.join(output_path, "cs_categories.json"), "r") as f:
+    #     cs_categories = json.load(f)
+    # print(f"Total number of CS subjects: {len(cs_categories)}")
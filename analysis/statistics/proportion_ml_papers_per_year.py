@@ -1,42 +1,80 @@
 import os
-import json
+import sys
 import numpy as np
 import pandas as pd
 from collections import defaultdict
 from tqdm import tqdm
 import matplotlib.pyplot as plt
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'dynamics_collab'))
+from corpus import get_full_year
+from metadata_store import load_metadata
+from scanner import Accumulator, scan
+
 
 data_path = "/scratch/datasets/aw588/unarXive/"
 desired_categories = ["cs.AI", "cs.CL", "cs.CV", "cs.LG", "stat.ML"]
 
-def read_jsonl(file_path):
-    with open(file_path, "r") as f:
-        data = [json.loads(line) for line in f]
-    return data
-
 
-def preprocess_data(year_range):
+class MLProportionAccumulator(Accumulator):
+    """
+    Per year counts of papers in desired_categories, see preprocess_data
+    """
+    fields = ["metadata"]
+
+    def __init__(self, year_range):
+        self.year_range = year_range
+        self.total_number_papers = defaultdict(int)
+        self.desired_papers_count = defaultdict(int)
+        self.number_papers_without_categories = defaultdict(int)
+
+    def update(self, paper, year):
+        if year not in self.year_range:
+            return
+        self.total_number_papers[year] += 1
+        if "categories" not in paper["metadata"]:
+            self.number_papers_without_categories[year] += 1
+            return
+        if any(category in paper["metadata"]["categories"].split(" ") for category in desired_categories):
+            self.desired_papers_count[year] += 1
+
+    def merge(self, other):
+        for year in other.total_number_papers:
+            self.total_number_papers[year] += other.total_number_papers[year]
+            self.desired_papers_count[year] += other.desired_papers_count[year]
+            self.number_papers_without_categories[year] += other.number_papers_without_categories[year]
+
+    def finalize(self):
+        data = []
+        for year in self.year_range:
+            total_number_papers = self.total_number_papers[year]
+            desired_papers_count = self.desired_papers_count[year]
+            number_papers_without_categories = self.number_papers_without_categories[year]
+            proportion = desired_papers_count / total_number_papers if total_number_papers > 0 else 0
+            data.append((year, proportion, desired_papers_count, number_papers_without_categories, total_number_papers))
+        return pd.DataFrame(data, columns=["Year", "Proportion", "MLPapersCount", "NbPapersNoCategories", "TotalPapersCount"])
+
+
+def preprocess_data(year_range, workers=1):
+    return scan(data_path, [MLProportionAccumulator(year_range)], years=year_range, workers=workers)[0]
+
+
+def preprocess_data_from_store(year_range, store_dir):
+    """
+    Same as preprocess_data, but reads the categories from the metadata
+    store (see dynamics_collab/metadata_store.py) instead of the full text
+    """
+    df = load_metadata(store_dir, years=[get_full_year(year) for year in year_range],
+                       columns=["categories"])
     data = []
-    # Add tqdm to show progress when iterating over year
     for year in tqdm(year_range):
-        folder_path = f'{data_path}/{year}'
-        total_number_papers = 0
-        desired_papers_count = 0
-        number_papers_without_categories = 0
-        for file in os.listdir(folder_path):
-            if file.endswith(".jsonl"):
-                file_path = os.path.join(folder_path, file)
-                print(f"Reading {file_path}")
-                papers = read_jsonl(file_path)
-                for paper in papers:
-                    total_number_papers += 1
-                    if "categories" not in paper["metadata"]:
-                        number_papers_without_categories += 1
-                        continue
-                    if any(category in paper["metadata"]["categories"].split(" ") for category in desired_categories):
-                        desired_papers_count += 1
-        data.append((year, desired_papers_count / total_number_papers, desired_papers_count, number_papers_without_categories, total_number_papers))
+        year_df = df[df["year"] == get_full_year(year)]
+        total_number_papers = len(year_df)
+        number_papers_without_categories = int(year_df["categories"].isna().sum())
+        desired_papers_count = int(year_df["categories"].dropna().apply(
+            lambda categories: any(category in categories for category in desired_categories)).sum())
+        proportion = desired_papers_count / total_number_papers if total_number_papers > 0 else 0
+        data.append((year, proportion, desired_papers_count, number_papers_without_categories, total_number_papers))
     return pd.DataFrame(data, columns=["Year", "Proportion", "MLPapersCount", "NbPapersNoCategories", "TotalPapersCount"])
 
 
@@ -53,6 +91,7 @@ if __name__ == "__main__":
     # year_range = ["22", "93"]
 
     # df = preprocess_data(year_range)
+    # df = preprocess_data_from_store(year_range, "/scratch/datasets/aw588/unarXive_metadata/")
     # # df.to_csv(f"proportion_ml_paper_per_year_{year}_df.csv", index=False)
     # df.to_csv(f"proportion_ml_paper_per_year_df.csv", index=False)
 
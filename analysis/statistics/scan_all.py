@@ -0,0 +1,112 @@
+"""
+Run all corpus analyses in a single pass over the data (see
+dynamics_collab/scanner.py) instead of one pass per script:
+    - dataset stats matrices and per-paper stats table (dynamics_collab/calc_stats.py)
+    - proportion of ML papers per year (proportion_ml_papers_per_year.py)
+    - paper counts and CS subjects (paper_statistics.py)
+    - reference/cited document counts (stats_table.py)
+    - interdisciplinary citations (analysis/interdisciplinary/preprocess.py)
+    - section names (research_trends/save_section_names.py)
+
+Usage:
+    python scan_all.py /path/to/unarXive /path/to/output [--workers 8]
+"""
+import os
+import sys
+import json
+import pickle
+import argparse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(HERE, '..', '..', 'dynamics_collab'))
+sys.path.append(os.path.join(HERE, '..', 'interdisciplinary'))
+sys.path.append(os.path.join(HERE, '..', '..', 'research_trends'))
+from calc_stats import (PaperStatsAccumulator, PaperTableAccumulator, QuantileSketchAccumulator,
+                        SharedPaperStatsAccumulator, get_stats_matrix_indices, save_to_cache)
+from corpus import YEARS, get_jsonl_fps
+from scanner import scan
+from proportion_ml_papers_per_year import MLProportionAccumulator
+from paper_statistics import PaperCountAccumulator, CSSubjectsAccumulator
+from stats_table import ReferenceStatsAccumulator
+from preprocess import InterdisciplinaryAccumulator, count_interdisciplinary_combinations
+from save_section_names import SectionNamesAccumulator
+
+
+STATS_TABLE_KEYS = ["total_nb_paper", "count_doc", "count_doc_subject", "count_doc_cited", "count_doc_cited_subject",
+                    "count_nb_references", "count_nb_references_subject", "doc_cited", "doc_cited_subject"]
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Run all corpus analyses in a single pass")
+    parser.add_argument('data_path', help="/path/to/unarXive")
+    parser.add_argument('output_path', help="Directory to write the results to")
+    parser.add_argument('--years', nargs='+', default=YEARS,
+                        help="Year folders to scan (default: all)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Number of worker processes. stats_table.py is order dependent and only run with 1 worker")
+    parser.add_argument('--sketches', action='store_true',
+                        help="Also calculate quantile sketches of the per-paper stats")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = get_args()
+    years = args.years
+    # stats matrices, per-paper table (and sketches) share the per-paper stats
+    paper_stats_accumulators = [PaperStatsAccumulator(), PaperTableAccumulator()]
+    if args.sketches:
+        paper_stats_accumulators.append(QuantileSketchAccumulator())
+    accumulators = {
+        "paper_stats": SharedPaperStatsAccumulator(paper_stats_accumulators),
+        "ml_proportion": MLProportionAccumulator(years),
+        "paper_counts": PaperCountAccumulator(),
+        "cs_subjects": CSSubjectsAccumulator(),
+        "interdisciplinary": InterdisciplinaryAccumulator(years),
+        "section_names": SectionNamesAccumulator(),
+    }
+    if args.workers == 1:
+        accumulators["stats_table"] = ReferenceStatsAccumulator()
+    else:
+        print("Skipping stats_table.py (not mergeable) with more than 1 worker")
+    results = dict(zip(
+        accumulators.keys(),
+        scan(args.data_path, list(accumulators.values()), years=years, workers=args.workers)
+    ))
+
+    out = args.output_path
+    for sub_dir in ["general", "interdisciplinary_combinations"]:
+        os.makedirs(os.path.join(out, sub_dir), exist_ok=True)
+
+    # calc_stats persists to its default location, keyed by the scanned files
+    stats_matrices, paper_table = results["paper_stats"][:2]
+    sketch = results["paper_stats"][2] if args.sketches else None
+    save_to_cache(stats_matrices, get_stats_matrix_indices(), args.data_path,
+                  get_jsonl_fps(args.data_path, years), paper_table=paper_table, sketch=sketch)
+
+    results["ml_proportion"].to_csv(os.path.join(out, "proportion_ml_paper_per_year_df.csv"), index=False)
+
+    total_papers, papers_by_discipline = results["paper_counts"]
+    with open(os.path.join(out, "paper_counts.json"), "w") as f:
+        json.dump({"total_papers": total_papers, "papers_by_discipline": papers_by_discipline}, f, indent=4)
+    with open(os.path.join(out, "cs_categories.json"), "w") as f:
+        json.dump(results["cs_subjects"], f, indent=4)
+
+    if "stats_table" in results:
+        for key, value in zip(STATS_TABLE_KEYS, results["stats_table"]):
+            with open(os.path.join(out, f"stats_{key}.pickle"), "wb") as handle:
+                pickle.dump(value, handle, protocol=pickle.HIGHEST_PROTOCOL)
+
+    # One year's references at a time (see InterdisciplinaryAccumulator)
+    year_dfs, no_discipline_df = results["interdisciplinary"]
+    for year, year_df in year_dfs:
+        year_df.to_csv(os.path.join(out, "general", f"data_{year}_df.csv"), index=False)
+        no_discipline_df[no_discipline_df["year"] == year].to_csv(
+            os.path.join(out, "general", f"no_discipline_info_{year}_df.csv"), index=False)
+        if len(year_df) > 0:
+            interdisciplinary_combinations = count_interdisciplinary_combinations(year_df, year)
+            interdisciplinary_combinations.to_csv(
+                os.path.join(out, "interdisciplinary_combinations", f"interdisciplinary_combinations_{year}.csv"),
+                index=False)
+
+    with open(os.path.join(out, "paper_to_section_metadata.pkl"), "wb") as f:
+        pickle.dump(results["section_names"], f)
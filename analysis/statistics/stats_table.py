@@ -1,81 +1,76 @@
 import os
-import json
+import sys
 import pandas as pd
 from collections import defaultdict
-from tqdm import tqdm
 import pickle
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'dynamics_collab'))
+from scanner import Accumulator, scan
+
 
 data_path = "/scratch/datasets/aw588/unarXive/"
 
 
-def read_jsonl(file_path):
-    with open(file_path, "r") as f:
-        data = [json.loads(line) for line in f]
-    return data
+class ReferenceStatsAccumulator(Accumulator):
+    """
+    Paper, reference and cited document counts by discipline and subject,
+    see preprocess_data
+
+    Not mergeable: count_nb_references_subject only counts references whose
+    cited_paper_id is seen for the first time in the paper's discipline,
+    which depends on the order of the papers
+    """
+    fields = ["discipline", "metadata", "bib_entries"]
+
+    def __init__(self):
+        self.total_nb_paper = 0
+        self.count_doc = defaultdict(int) # 
+        self.count_doc_subject = defaultdict(int) #
+
+        self.count_doc_cited = defaultdict(int) #
+        self.doc_cited = defaultdict(set)
+        self.count_doc_cited_subject = defaultdict(int) #
+        self.doc_cited_subject = defaultdict(set)
+
+        self.count_nb_references = defaultdict(int) #
+        self.count_nb_references_subject = defaultdict(int) #
+
+    def update(self, paper, year):
+        self.total_nb_paper += 1
+        discipline = paper["discipline"]
+        self.count_doc[discipline] += 1
+
+        if "categories" not in paper["metadata"]:
+            paper_subjects = []
+        else:
+            paper_subjects = paper["metadata"]["categories"].split(" ")
+
+        for subject in paper_subjects:
+            self.count_doc_subject[subject] += 1
+
+        for cited_paper_id, cited_paper_info in paper["bib_entries"].items():
+            self.count_nb_references[discipline] += 1
+            if cited_paper_id in self.doc_cited[discipline]:
+                continue
+            else:
+                self.doc_cited[discipline].add(cited_paper_id)
+
+            self.count_doc_cited[discipline] += 1
+            for subject in paper_subjects:
+                self.count_nb_references_subject[subject] += 1
+                if cited_paper_id in self.doc_cited_subject[subject]:
+                    continue
+                else:
+                    self.count_doc_cited_subject[subject] += 1
+                    self.doc_cited_subject[subject].add(cited_paper_id)
+
+    def finalize(self):
+        return self.total_nb_paper, self.count_doc, self.count_doc_subject, self.count_doc_cited, self.count_doc_cited_subject, \
+            self.count_nb_references, self.count_nb_references_subject, self.doc_cited, self.doc_cited_subject
 
 
 def preprocess_data(year_range):
-    data = []
-    # Add tqdm to show progress when iterating over year
-
-    # For each year, count the number of cited paper where there's no discipline info
-    no_discipline_info = []
-
-    total_nb_paper = 0
-    count_doc = defaultdict(int) # 
-    count_doc_subject = defaultdict(int) #
-
-    count_doc_cited = defaultdict(int) #
-    doc_cited = defaultdict(set)
-    count_doc_cited_subject = defaultdict(int) #
-    doc_cited_subject = defaultdict(set)
-
-    count_nb_references = defaultdict(int) #
-    count_nb_references_subject = defaultdict(int) #
-
-    for year in tqdm(year_range):
-        folder_path = f'{data_path}/{year}'
-        discipline_info_no_field = 0
-        discipline_info_empty = 0
-        total_papers = 0
-        for file in os.listdir(folder_path):
-            if file.endswith(".jsonl"):
-                file_path = os.path.join(folder_path, file)
-                print(f"Reading {file_path}")
-                papers = read_jsonl(file_path)
-                total_papers += len(papers)
-                for paper in papers:
-                    total_nb_paper += 1
-                    discipline = paper["discipline"]
-                    count_doc[discipline] += 1
-
-                    if "categories" not in paper["metadata"]:
-                        paper_subjects = []
-                    else:
-                        paper_subjects = paper["metadata"]["categories"].split(" ")
-
-                    for subject in paper_subjects:
-                        count_doc_subject[subject] += 1
-                
-                    for cited_paper_id, cited_paper_info in paper["bib_entries"].items():
-                        count_nb_references[discipline] += 1
-                        if cited_paper_id in doc_cited[discipline]:
-                            continue
-                        else:
-                            doc_cited[discipline].add(cited_paper_id)
-
-                        count_doc_cited[discipline] += 1
-                        for subject in paper_subjects:
-                            count_nb_references_subject[subject] += 1
-                            if cited_paper_id in doc_cited_subject[subject]:
-                                continue
-                            else:
-                                count_doc_cited_subject[subject] += 1
-                                doc_cited_subject[subject].add(cited_paper_id)
-    
-    return total_nb_paper, count_doc, count_doc_subject, count_doc_cited, count_doc_cited_subject, count_nb_references, count_nb_references_subject, \
-        doc_cited, doc_cited_subject
+    return scan(data_path, [ReferenceStatsAccumulator()], years=year_range)[0]
 
 
 
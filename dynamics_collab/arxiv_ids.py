@@ -0,0 +1,207 @@
+""" Interning table mapping arXiv IDs to dense integer codes and back.
+
+    Old style (hep-th/9901001) and new style (2203.01234) IDs get codes
+    0, 1, 2, ... in the order they are first added, so codes stay stable
+    when the table is extended. Structures keyed by paper ID (sets of
+    citing papers, per-paper metadata, ...) can then hold int32 codes
+    instead of Python strings.
+
+    The table is stored as three .npy files in a directory
+        ids.npy           fixed width byte strings, indexed by code
+        sorted_ids.npy    ids.npy in sorted order
+        sorted_codes.npy  codes of sorted_ids.npy
+    which are memory-mapped when loaded. Lookups of arrays of IDs are a
+    single np.searchsorted over sorted_ids.
+
+    Usage:
+        table = ArxivIds()
+        codes = table.add(['hep-th/9901001', '2203.01234'])
+        table.save(table_dir)
+
+        table = ArxivIds.load(table_dir)
+        codes = table.encode(['2203.01234', 'unknown'])  # [1, -1]
+        years, months = table.year_month(codes)  # [2022, -1], [3, -1]
+"""
+
+import os
+import numpy as np
+
+
+CODE_DTYPE = np.int32
+TABLE_FILES = ['ids', 'sorted_ids', 'sorted_codes']
+
+
+def to_bytes_array(ids):
+    """ Array of fixed width byte strings from an iterable of str/bytes.
+    """
+
+    if isinstance(ids, np.ndarray) and ids.dtype.kind == 'S':
+        return ids
+    return np.array(
+        [i.encode('ascii') if isinstance(i, str) else i for i in ids],
+        dtype=np.bytes_
+    )
+
+
+def decode_year_month(ids):
+    """ Vectorized get_year_month (see corpus.py) for an array of IDs.
+
+        Returns two int16 arrays (years and months), -1 for IDs without
+        the four year and month digits (malformed or too short IDs).
+    """
+
+    ids = to_bytes_array(ids)
+    if len(ids) == 0:
+        return np.zeros(0, np.int16), np.zeros(0, np.int16)
+    chars = ids.view(np.uint8).reshape(len(ids), ids.itemsize)
+    is_slash = chars == ord('/')
+    # digits start after the archive prefix of old style IDs
+    start = np.where(is_slash.any(axis=1), is_slash.argmax(axis=1) + 1, 0)
+    rows = np.arange(len(ids))
+    valid = start + 4 <= ids.itemsize
+    digits = []
+    for k in range(4):
+        cols = np.minimum(start + k, ids.itemsize - 1)
+        digit = chars[rows, cols].astype(np.int16) - ord('0')
+        valid &= (digit >= 0) & (digit <= 9)
+        digits.append(digit)
+    years = np.where(digits[0] == 9, 1900, 2000) + digits[0] * 10 + digits[1]
+    months = digits[2] * 10 + digits[3]
+    years = np.where(valid, years, -1)
+    months = np.where(valid, months, -1)
+    return years.astype(np.int16), months.astype(np.int16)
+
+
+class ArxivIds:
+    """ Mapping between arXiv IDs and integer codes.
+    """
+
+    def __init__(self, ids=None, sorted_ids=None, sorted_codes=None):
+        if ids is None:
+            ids = np.zeros(0, dtype='S1')
+        self.set_ids(ids, sorted_ids, sorted_codes)
+        # IDs added since the arrays were last updated
+        self.new_codes = {}
+
+    def set_ids(self, ids, sorted_ids=None, sorted_codes=None):
+        self.ids = ids
+        if sorted_ids is None:
+            sorted_codes = np.argsort(ids, kind='stable').astype(CODE_DTYPE)
+            sorted_ids = ids[sorted_codes]
+        self.sorted_ids = sorted_ids
+        self.sorted_codes = sorted_codes
+
+    def __len__(self):
+        return len(self.ids) + len(self.new_codes)
+
+    def _commit(self):
+        """ Merge IDs added through get_code into the arrays.
+        """
+
+        if len(self.new_codes) == 0:
+            return
+        new_ids = to_bytes_array(list(self.new_codes.keys()))
+        self.new_codes = {}
+        self.set_ids(np.concatenate([self.ids, new_ids]))
+
+    def _get_new_code(self, arxiv_id):
+        """ Code of an ID that is not in the arrays, adding it to the dict
+            of new IDs if needed.
+        """
+
+        code = self.new_codes.get(arxiv_id)
+        if code is None:
+            code = len(self)
+            self.new_codes[arxiv_id] = code
+        return code
+
+    def get_code(self, arxiv_id):
+        """ Code of a single ID, adding it to the table if needed.
+
+            New IDs are kept in a dict until the next vectorized operation.
+            The dict is checked first, and only IDs not in it are searched
+            in the arrays (a binary search, skipped while the arrays are
+            empty, e.g. when building a table from scratch).
+        """
+
+        code = self.new_codes.get(arxiv_id)
+        if code is not None:
+            return code
+        if len(self.ids) > 0:
+            code = int(self.encode([arxiv_id], commit=False)[0])
+            if code != -1:
+                return code
+        return self._get_new_code(arxiv_id)
+
+    def add(self, ids):
+        """ Codes of an iterable of IDs, adding unknown ones to the table.
+
+            The IDs are searched in the arrays at once, only the ones not
+            found there go through the dict of new IDs.
+        """
+
+        ids = list(ids)
+        codes = self.encode(ids, commit=False)
+        for i in np.flatnonzero(codes == -1):
+            codes[i] = self._get_new_code(ids[i])
+        return codes
+
+    def encode(self, ids, commit=True):
+        """ Codes of an iterable of IDs (-1 for IDs not in the table).
+        """
+
+        if commit:
+            self._commit()
+        ids = to_bytes_array(ids)
+        if len(self.sorted_ids) == 0 or len(ids) == 0:
+            return np.full(len(ids), -1, dtype=CODE_DTYPE)
+        pos = np.searchsorted(self.sorted_ids, ids)
+        pos = np.minimum(pos, len(self.sorted_ids) - 1)
+        found = self.sorted_ids[pos] == ids
+        return np.where(found, self.sorted_codes[pos], -1).astype(CODE_DTYPE)
+
+    def decode(self, codes):
+        """ IDs (as str) of an iterable of codes.
+        """
+
+        self._commit()
+        codes = np.asarray(codes, dtype=np.int64)
+        return np.char.decode(self.ids[codes], 'ascii')
+
+    def year_month(self, codes):
+        """ Years and months of submission of an iterable of codes (-1 for
+            code -1).
+        """
+
+        self._commit()
+        codes = np.asarray(codes, dtype=np.int64)
+        valid = codes >= 0
+        years = np.full(len(codes), -1, dtype=np.int16)
+        months = np.full(len(codes), -1, dtype=np.int16)
+        years[valid], months[valid] = decode_year_month(self.ids[codes[valid]])
+        return years, months
+
+    def save(self, table_dir):
+        self._commit()
+        os.makedirs(table_dir, exist_ok=True)
+        for name in TABLE_FILES:
+            np.save(
+                os.path.join(table_dir, '{}.npy'.format(name)),
+                getattr(self, name)
+            )
+
+    @classmethod
+    def load(cls, table_dir, mmap=True):
+        """ Load a table saved with save. With mmap=True, the arrays are
+            memory-mapped rather than read.
+        """
+
+        mmap_mode = 'r' if mmap else None
+        arrays = {
+            name: np.load(
+                os.path.join(table_dir, '{}.npy'.format(name)),
+                mmap_mode=mmap_mode
+            )
+            for name in TABLE_FILES
+        }
+        return cls(**arrays)
@@ -5,6 +5,8 @@
 """
 
 from datetime import date
+from functools import lru_cache
+import numpy as np
 
 GROUPS = {
     'grp_physics': {
@@ -2180,4 +2182,171 @@ Equivalences: category alias: canonical category
 This model is based on the notion that only two categories may be
 equivalent--not more. There would have to be some significant changes
 to the (classic) code to support three-way equivalences.
-"""
\ No newline at end of file
+"""
+
+# Flat lookup tables
+#
+# Integer codes for groups, archives and categories (in the order of the
+# dicts above), so that mapping many categories to their archives or
+# groups is a gather on NumPy arrays instead of chained dict lookups.
+# Aliases and subsumed archives are resolved to the code of their
+# canonical category.
+
+@lru_cache(maxsize=None)
+def get_taxonomy_tables():
+    """ Precompiled (and cached) flat taxonomy tables.
+
+        Returns a dict with
+            group_keys      group ID of each group code
+            archive_keys    archive ID of each archive code
+            category_keys   category ID of each category code
+            archive_code    {archive ID: archive code}
+            category_code   {category ID, alias or subsumed archive:
+                             code of the canonical category}
+            archive_group   group code of each archive code
+            category_archive    archive code of each category code
+            category_group  group code of each category code
+            category_start  first and last month (see month_number) in
+            category_end    which papers are filed under each category
+                            code (see get_category_months)
+        The arrays and dicts are shared, do not modify them.
+    """
+
+    group_keys = list(GROUPS)
+    archive_keys = list(ARCHIVES)
+    category_keys = list(CATEGORIES)
+    group_code = {key: code for code, key in enumerate(group_keys)}
+    archive_code = {key: code for code, key in enumerate(archive_keys)}
+    category_code = {key: code for code, key in enumerate(category_keys)}
+    for alias, canonical in CATEGORY_ALIASES.items():
+        category_code[alias] = category_code[canonical]
+    for archive, canonical in ARCHIVES_SUBSUMED.items():
+        category_code[archive] = category_code[canonical]
+    archive_group = np.array(
+        [group_code[ARCHIVES[key]['in_group']] for key in archive_keys],
+        dtype=np.int16
+    )
+    category_archive = np.array(
+        [archive_code[CATEGORIES[key]['in_archive']] for key in category_keys],
+        dtype=np.int16
+    )
+    tables = {
+        'group_keys': group_keys,
+        'archive_keys': archive_keys,
+        'category_keys': category_keys,
+        'archive_code': archive_code,
+        'category_code': category_code,
+        'archive_group': archive_group,
+        'category_archive': category_archive,
+        'category_group': archive_group[category_archive]
+    }
+    tables['category_start'], tables['category_end'] = get_category_months(
+        category_keys, category_code
+    )
+    for arr in [
+        'archive_group', 'category_archive', 'category_group',
+        'category_start', 'category_end'
+    ]:
+        tables[arr].setflags(write=False)
+    return tables
+
+
+# month numbers of categories that are never (start) / still (end) used
+NEVER = np.iinfo(np.int32).max
+OPEN_END = np.iinfo(np.int32).max
+
+
+def month_number(year, month):
+    """ Consecutive number of a month (for comparing months as integers).
+    """
+
+    return year * 12 + month - 1
+
+
+def get_category_months(category_keys, category_code):
+    """ First and last month (inclusive, see month_number) in which papers
+        are filed under each category, as two int32 arrays.
+
+        Categories have the dates of their archive, bare archive names
+        used as categories end with LEGACY_ARCHIVE_AS_PRIMARY. Aliases and
+        subsumed archives are resolved to their canonical category (see
+        get_taxonomy_tables), which therefore spans their months as well,
+        while they themselves are never used (start NEVER, end -1).
+    """
+
+    starts = np.empty(len(category_keys), dtype=np.int32)
+    ends = np.empty(len(category_keys), dtype=np.int32)
+    for code, key in enumerate(category_keys):
+        archive = ARCHIVES[CATEGORIES[key]['in_archive']]
+        start = archive['start_date']
+        end = LEGACY_ARCHIVE_AS_PRIMARY.get(key, archive.get('end_date'))
+        starts[code] = month_number(start.year, start.month)
+        ends[code] = (
+            OPEN_END if end is None else month_number(end.year, end.month)
+        )
+    for code, key in enumerate(category_keys):
+        canonical = category_code[key]
+        if canonical == code:
+            continue
+        starts[canonical] = min(starts[canonical], starts[code])
+        ends[canonical] = max(ends[canonical], ends[code])
+        starts[code] = NEVER
+        ends[code] = -1
+    return starts, ends
+
+
+def get_active_mask(cat_keys, mon_keys):
+    """ Whether papers can be filed under each category in each month
+        (e.g. '2017-09'), as a len(cat_keys) × len(mon_keys) bool array
+        (see get_category_months).
+    """
+
+    tables = get_taxonomy_tables()
+    own_code = {key: code for code, key in enumerate(tables['category_keys'])}
+    codes = np.array([own_code[key] for key in cat_keys], dtype=np.int64)
+    months = np.array(
+        [month_number(int(key[:4]), int(key[5:7])) for key in mon_keys],
+        dtype=np.int32
+    )
+    return (
+        (months[None, :] >= tables['category_start'][codes][:, None]) &
+        (months[None, :] <= tables['category_end'][codes][:, None])
+    )
+
+
+def resolve_category(cat_id):
+    """ ID of the canonical category of a category, alias or subsumed
+        archive (e.g. math.MP -> math-ph, cmp-lg -> cs.CL), None if unknown.
+    """
+
+    tables = get_taxonomy_tables()
+    code = tables['category_code'].get(cat_id)
+    if code is None:
+        return None
+    return tables['category_keys'][code]
+
+
+def encode_categories(cat_ids):
+    """ Category codes of category IDs (aliases and subsumed archives
+        resolved) as an int16 array, -1 for unknown IDs.
+    """
+
+    category_code = get_taxonomy_tables()['category_code']
+    return np.array(
+        [category_code.get(cat_id, -1) for cat_id in cat_ids],
+        dtype=np.int16
+    )
+
+
+def get_category_groups(cat_ids):
+    """ Group IDs of category IDs in one vectorized gather, None for
+        unknown IDs.
+    """
+
+    tables = get_taxonomy_tables()
+    codes = encode_categories(cat_ids)
+    group_codes = tables['category_group'][codes]
+    return [
+        tables['group_keys'][group_code] if code >= 0 else None
+        for code, group_code in zip(codes, group_codes)
+    ]
@@ -0,0 +1,161 @@
+""" Benchmark loads_projected (see paper_json.py) against json.loads.
+
+    Usage:
+        python bench_paper_json.py [/path/to/sample.jsonl]
+
+    Without a path, papers shaped like unarXive papers (metadata, ~120
+    paragraphs, ~40 references, ~20 figures and tables) are generated.
+"""
+
+import json
+import random
+import sys
+import time
+import paper_json
+from paper_json import loads_projected
+
+
+PROJECTIONS = [
+    ['paper_id'],
+    ['paper_id', 'metadata'],
+    ['paper_id', 'metadata', 'discipline', 'bib_entries'],
+    ['body_text'],
+]
+
+
+def make_paper(i, rnd):
+    """ A synthetic paper with the structure of an unarXive paper.
+    """
+
+    pid = '{:02}{:02}.{:05}'.format(rnd.randint(7, 22), rnd.randint(1, 12), i)
+    bib_entries = {}
+    for j in range(rnd.randint(20, 60)):
+        bib_entries['b{}'.format(j)] = {
+            'bib_entry_raw': 'A. Author and B. Author, "A title of a '
+                             'referenced work", J. Phys. {} (2001)'.format(j),
+            'contained_arXiv_ids': [
+                {'id': 'hep-th/9901001', 'text': 'hep-th/9901001'}
+            ],
+            'contained_links': [],
+            'discipline': rnd.choice(['Physics', 'Mathematics', '']),
+            'ids': {
+                'open_alex_id': 'https://openalex.org/W{}'.format(j),
+                'sem_open_alex_id': '',
+                'pubmed_id': '',
+                'pmc_id': '',
+                'doi': '',
+                'arxiv_id': rnd.choice(['', 'hep-th/9901001'])
+            }
+        }
+    body_text = []
+    for j in range(rnd.randint(60, 180)):
+        body_text.append({
+            'section': rnd.choice(['Introduction', 'Method', 'Results']),
+            'sec_number': str(rnd.randint(1, 6)),
+            'sec_type': 'section',
+            'content_type': 'paragraph',
+            'text': ' '.join(
+                'Lorem ipsum dolor sit amet {{cite:b1}}, "consectetur" '
+                'adipiscing {{formula:f1}} elit.'
+                for _ in range(rnd.randint(4, 16))
+            ),
+            'cite_spans': [
+                {'start': 27, 'end': 39, 'ref_id': 'b1'}
+            ],
+            'ref_spans': [
+                {'start': 65, 'end': 79, 'ref_id': 'f1'}
+            ]
+        })
+    ref_entries = {}
+    for j in range(rnd.randint(5, 30)):
+        ref_entries['r{}'.format(j)] = {
+            'caption': 'Caption of a figure or table {{cite:b2}}',
+            'type': rnd.choice(['figure', 'table'])
+        }
+    return {
+        'paper_id': pid,
+        '_pdf_hash': None,
+        '_source_hash': '0123456789abcdef',
+        '_source_name': pid + '.gz',
+        'metadata': {
+            'id': pid,
+            'submitter': 'A. Author',
+            'authors': 'A. Author, B. Author',
+            'title': 'A title',
+            'comments': '10 pages',
+            'journal-ref': None,
+            'doi': None,
+            'report-no': None,
+            'categories': 'cs.LG stat.ML',
+            'license': 'http://arxiv.org/licenses/nonexclusive-distrib/1.0/',
+            'abstract': 'An abstract. ' * 20,
+            'versions': [
+                {'version': 'v1', 'created': 'Mon, 2 Apr 2007 19:18:42 GMT'}
+            ],
+            'update_date': '2008-11-13',
+            'authors_parsed': [['Author', 'A.', ''], ['Author', 'B.', '']]
+        },
+        'discipline': 'Computer Science',
+        'abstract': {
+            'section': 'Abstract',
+            'text': 'An abstract. ' * 20,
+            'cite_spans': [],
+            'ref_spans': []
+        },
+        'body_text': body_text,
+        'bib_entries': bib_entries,
+        'ref_entries': ref_entries
+    }
+
+
+def time_per_line(parse, lines, repeat=3):
+    t_start = time.perf_counter()
+    for _ in range(repeat):
+        for line in lines:
+            parse(line)
+    return (time.perf_counter() - t_start) / (repeat * len(lines))
+
+
+def bench(lines):
+    """ Print ms per paper for each parser and projection.
+    """
+
+    avg_kb = sum(len(line) for line in lines) / len(lines) / 1e3
+    print('{} papers, {:.1f} KB per paper on average'.format(
+        len(lines), avg_kb
+    ))
+    base = time_per_line(json.loads, lines)
+    print('{:<66} {:>8.3f} ms'.format('json.loads', base * 1e3))
+    backends = [('stdlib', None)]
+    if paper_json.orjson is not None:
+        orjson = paper_json.orjson
+        dur = time_per_line(orjson.loads, lines)
+        print('{:<66} {:>8.3f} ms  ({:.1f}x)'.format(
+            'orjson.loads', dur * 1e3, base / dur
+        ))
+        backends.append(('orjson', orjson))
+    for backend_name, backend in backends:
+        paper_json.orjson = backend
+        for fields in PROJECTIONS:
+            dur = time_per_line(
+                lambda line: loads_projected(line, fields), lines
+            )
+            label = 'loads_projected[{}] {}'.format(
+                backend_name, ','.join(fields)
+            )
+            print('{:<66} {:>8.3f} ms  ({:.1f}x)'.format(
+                label, dur * 1e3, base / dur
+            ))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], 'rb') as f:
+            lines = [line for line in f if line.strip()]
+    else:
+        rnd = random.Random(0)
+        lines = [
+            json.dumps(make_paper(i, rnd)).encode('utf-8')
+            for i in range(200)
+        ]
+    bench(lines)
@@ -12,23 +12,110 @@
     - mathematical notation
 """
 
+import argparse
 import json
 import os
+import re
 import sys
 import numpy as np
 import matplotlib as mpl
 import matplotlib.pyplot as plt
+import pyarrow as pa
+import pyarrow.parquet as pq
 from collections import defaultdict
-from arxiv_taxonomy import GROUPS, ARCHIVES, CATEGORIES
+from functools import lru_cache
+from arxiv_taxonomy import (
+    GROUPS, CATEGORIES, get_taxonomy_tables, resolve_category
+)
+from corpus import YEARS, get_jsonl_fps, get_year_month
+from manifest import Manifest, fingerprint_files
+from scanner import Accumulator, get_fields, scan
+from stats_cube import (
+    CUBE_FN, StatsCube, load_cube, load_legacy_stats, load_sketch, save_cube
+)
+from stats_sketch import QuantileSketch
+
+PPR_STATS_KEYS = [
+    'num_cit_markers',
+    'num_cit_markers_linked',
+    'num_refs',
+    'num_refs_linked',
+    'num_paras',
+    'num_para_type_paragraph',
+    'num_para_type_listing',
+    'num_para_type_label',
+    'num_para_type_item',
+    'num_para_type_proof',
+    'num_para_type_pic_put',
+    'num_fig_succs',
+    'num_fig_fails',
+    'num_tbl_succs',
+    'num_tbl_fails',
+    'num_formula_succs',
+    'num_formula_fails'
+]
+AGGREGATE_ONLY_KEYS = [
+    'num_pprs',
+    'num_license_arxiv_non-exclusive',
+    'num_license_public_domain',
+    'num_license_creative_commons',
+    'num_license_no_license',
+    'num_license_unknown_license'
+]
+# layers of the stats tensor
+STATS_KEYS = PPR_STATS_KEYS + AGGREGATE_ONLY_KEYS
+# increase when what paper_stats counts changes, so that persisted stats
+# are recalculated (2: citation markers counted once per marker, 3: per-
+# paper stats table, 4: aliases and subsumed archives counted as their
+# canonical category)
+STATS_SCHEMA_VERSION = 4
+CACHE_INFO_FN = 'fingerprint.json'
+PAPER_TABLE_FN = 'paper_stats.parquet'
+# per-paper counts that fit into int16 (larger values are saturated), all
+# other PPR_STATS_KEYS are stored as int32
+PAPER_TABLE_INT16_KEYS = [
+    'num_para_type_listing',
+    'num_para_type_label',
+    'num_para_type_item',
+    'num_para_type_proof',
+    'num_para_type_pic_put',
+    'num_fig_succs',
+    'num_fig_fails',
+    'num_tbl_succs',
+    'num_tbl_fails'
+]
+PAPER_TABLE_SCHEMA = pa.schema(
+    [
+        ('paper_id', pa.string()),
+        ('year', pa.int16()),
+        ('month', pa.int8()),
+        ('main_fine_cat', pa.dictionary(pa.int16(), pa.string())),
+        ('main_coarse_cat', pa.dictionary(pa.int8(), pa.string())),
+        ('license', pa.dictionary(pa.int8(), pa.string())),
+    ] + [
+        (
+            stats_key,
+            pa.int16() if stats_key in PAPER_TABLE_INT16_KEYS else pa.int32()
+        )
+        for stats_key in PPR_STATS_KEYS
+    ]
+)
+INT16_MAX = np.iinfo(np.int16).max
+# papers per np.bincount in PaperStatsAccumulator
+BATCH_SIZE = 4096
+# in-text citation marker, e.g. {{cite:0a1b2c...}}
+CIT_MARKER_PATT = re.compile(r'\{\{cite:([^}]*)\}\}')
 
 
 def refmatch_rate(root_dir='tmp_foo', until_2020=False):
-    mtrs, idxs = calc_stats(root_dir)
+    cube = load_stats_cube(root_dir)
+    _, years, vals_total = cube.rollup('num_refs', 'all', 'year')
+    _, _, vals_linked = cube.rollup('num_refs_linked', 'all', 'year')
     refs_total = 0
     refs_linked_total = 0
-    for year, y_idx in idxs['year_to_idx'].items():
-        val_total = np.sum(mtrs['num_refs'][:, y_idx[0]:y_idx[-1]])
-        val_linked = np.sum(mtrs['num_refs_linked'][:, y_idx[0]:y_idx[-1]])
+    for year, val_total, val_linked in zip(
+        years, vals_total[0], vals_linked[0]
+    ):
         if until_2020 and year in ['2021', '2022']:
             print('skipping year {}'.format(year))
             continue
@@ -92,17 +179,18 @@ def get_coarse_arxiv_category(cat_id):
         e.g.
             hep-th -> hep-th -> grp_physics
             cs.CL -> cs -> grp_cs
+        Aliases and subsumed archives go by their canonical category, e.g.
+            math.MP -> math-ph -> math-ph -> grp_physics
     """
 
-    cat = CATEGORIES.get(cat_id, None)
-    if cat is not None:
-        archive_id = cat['in_archive']
-        archive = ARCHIVES.get(archive_id, None)
-        if archive is not None:
-            group_id = archive['in_group']
-            group = GROUPS.get(group_id, None)
-            if group is not None:
-                return group_id
+    tables = get_taxonomy_tables()
+    cat_code = tables['category_code'].get(cat_id)
+    if cat_code is not None:
+        return tables['group_keys'][tables['category_group'][cat_code]]
+    # legacy bare-archive names (e.g. q-bio) that are no category
+    arch_code = tables['archive_code'].get(cat_id)
+    if arch_code is not None:
+        return tables['group_keys'][tables['archive_group'][arch_code]]
     return None
 
 
@@ -125,18 +213,8 @@ def paper_stats(ppr):
     stats = {}
 
     # determine year
-    pid = ppr.get('paper_id')
-    if '/' in pid:
-        # old format ID
-        pref, pid = pid.split('/')
-    if pid[0] == '9':
-        # years 1991–1999
-        year = int('19' + pid[:2])
-    else:
-        # years 2000–2099
-        year = int('20' + pid[:2])
-    month = pid[2:4]
-    stats['month'] = '{}-{}'.format(
+    year, month = get_year_month(ppr.get('paper_id'))
+    stats['month'] = '{}-{:02}'.format(
         year,
         month
     )
@@ -154,7 +232,9 @@ def paper_stats(ppr):
     for fine_cat_id in fine_cat_ids:
         fine_cats.append(fine_cat_id)
         if main_fine_cat is None:
-            main_fine_cat = fine_cat_id
+            # aliases and subsumed archives count as their canonical category,
+            # which can be in another group (e.g. cs.SY -> eess.SY, see README)
+            main_fine_cat = resolve_category(fine_cat_id) or fine_cat_id
         coarse_cat_id = get_coarse_arxiv_category(fine_cat_id)
         if coarse_cat_id is not None:
             coarse_cats.append(coarse_cat_id)
@@ -184,14 +264,16 @@ def paper_stats(ppr):
     num_refs_linked = 0
     num_non_text_types = defaultdict(int)
     num_non_text_success = defaultdict(dict)
+    linked_ref_ids = set()
     # reference section entries
-    for ref in ppr['bib_entries'].values():
+    for ref_id, ref in ppr['bib_entries'].items():
         # count reference section entries separately, because a single
         # entry can appear in multiple paragraphs
         num_refs += 1
         open_alex_id = get_open_alex_id_from_ref(ref)
         if open_alex_id is not None:
             num_refs_linked += 1
+            linked_ref_ids.add(ref_id)
     stats['num_refs'] = num_refs
     stats['num_refs_linked'] = num_refs_linked
     # paragraphs and in-text citations
@@ -210,17 +292,17 @@ def paper_stats(ppr):
             num_para_type_proof += 1
         elif para['content_type'] == 'pic-put':
             num_para_type_pic_put += 1
-        for cit in para['cite_spans']:
-            # for each reference
-            ref_id = cit['ref_id']
-            num_mrkrs = para['text'].count(ref_id)
-            num_cit_markers += num_mrkrs
-            ref = ppr['bib_entries'].get(
-                ref_id, {}
-            )
-            open_alex_id = get_open_alex_id_from_ref(ref)
-            if open_alex_id is not None:
-                num_cit_markers_linked += num_mrkrs
+        if len(para['cite_spans']) == 0:
+            continue
+        # find the markers of all cited references in a single pass over
+        # the text (each marker counted once, even if its reference has
+        # multiple cite spans in the paragraph)
+        cited_ref_ids = {cit['ref_id'] for cit in para['cite_spans']}
+        for ref_id in CIT_MARKER_PATT.findall(para['text']):
+            if ref_id in cited_ref_ids:
+                num_cit_markers += 1
+                if ref_id in linked_ref_ids:
+                    num_cit_markers_linked += 1
     stats['num_paras'] = num_paras
     stats['num_para_type_paragraph'] = num_para_type_paragraph
     stats['num_para_type_listing'] = num_para_type_listing
@@ -271,27 +353,30 @@ def paper_stats(ppr):
     return stats
 
 
+@lru_cache(maxsize=None)
 def get_stats_matrix_indices(max_year=2022):
     """ Create inicies for a matrix of dimension
             num_categories × num_months
         s.t. all categies in a group and all months in a year
         have a continuous range of row/column indices.
+
+        The indices are cached and shared, do not modify them.
     """
 
-    # category axis
+    # category axis: categories ordered by group, archive and category
+    # code (i.e. by the order of GROUPS, ARCHIVES and CATEGORIES)
+    tables = get_taxonomy_tables()
+    cat_codes = np.lexsort((
+        np.arange(len(tables['category_keys'])),
+        tables['category_archive'],
+        tables['category_group']
+    ))
     cat_to_idx = {}
     grp_to_idx = defaultdict(list)
-    idx = 0
-    for gr_key, gr in GROUPS.items():
-        for arch_key, arch in ARCHIVES.items():
-            if arch['in_group'] != gr_key:
-                continue
-            for cat_key, cat in CATEGORIES.items():
-                if cat['in_archive'] != arch_key:
-                    continue
-                grp_to_idx[gr_key].append(idx)
-                cat_to_idx[cat_key] = idx
-                idx += 1
+    for idx, cat_code in enumerate(cat_codes):
+        gr_key = tables['group_keys'][tables['category_group'][cat_code]]
+        grp_to_idx[gr_key].append(idx)
+        cat_to_idx[tables['category_keys'][cat_code]] = idx
     # month axis
     mon_to_idx = {}
     year_to_idx = defaultdict(list)
@@ -329,36 +414,59 @@ def get_empty_stats_matrix(indices):
     return stats_matrx
 
 
-def print_stats_for_groups(mtrxs, idxs):
+def get_empty_stats_tensor(indices):
+    """ Create a zero filled tensor of dimensions
+            num_stats × num_categories × num_months
+        with one layer per key in STATS_KEYS.
+    """
+
+    return np.zeros(
+        (
+            len(STATS_KEYS),
+            len(indices['cat_to_idx']),
+            len(indices['mon_to_idx'])
+        )
+    )
+
+
+def get_stats_matrix_dict(stats_tensor):
+    """ Map each key in STATS_KEYS to its layer of the stats tensor.
+    """
+
+    return {
+        stats_key: stats_tensor[i]
+        for i, stats_key in enumerate(STATS_KEYS)
+    }
+
+
+def print_stats_for_groups(cube):
     """ Showcase
     """
 
     # for all the stats available
-    for stat, mtrx in mtrxs.items():
+    for stat in cube.stats_keys:
         print('\n- - - {} - - -'.format(stat))
-        # for each arXiv group
-        for gk, gi in idxs['grp_to_idx'].items():
+        # sum up the respective rows over all years for each arXiv group
+        grps, _, stat_vals = cube.rollup(stat, 'group', 'all')
+        for gk, stat_val in zip(grps, stat_vals[:, 0]):
             gn = get_coarse_arxiv_group_name(gk)
-            # sum up the respective rows over all years
-            stat_val = np.sum(mtrx[gi[0]:gi[-1]+1, :])
             print('\t{}: {}'.format(gn, stat_val))
 
 
-def print_stats_for_years(mtrxs, idxs):
+def print_stats_for_years(cube):
     """ Showcase
     """
 
     # for all the stats available
-    for stat, mtrx in mtrxs.items():
+    for stat in cube.stats_keys:
         print('\n- - - {} - - -'.format(stat))
-        # for each year
-        for yk, yi in idxs['year_to_idx'].items():
-            # sum up the respective rows over all categories
-            stat_val = np.sum(mtrx[:, yi[0]:yi[-1]+1])
+        # sum up the respective columns over all categories for each year
+        _, years, stat_vals = cube.rollup(stat, 'all', 'year')
+        for yk, stat_val in zip(years, stat_vals[0]):
             print('\t{}: {}'.format(yk, stat_val))
 
 
-def get_cats_over_years_plot_data(mtrxs, idxs, part_key, total_key=None):
+def get_cats_over_years_plot_data(cube, part_key, total_key=None):
     """ Showcase of data generation for plots that show
             - a certain stat
         or
@@ -368,44 +476,35 @@ def get_cats_over_years_plot_data(mtrxs, idxs, part_key, total_key=None):
         With e.g.
         part_key='num_refs_linked'
         total_key='num_refs'
+
+        The discipline × year sums come from the cached roll-ups of the
+        stats cube (see stats_cube.StatsCube). Years before a discipline
+        existed are NaN, i.e. left out of the plot.
     """
 
-    stats_vals = {}
-    years = list(idxs['year_to_idx'].keys())  # x labels for plot
-    for disc, d_idx in idxs['grp_to_idx'].items():
-        # for each discipline, create a list of ref matching success
-        # rates with one value per year (NOTE: change to month?)
-        stats_vals[disc] = []
-        for year, y_idx in idxs['year_to_idx'].items():
-            val_part = np.sum(mtrxs[part_key][
-                d_idx[0]:
-                d_idx[-1],
-                y_idx[0]:
-                y_idx[-1]
-            ])
-            if total_key is None:
-                # nothing to divide by
-                stats_val = val_part
-            else:
-                # divite by a total
-                val_total = np.sum(mtrxs[total_key][
-                    d_idx[0]:  # \discipline
-                    d_idx[-1],  # |slice
-                    y_idx[0]:  # year
-                    y_idx[-1]  # slice
-                ])
-                if val_total == 0:
-                    quota = 0
-                else:
-                    quota = val_part / val_total
-                stats_val = quota
-            stats_vals[disc].append(stats_val)
-    return stats_vals, years
+    if total_key is None:
+        # nothing to divide by
+        discs, years, stats_mtrx = cube.rollup(part_key, 'group', 'year')
+        stats_mtrx = cube.mask_dead(stats_mtrx, 'group', 'year')
+    else:
+        # divide by a total
+        discs, years, stats_mtrx = cube.ratio(
+            part_key, total_key, 'group', 'year'
+        )
+    # for each discipline, a list with one value per year
+    # (NOTE: change to month?)
+    stats_vals = {
+        disc: list(stats_mtrx[i]) for i, disc in enumerate(discs)
+    }
+    return stats_vals, years  # years: x labels for plot
 
 
 def livetest():
+    # load once, plots share the cube's cached roll-ups
+    cube = load_stats_cube('enriched_tmp')
     # Papers per year figure
     demoplot(
+        cube,
         stat1_key='num_pprs',
         xlabel='Year',
         ylabel='Number of papers',
@@ -413,6 +512,7 @@ def livetest():
     )
     # Reference density figure
     # demoplot(
+    #     cube,
     #     stat1_key='num_refs',
     #     stat2_key='num_paras',
     #     xlabel='Year',
@@ -422,23 +522,20 @@ def livetest():
 
 
 def demoplot(
-        stat1_key=None, stat2_key=None,
+        cube=None, stat1_key=None, stat2_key=None,
         xlabel='', ylabel='', title='',
         major_only=False, no_test_cat=True,
         short_labels=True
 ):
-    majors = [
-        'Physics', 'Mathematics', 'Computer Science'
-    ]
     if stat1_key is None and stat2_key is None:
         stat1_key = 'num_refs_linked'
         stat2_key = 'num_refs'
     elif stat2_key is None:
         stat1_key = 'num_pprs'
-    matrices, indices = calc_stats('enriched_tmp')
+    if cube is None:
+        cube = load_stats_cube('enriched_tmp')
     stats_vals, yrs = get_cats_over_years_plot_data(
-        matrices,
-        indices,
+        cube,
         stat1_key,
         stat2_key
     )
@@ -446,7 +543,27 @@ def demoplot(
     cm = 1/2.54
     fig = plt.figure(figsize=[15*cm, 9*cm])
     ax = fig.add_subplot(111)
+    plot_cats_over_years(
+        fig, ax, stats_vals, yrs, xlabel, ylabel,
+        major_only=major_only, no_test_cat=no_test_cat,
+        short_labels=short_labels, thousands=stat2_key is None
+    )
+    fig.show()
+    fig.savefig('/tmp/demoax.pdf')
+
 
+def plot_cats_over_years(
+        fig, ax, stats_vals, yrs, xlabel='', ylabel='',
+        major_only=False, no_test_cat=True, short_labels=True,
+        thousands=False
+):
+    """ Draw one line per coarse discipline across the years (see
+        get_cats_over_years_plot_data) into ax.
+    """
+
+    majors = [
+        'Physics', 'Mathematics', 'Computer Science'
+    ]
     intyrs = [int(y) for y in yrs]
     for gk, vals in stats_vals.items():
         gn = get_coarse_arxiv_group_name(gk)
@@ -472,19 +589,18 @@ def demoplot(
     ax.set_xlabel(xlabel)
     ax.set_ylabel(ylabel)
 
-    ax.get_yaxis().set_major_formatter(  # fig1
-        mpl.ticker.FuncFormatter(lambda x, p: str(int(x/1000))+'k')  #
-    )  #
-    fig.legend(loc='upper center', ncol=2)  # / fig1
-
-    # fig.legend(loc='upper center', ncol=1)  # fig2
+    if thousands:
+        ax.get_yaxis().set_major_formatter(
+            mpl.ticker.FuncFormatter(lambda x, p: str(int(x/1000))+'k')
+        )
+    fig.legend(loc='upper center', ncol=2)
 
     fig.tight_layout()
-    fig.show()
-    fig.savefig('/tmp/demoax.pdf')
 
 
-def calc_stats(root_dir, force_calc=False, save_dir=None):
+def calc_stats(
+        root_dir, force_calc=False, save_dir=None, workers=1, sketches=False
+):
     """ Calculates a range of stats, each stored in a matrix of dimensions
             num_categories × num_months
         where consecutive sections of rows/columns are category groups/years.
@@ -503,185 +619,571 @@ def calc_stats(root_dir, force_calc=False, save_dir=None):
 
 
         For each statistical value (num papers, num references, etc.) one
-        such matrix is created.
+        such matrix is created. The per-paper values are persisted as a
+        table as well (see PaperTableAccumulator and load_paper_table).
+
+        Results are persisted in a sub directory of save_dir (default:
+        get_save_dir()) named after the fingerprint of the corpus and the
+        stats schema (see get_cache_dir), and only re-used for the same
+        fingerprint, i.e. the caches of several corpora are kept side by
+        side and a changed corpus is recalculated. If there are no JSONLs
+        at root_dir, the stats saved directly in save_dir are used instead
+        (e.g. the committed stats/stats.cube, regenerated with the --export
+        option).
+
+        With workers > 1, the JSONL files are processed by that many worker
+        processes in parallel (see scanner.scan).
+
+        With sketches=True, quantile sketches of the per-paper stats are
+        calculated (or cached stats without sketches recalculated) and
+        stored with the stats, see QuantileSketchAccumulator and
+        load_stats_cube.
 
         Returns
             stats matrices
             stats matrix indices
     """
 
-    # use pre-calculated stats if possible
-    if not force_calc:
+    jsonl_fps = get_jsonl_fps(root_dir)
+    if len(jsonl_fps) == 0 and not force_calc:
+        # corpus not available, nothing to fingerprint
         precalc_stats = load_from_disk(save_dir)
+        if precalc_stats is not None:
+            print(
+                'no JSONLs found in `{}`, using stats not tied to a '
+                'corpus'.format(root_dir)
+            )
+            return precalc_stats
+
+    # use pre-calculated stats of the same corpus if possible
+    cache_dir = get_cache_dir(root_dir, jsonl_fps, save_dir)
+    cube_fp = os.path.join(cache_dir, CUBE_FN)
+    if not force_calc and (
+        not sketches or
+        os.path.exists(cube_fp) and load_sketch(cube_fp) is not None
+    ):
+        precalc_stats = load_from_disk(cache_dir)
         if precalc_stats is not None:
             stats_matrix_dict, stats_matrix_indices = precalc_stats
             return stats_matrix_dict, stats_matrix_indices
 
-    # set up stats data structure
-    ppr_stats_keys = [
-        'num_cit_markers',
-        'num_cit_markers_linked',
-        'num_refs',
-        'num_refs_linked',
-        'num_paras',
-        'num_para_type_paragraph',
-        'num_para_type_listing',
-        'num_para_type_label',
-        'num_para_type_item',
-        'num_para_type_proof',
-        'num_para_type_pic_put',
-        'num_fig_succs',
-        'num_fig_fails',
-        'num_tbl_succs',
-        'num_tbl_fails',
-        'num_formula_succs',
-        'num_formula_fails'
-    ]
+    # go through JSONLs
+    accumulators = [PaperStatsAccumulator(), PaperTableAccumulator()]
+    if sketches:
+        accumulators.append(QuantileSketchAccumulator())
+    results = scan(
+        root_dir, [SharedPaperStatsAccumulator(accumulators)],
+        workers=workers
+    )[0]
+    stats_matrix_dict, paper_table = results[:2]
+    sketch = results[2] if sketches else None
     stats_matrix_indices = get_stats_matrix_indices()
-    stats_matrix_dict = {}
-    aggregrate_only_keys = [
-        'num_pprs',
-        'num_license_arxiv_non-exclusive',
-        'num_license_public_domain',
-        'num_license_creative_commons',
-        'num_license_no_license',
-        'num_license_unknown_license'
-    ]
-    for k in ppr_stats_keys + aggregrate_only_keys:
-        stats_matrix_dict[k] = get_empty_stats_matrix(stats_matrix_indices)
 
-    # go through JSONLs
-    jsonl_fps = []
-    for path_to_file, subdirs, files in os.walk(root_dir):
-        for fn in files:
-            fn_base, ext = os.path.splitext(fn)
-            if ext == '.jsonl':
-                fp = os.path.join(path_to_file, fn)
-                if os.path.getsize(fp) > 0:
-                    jsonl_fps.append(fp)
-    print('found {} JSONLs to parse'.format(len(jsonl_fps)))
-    for fp in jsonl_fps:
-        with open(fp) as f:
-            for i, line in enumerate(f):
-                ppr = json.loads(line)
-                ppr_stats = paper_stats(ppr)
-                # get stats matrix indices
-                cat = ppr_stats['main_fine_cat']
-                mon = ppr_stats['month']
-                try:
-                    cat_m_idx = stats_matrix_indices['cat_to_idx'][cat]
-                except KeyError:
-                    print(
-                        'main_fine_cat of {} is {}. skipping'.format(
-                            ppr['paper_id'], cat
-                        )
-                    )
-                    continue
-                mon_m_idx = stats_matrix_indices['mon_to_idx'][mon]
-                # add to ppr count
-                stats_matrix_dict['num_pprs'][cat_m_idx][mon_m_idx] += 1
-                # add license counts
-                license_stats_key = 'num_license_{}'.format(
-                    get_license_coarse_name(
-                        ppr_stats['license_url']
-                    ).replace(' ', '_').lower()
-                )
-                stats_matrix_dict[license_stats_key][cat_m_idx][mon_m_idx] += 1
-                # add to other keys
-                for stats_key in ppr_stats_keys:
-                    stats_matrix_dict[
-                        stats_key
-                    ][cat_m_idx][mon_m_idx] += ppr_stats[stats_key]
+    # save to disk for re-use
+    save_to_cache(
+        stats_matrix_dict, stats_matrix_indices, root_dir, jsonl_fps,
+        save_dir, paper_table, sketch
+    )
+
+    return stats_matrix_dict, stats_matrix_indices
+
+
+def load_stats_cube(
+        root_dir, force_calc=False, save_dir=None, workers=1, sketches=False
+):
+    """ calc_stats wrapped in a StatsCube for queries by discipline and
+        time (see stats_cube.py), including the quantile sketches if they
+        have been calculated.
+    """
+
+    stats_matrix_dict, stats_matrix_indices = calc_stats(
+        root_dir, force_calc, save_dir, workers, sketches
+    )
+    sketch = None
+    cube_fp = os.path.join(get_stats_dir(root_dir, save_dir), CUBE_FN)
+    if os.path.exists(cube_fp):
+        sketch = load_sketch(cube_fp)
+    return StatsCube(stats_matrix_dict, stats_matrix_indices, sketch)
+
+
+def calc_stats_incremental(root_dir, manifest_fp, partial_dir, workers=1):
+    """ Calculate the stats matrices (see calc_stats) from per-year
+        partial matrices stored in partial_dir.
+
+        Only years whose JSONL files changed since their partial was
+        calculated (according to the manifest at manifest_fp, see
+        manifest.py) or calculated with another STATS_SCHEMA_VERSION are
+        re-scanned. Files outside of year folders are not
+        considered. All entries are integer counts, so the sum of the
+        partials is identical to the result of a full pass.
+    """
+
+    manifest = Manifest(manifest_fp, root_dir)
+    os.makedirs(partial_dir, exist_ok=True)
+    stats_matrix_dict = None
+    paper_tables = []
+    for year in YEARS:
+        jsonl_fps = get_jsonl_fps(root_dir, years=[year])
+        partial_fp = os.path.join(partial_dir, '{}.npz'.format(year))
+        partial_table_fp = os.path.join(
+            partial_dir, '{}.parquet'.format(year)
+        )
+        # partials of another stats schema are never re-used
+        artifact = 'calc_stats/v{}/{}'.format(STATS_SCHEMA_VERSION, year)
+        if len(jsonl_fps) == 0:
+            # year not (or no longer) in the data
+            for fp in [partial_fp, partial_table_fp]:
+                if os.path.exists(fp):
+                    os.remove(fp)
+            manifest.forget(artifact)
+            continue
+        output_fps = [partial_fp, partial_table_fp]
+        if manifest.is_stale(artifact, jsonl_fps, output_fps):
+            print('calculating stats of year {}'.format(year))
+            year_matrix_dict, year_table = scan(
+                root_dir,
+                [SharedPaperStatsAccumulator(
+                    [PaperStatsAccumulator(), PaperTableAccumulator()]
+                )],
+                years=[year], workers=workers
+            )[0]
+            np.savez(partial_fp, **year_matrix_dict)
+            pq.write_table(year_table, partial_table_fp)
+            manifest.record(artifact, jsonl_fps, output_fps)
+            manifest.save()
+        else:
+            print('stats of year {} are up to date'.format(year))
+            with np.load(partial_fp) as partial:
+                year_matrix_dict = dict(partial)
+            year_table = pq.read_table(
+                partial_table_fp, schema=PAPER_TABLE_SCHEMA
+            )
+        paper_tables.append(year_table)
+        if stats_matrix_dict is None:
+            stats_matrix_dict = year_matrix_dict
+            continue
+        for stats_key, mtrx in year_matrix_dict.items():
+            stats_matrix_dict[stats_key] += mtrx
+    manifest.save()
+    stats_matrix_indices = get_stats_matrix_indices()
 
     # save to disk for re-use
-    save_to_disk(stats_matrix_dict, stats_matrix_indices)
+    paper_table = None
+    if len(paper_tables) > 0:
+        paper_table = pa.concat_tables(paper_tables)
+    save_to_cache(
+        stats_matrix_dict, stats_matrix_indices, root_dir,
+        get_jsonl_fps(root_dir, years=YEARS), paper_table=paper_table
+    )
 
     return stats_matrix_dict, stats_matrix_indices
 
 
+class PaperStatsAccumulator(Accumulator):
+    """ Accumulates the stats matrices (see calc_stats) paper by paper.
+
+        All stats are kept in a single tensor of dimensions
+            num_stats × num_categories × num_months
+        (stats in the order of STATS_KEYS). Per-paper values are collected
+        in a batch and added to the tensor with one np.bincount per
+        BATCH_SIZE papers. stats_matrix_dict maps each stats key to its
+        layer of the tensor (a view, not a copy).
+    """
+
+    fields = [
+        'paper_id', 'metadata', 'bib_entries', 'body_text', 'ref_entries'
+    ]
+
+    def __init__(self):
+        self.stats_matrix_indices = get_stats_matrix_indices()
+        self.stats_tensor = get_empty_stats_tensor(self.stats_matrix_indices)
+        self.stats_matrix_dict = get_stats_matrix_dict(self.stats_tensor)
+        # license URL -> stats tensor layer
+        self.license_idxs = {}
+        self.reset_batch()
+
+    def reset_batch(self):
+        self.batch_cell_idxs = []
+        self.batch_license_idxs = []
+        self.batch_values = []
+
+    def update(self, ppr, year):
+        self.add_paper_stats(ppr, paper_stats(ppr))
+
+    def add_paper_stats(self, ppr, ppr_stats):
+        """ Add a paper whose paper_stats have already been calculated.
+        """
+
+        # get stats matrix indices
+        cat = ppr_stats['main_fine_cat']
+        mon = ppr_stats['month']
+        try:
+            cat_m_idx = self.stats_matrix_indices['cat_to_idx'][cat]
+        except KeyError:
+            print(
+                'main_fine_cat of {} is {}. skipping'.format(
+                    ppr['paper_id'], cat
+                )
+            )
+            return
+        mon_m_idx = self.stats_matrix_indices['mon_to_idx'][mon]
+        self.batch_cell_idxs.append(
+            cat_m_idx * self.stats_tensor.shape[2] + mon_m_idx
+        )
+        # license counts
+        license_url = ppr_stats['license_url']
+        license_idx = self.license_idxs.get(license_url)
+        if license_idx is None:
+            license_stats_key = 'num_license_{}'.format(
+                get_license_coarse_name(
+                    license_url
+                ).replace(' ', '_').lower()
+            )
+            license_idx = STATS_KEYS.index(license_stats_key)
+            self.license_idxs[license_url] = license_idx
+        self.batch_license_idxs.append(license_idx)
+        # other keys
+        self.batch_values.append(
+            [ppr_stats[stats_key] for stats_key in PPR_STATS_KEYS]
+        )
+        if len(self.batch_cell_idxs) >= BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        """ Add the current batch to the stats tensor.
+        """
+
+        if len(self.batch_cell_idxs) == 0:
+            return
+        layer_size = self.stats_tensor.shape[1] * self.stats_tensor.shape[2]
+        cell_idxs = np.array(self.batch_cell_idxs, dtype=np.int64)
+        ppr_stats_idxs = (
+            cell_idxs[:, None] +
+            np.arange(len(PPR_STATS_KEYS))[None, :] * layer_size
+        )
+        num_pprs_idxs = cell_idxs + STATS_KEYS.index('num_pprs') * layer_size
+        license_idxs = (
+            cell_idxs +
+            np.array(self.batch_license_idxs, dtype=np.int64) * layer_size
+        )
+        flat_idxs = np.concatenate([
+            ppr_stats_idxs.ravel(), num_pprs_idxs, license_idxs
+        ])
+        weights = np.concatenate([
+            np.array(self.batch_values, dtype=np.float64).ravel(),
+            np.ones(2 * len(cell_idxs))
+        ])
+        self.stats_tensor += np.bincount(
+            flat_idxs, weights=weights, minlength=self.stats_tensor.size
+        ).reshape(self.stats_tensor.shape)
+        self.reset_batch()
+
+    def merge(self, other):
+        # all matrix entries are integer counts (exactly representable in
+        # float64), so merged results are identical to a serial pass
+        self.flush()
+        other.flush()
+        self.stats_tensor += other.stats_tensor
+
+    def finalize(self):
+        self.flush()
+        return self.stats_matrix_dict
+
+
+class PaperTableAccumulator(Accumulator):
+    """ Collects the per-paper stats that the stats matrices sum up into a
+        table with one row per paper (see PAPER_TABLE_SCHEMA), e.g. for
+        distributions of references per paper by category.
+
+        Rows are converted to typed record batches every BATCH_SIZE papers.
+    """
+
+    fields = PaperStatsAccumulator.fields
+
+    def __init__(self):
+        self.record_batches = []
+        self.reset_batch()
+
+    def reset_batch(self):
+        self.batch = {name: [] for name in PAPER_TABLE_SCHEMA.names}
+
+    def update(self, ppr, year):
+        self.add_paper_stats(ppr, paper_stats(ppr))
+
+    def add_paper_stats(self, ppr, ppr_stats):
+        """ Add a paper whose paper_stats have already been calculated.
+        """
+
+        year, month = get_year_month(ppr['paper_id'])
+        self.batch['paper_id'].append(ppr['paper_id'])
+        self.batch['year'].append(year)
+        self.batch['month'].append(month)
+        self.batch['main_fine_cat'].append(ppr_stats['main_fine_cat'])
+        self.batch['main_coarse_cat'].append(ppr_stats['main_coarse_cat'])
+        self.batch['license'].append(
+            get_license_coarse_name(ppr_stats['license_url'])
+        )
+        for stats_key in PPR_STATS_KEYS:
+            self.batch[stats_key].append(ppr_stats[stats_key])
+        if len(self.batch['paper_id']) >= BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if len(self.batch['paper_id']) == 0:
+            return
+        for stats_key in PAPER_TABLE_INT16_KEYS:
+            vals = self.batch[stats_key]
+            if max(vals) > INT16_MAX:
+                print('saturating {} at {}'.format(stats_key, INT16_MAX))
+                self.batch[stats_key] = [min(v, INT16_MAX) for v in vals]
+        self.record_batches.append(
+            pa.RecordBatch.from_pydict(self.batch, schema=PAPER_TABLE_SCHEMA)
+        )
+        self.reset_batch()
+
+    def merge(self, other):
+        self.flush()
+        other.flush()
+        self.record_batches.extend(other.record_batches)
+
+    def finalize(self):
+        self.flush()
+        return pa.Table.from_batches(
+            self.record_batches, schema=PAPER_TABLE_SCHEMA
+        )
+
+
+class QuantileSketchAccumulator(Accumulator):
+    """ Accumulates a QuantileSketch (see stats_sketch.py) of each of the
+        PPR_STATS_KEYS for each cell of the stats matrices, i.e. the
+        distributions of the per-paper values the matrices sum up.
+    """
+
+    fields = PaperStatsAccumulator.fields
+
+    def __init__(self):
+        self.stats_matrix_indices = get_stats_matrix_indices()
+        self.num_months = len(self.stats_matrix_indices['mon_to_idx'])
+        self.sketch = QuantileSketch(
+            PPR_STATS_KEYS,
+            len(self.stats_matrix_indices['cat_to_idx']) * self.num_months
+        )
+        self.reset_batch()
+
+    def reset_batch(self):
+        self.batch_cell_idxs = []
+        self.batch_values = []
+
+    def update(self, ppr, year):
+        self.add_paper_stats(ppr, paper_stats(ppr))
+
+    def add_paper_stats(self, ppr, ppr_stats):
+        """ Add a paper whose paper_stats have already been calculated.
+        """
+
+        cat_m_idx = self.stats_matrix_indices['cat_to_idx'].get(
+            ppr_stats['main_fine_cat']
+        )
+        if cat_m_idx is None:
+            # not in the stats matrices either
+            return
+        mon_m_idx = self.stats_matrix_indices['mon_to_idx'][ppr_stats['month']]
+        self.batch_cell_idxs.append(cat_m_idx * self.num_months + mon_m_idx)
+        self.batch_values.append(
+            [ppr_stats[stats_key] for stats_key in PPR_STATS_KEYS]
+        )
+        if len(self.batch_cell_idxs) >= BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if len(self.batch_cell_idxs) == 0:
+            return
+        num_stats = len(PPR_STATS_KEYS)
+        self.sketch.add(
+            np.tile(np.arange(num_stats), len(self.batch_cell_idxs)),
+            np.repeat(self.batch_cell_idxs, num_stats),
+            np.array(self.batch_values).ravel()
+        )
+        self.reset_batch()
+
+    def merge(self, other):
+        self.flush()
+        other.flush()
+        self.sketch.merge(other.sketch)
+
+    def finalize(self):
+        self.flush()
+        self.sketch.compact()
+        return self.sketch
+
+
+class SharedPaperStatsAccumulator(Accumulator):
+    """ Feeds several accumulators of per-paper stats (PaperStats-,
+        PaperTable- and QuantileSketchAccumulator), calculating the
+        paper_stats of each paper once and passing them to their
+        add_paper_stats.
+
+        finalize returns the list of their results.
+    """
+
+    def __init__(self, accumulators):
+        self.accumulators = accumulators
+        self.fields = get_fields(accumulators)
+
+    def update(self, ppr, year):
+        ppr_stats = paper_stats(ppr)
+        for acc in self.accumulators:
+            acc.add_paper_stats(ppr, ppr_stats)
+
+    def merge(self, other):
+        for acc, other_acc in zip(self.accumulators, other.accumulators):
+            acc.merge(other_acc)
+
+    def finalize(self):
+        return [acc.finalize() for acc in self.accumulators]
+
+
 def get_save_dir():
     return 'stats'
 
 
-def get_save_matrix_prefix():
-    return 'stats_'
+def get_stats_schema():
+    return {
+        'version': STATS_SCHEMA_VERSION,
+        'stats_keys': STATS_KEYS,
+        'indices': get_stats_matrix_indices()
+    }
+
+
+def get_cache_dir(root_dir, jsonl_fps=None, save_dir=None):
+    """ Directory for the stats of the corpus at root_dir (consisting of
+        jsonl_fps, default: all JSONLs below root_dir), i.e.
+            save_dir/<fingerprint>
+        where the fingerprint covers the file list, sizes and mtimes of the
+        corpus and the stats schema (see manifest.fingerprint_files).
+    """
 
+    if jsonl_fps is None:
+        jsonl_fps = get_jsonl_fps(root_dir)
+    if save_dir is None:
+        save_dir = get_save_dir()
+    fingerprint = fingerprint_files(root_dir, jsonl_fps, get_stats_schema())
+    return os.path.join(save_dir, fingerprint)
 
-def get_save_index_prefix():
-    return 'stats_idx'
 
+def get_stats_dir(root_dir, save_dir=None):
+    """ Directory calc_stats(root_dir) loads persisted stats from.
+    """
 
-def get_stats_matrix_fn(dict_key):
-    fn = '{}{}{}npy'.format(
-        get_save_matrix_prefix(),
-        dict_key,
-        os.path.extsep
-    )
-    return fn
+    jsonl_fps = get_jsonl_fps(root_dir)
+    if len(jsonl_fps) == 0:
+        # see calc_stats
+        return save_dir if save_dir is not None else get_save_dir()
+    return get_cache_dir(root_dir, jsonl_fps, save_dir)
 
 
-def get_stats_index_fn(dict_key):
-    fn = '{}{}{}json'.format(
-        get_save_index_prefix(),
-        dict_key,
-        os.path.extsep
+def save_to_cache(
+        stats_matrix_dict, stats_matrix_indices, root_dir, jsonl_fps,
+        save_dir=None, paper_table=None, sketch=None
+):
+    """ Save the stats calculated from jsonl_fps (and the per-paper table
+        and quantile sketch, if given) to their cache directory (see
+        get_cache_dir), along with a human readable description of the
+        corpus.
+    """
+
+    cache_dir = get_cache_dir(root_dir, jsonl_fps, save_dir)
+    save_to_disk(stats_matrix_dict, stats_matrix_indices, cache_dir, sketch)
+    if paper_table is not None:
+        pq.write_table(paper_table, os.path.join(cache_dir, PAPER_TABLE_FN))
+    with open(os.path.join(cache_dir, CACHE_INFO_FN), 'w') as f:
+        json.dump(
+            {
+                'root_dir': os.path.abspath(root_dir),
+                'num_jsonls': len(jsonl_fps),
+                'size': sum(os.path.getsize(fp) for fp in jsonl_fps),
+                'schema_version': STATS_SCHEMA_VERSION
+            },
+            f, indent=1
+        )
+    return cache_dir
+
+
+def load_paper_table(root_dir, save_dir=None, columns=None, filters=None):
+    """ Load the per-paper stats of the corpus at root_dir (see
+        PaperTableAccumulator) as a pandas DataFrame, or None if they have
+        not been calculated (see calc_stats).
+
+        columns     columns to load, default all
+        filters     row filters, e.g. [('main_coarse_cat', '=', 'grp_cs')]
+                    (see pyarrow.parquet.read_table)
+    """
+
+    table_fp = os.path.join(
+        get_cache_dir(root_dir, save_dir=save_dir), PAPER_TABLE_FN
     )
-    return fn
+    if not os.path.exists(table_fp):
+        return None
+    return pq.read_table(
+        table_fp, columns=columns, filters=filters
+    ).to_pandas()
 
 
-def save_to_disk(stats_matrix_dict, stats_matrix_indices):
-    """ Save stats to disk.
+def save_to_disk(
+        stats_matrix_dict, stats_matrix_indices, save_dir=None, sketch=None
+):
+    """ Save stats (and optionally a quantile sketch) to disk as a single
+        stats cube file (see stats_cube.py).
     """
 
-    save_dir = get_save_dir()
+    if save_dir is None:
+        save_dir = get_save_dir()
 
     print('persisting stats in `{}`'.format(save_dir))
 
     if not os.path.exists(save_dir):
         os.makedirs(save_dir)
 
-    # persist matrices
-    for dict_key, np_arr in stats_matrix_dict.items():
-        fn = get_stats_matrix_fn(dict_key)
-        fp = os.path.join(save_dir, fn)
-        np.save(fp, np_arr)
-
-    # persist indices
-    for dict_key, index_dict in stats_matrix_indices.items():
-        fn = get_stats_index_fn(dict_key)
-        fp = os.path.join(save_dir, fn)
-        with open(fp, 'w') as f:
-            json.dump(index_dict, f)
+    stats_keys = list(stats_matrix_dict.keys())
+    stats_tensor = np.stack([stats_matrix_dict[k] for k in stats_keys])
+    save_cube(
+        os.path.join(save_dir, CUBE_FN),
+        stats_tensor,
+        stats_keys,
+        stats_matrix_indices,
+        sketch=sketch
+    )
 
 
 def load_from_disk(save_dir=None):
     """ Load stats from disk if previously persisted.
-    """
 
-    stats_matrix_dict = {}
-    stats_matrix_indices = {}
+        The stats cube is memory-mapped (copy-on-write, i.e. changes to
+        the returned matrices are not written back), so loading does not
+        read the matrices themselves. Sparse cubes yield CSRMatrix objects
+        (see stats_sparse.py), which StatsCube queries like dense ones.
+        Directories in the legacy format of one file per stat/index are
+        read as before.
+    """
 
     if save_dir is None:
         save_dir = get_save_dir()
     if not os.path.exists(save_dir):
         return None
+    cube_fp = os.path.join(save_dir, CUBE_FN)
+    if not os.path.exists(cube_fp):
+        stats_matrix_dict, stats_matrix_indices = load_legacy_stats(save_dir)
+        if len(stats_matrix_dict) == 0:
+            return None
+        print('loading previously persisted stats from disk')
+        return stats_matrix_dict, stats_matrix_indices
     print('loading previously persisted stats from disk')
-    for fn in os.listdir(save_dir):
-        fp = os.path.join(save_dir, fn)
-        fn_base, ext = os.path.splitext(fn)
-        if ext == '.npy':
-            # load matrix
-            dict_key = fn_base.replace(
-                get_save_matrix_prefix(), ''
-            )
-            stats_matrix_dict[dict_key] = np.load(fp)
-        elif ext == '.json':
-            # load index
-            dict_key = fn_base.replace(
-                get_save_index_prefix(), ''
-            )
-            with open(fp) as f:
-                stats_matrix_indices[dict_key] = json.load(f)
+    stats_layers, stats_keys, stats_matrix_indices = load_cube(
+        cube_fp, mmap_mode='c'
+    )
+    stats_matrix_dict = {
+        stats_key: stats_layers[i] for i, stats_key in enumerate(stats_keys)
+    }
 
     return stats_matrix_dict, stats_matrix_indices
 
@@ -689,8 +1191,38 @@ def load_from_disk(save_dir=None):
 if __name__ == '__main__':
     if len(sys.argv) == 1:
         livetest()
-    if len(sys.argv) != 2:
-        print('Usage: calc_stats.py </path/to/data>')
         sys.exit()
-    root_dir = sys.argv[1]
-    mtrs, idxs = calc_stats(root_dir)
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument('root_dir', help='/path/to/data')
+    parser.add_argument(
+        '--workers', type=int, default=1,
+        help='number of worker processes (default: 1, i.e. serial)'
+    )
+    parser.add_argument(
+        '--manifest',
+        help='/path/to/manifest.json, only re-calculate changed years'
+    )
+    parser.add_argument(
+        '--partial_dir', default='stats_partial',
+        help='where to keep per-year stats with --manifest'
+    )
+    parser.add_argument(
+        '--sketches', action='store_true',
+        help='also calculate quantile sketches of the per-paper stats'
+    )
+    parser.add_argument(
+        '--export', action='store_true',
+        help='also save the stats to {}/{}, which is used when the corpus '
+             'is not available'.format(get_save_dir(), CUBE_FN)
+    )
+    args = parser.parse_args()
+    if args.manifest is not None:
+        mtrs, idxs = calc_stats_incremental(
+            args.root_dir, args.manifest, args.partial_dir, args.workers
+        )
+    else:
+        mtrs, idxs = calc_stats(
+            args.root_dir, workers=args.workers, sketches=args.sketches
+        )
+    if args.export:
+        save_to_disk(mtrs, idxs)
\ No newline at end of file
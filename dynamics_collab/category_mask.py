@@ -0,0 +1,86 @@
+""" Category lists of papers as fixed-width bitmasks.
+
+    Bit i of a mask is set if the category with code i (see
+    arxiv_taxonomy.get_taxonomy_tables, aliases and subsumed archives are
+    resolved) is among the categories. A mask is NUM_WORDS uint64 words,
+    bit i being bit i % 64 of word i // 64. Masks of many papers are a
+    num_papers × NUM_WORDS array.
+
+    A set of categories (e.g. a discipline) is a mask as well, so checking
+    whether a paper has any of its categories is a bitwise AND, done for all
+    papers at once with in_categories.
+
+    Unknown categories have no bit and are ignored.
+
+    Resolving folds more than exact aliases (cs.NA -> math.NA, math.MP ->
+    math-ph, ...) into the canonical categories. The old archives that were
+    subsumed by a category count as that category as well, e.g. cmp-lg ->
+    cs.CL, mtrl-th -> cond-mat.mtrl-sci, supr-con -> cond-mat.supr-con,
+    patt-sol -> nlin.PS and solv-int -> nlin.SI. So filtering papers with
+    masks matches more (older) papers than comparing the category strings:
+    a 1995 cmp-lg paper is in ["cs.CL", ...].
+"""
+
+import numpy as np
+from arxiv_taxonomy import get_taxonomy_tables
+
+
+WORD_BITS = 64
+NUM_CATEGORIES = len(get_taxonomy_tables()['category_keys'])
+NUM_WORDS = (NUM_CATEGORIES + WORD_BITS - 1) // WORD_BITS
+MASK_DTYPE = np.uint64
+
+
+def encode_masks(cat_lists):
+    """ Masks of a list of category lists, as a
+        len(cat_lists) × NUM_WORDS array.
+    """
+
+    category_code = get_taxonomy_tables()['category_code']
+    rows = []
+    codes = []
+    for row, cat_ids in enumerate(cat_lists):
+        for cat_id in cat_ids:
+            code = category_code.get(cat_id)
+            if code is not None:
+                rows.append(row)
+                codes.append(code)
+    rows = np.asarray(rows, dtype=np.int64)
+    codes = np.asarray(codes, dtype=np.int64)
+    masks = np.zeros((len(cat_lists), NUM_WORDS), dtype=MASK_DTYPE)
+    np.bitwise_or.at(
+        masks,
+        (rows, codes // WORD_BITS),
+        np.left_shift(MASK_DTYPE(1), (codes % WORD_BITS).astype(MASK_DTYPE))
+    )
+    return masks
+
+
+def encode_mask(cat_ids):
+    """ Mask of a single category list (e.g. a discipline), as a NUM_WORDS
+        array.
+    """
+
+    return encode_masks([cat_ids])[0]
+
+
+def decode_mask(mask):
+    """ Category IDs of the bits set in a mask.
+    """
+
+    category_keys = get_taxonomy_tables()['category_keys']
+    bits = np.unpackbits(
+        np.asarray(mask, dtype='<u8').view(np.uint8), bitorder='little'
+    )
+    return [category_keys[code] for code in np.flatnonzero(bits)]
+
+
+def in_categories(masks, cat_mask):
+    """ Whether each mask (row of masks) shares a category with cat_mask,
+        as a bool array.
+    """
+
+    return np.any(
+        np.bitwise_and(masks, np.asarray(cat_mask, dtype=MASK_DTYPE)) != 0,
+        axis=-1
+    )
@@ -0,0 +1,195 @@
+""" Citation graph of the corpus as flat, memory-mappable NumPy arrays.
+
+    Every entry in the bib_entries of every paper becomes one edge with
+        src             int32 ID code of the citing paper
+        dst             int32 ID code of the cited paper (-1 if the
+                        reference was not matched to an arXiv paper)
+        year            int16 year of the citing paper
+        src_discipline  int8 code of the citing paper's discipline
+        dst_discipline  int8 code of the reference's discipline (-1 if the
+                        reference has no discipline)
+    ID codes are those of an arxiv_ids.ArxivIds table stored alongside,
+    discipline codes index into disciplines.json. Each array is stored in
+    its own .npy file, so it can be opened with np.load(..., mmap_mode='r').
+
+    Build:
+        python citation_graph.py /path/to/unarXive /path/to/citation_graph
+
+    Load:
+        from citation_graph import load_citation_graph
+        graph = load_citation_graph(graph_dir)
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+from array import array
+import numpy as np
+from arxiv_ids import ArxivIds
+from corpus import get_jsonl_fps, get_year_month, iter_jsonl
+
+
+EDGE_COLUMNS = {
+    'src': np.int32,
+    'dst': np.int32,
+    'year': np.int16,
+    'src_discipline': np.int8,
+    'dst_discipline': np.int8,
+}
+# array module type codes of the columns
+EDGE_TYPECODES = {
+    'src': 'i',
+    'dst': 'i',
+    'year': 'h',
+    'src_discipline': 'b',
+    'dst_discipline': 'b',
+}
+GRAPH_FIELDS = ['paper_id', 'discipline', 'bib_entries']
+
+
+def get_code(code_dict, key):
+    """ Code of key in code_dict, assigning the next free one if needed.
+    """
+
+    code = code_dict.get(key)
+    if code is None:
+        code = len(code_dict)
+        code_dict[key] = code
+    return code
+
+
+def build_citation_graph(root_dir, graph_dir, years=None):
+    """ Extract the citation edges of all papers below root_dir into
+        graph_dir.
+
+        Edges are appended to temporary files after each JSONL file, so
+        memory use is bounded by the edges of one file plus the ID table.
+    """
+
+    os.makedirs(graph_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=graph_dir)
+    tmp_fps = {
+        col: os.path.join(tmp_dir, '{}.bin'.format(col))
+        for col in EDGE_COLUMNS
+    }
+    tmp_files = {col: open(fp, 'wb') for col, fp in tmp_fps.items()}
+    paper_ids = ArxivIds()
+    discipline_codes = {}
+
+    jsonl_fps = get_jsonl_fps(root_dir, years)
+    print('found {} JSONLs to parse'.format(len(jsonl_fps)))
+    try:
+        for fp in jsonl_fps:
+            edges = {
+                col: array(typecode)
+                for col, typecode in EDGE_TYPECODES.items()
+            }
+            for ppr in iter_jsonl(fp, report=True, fields=GRAPH_FIELDS):
+                src = paper_ids.get_code(ppr['paper_id'])
+                year, _ = get_year_month(ppr['paper_id'])
+                src_disc = get_code(
+                    discipline_codes, ppr.get('discipline', '')
+                )
+                for ref in ppr.get('bib_entries', {}).values():
+                    arxiv_id = ref.get('ids', {}).get('arxiv_id', '')
+                    if arxiv_id:
+                        dst = paper_ids.get_code(arxiv_id)
+                    else:
+                        dst = -1
+                    if 'discipline' in ref:
+                        dst_disc = get_code(
+                            discipline_codes, ref['discipline']
+                        )
+                    else:
+                        dst_disc = -1
+                    edges['src'].append(src)
+                    edges['dst'].append(dst)
+                    edges['year'].append(year)
+                    edges['src_discipline'].append(src_disc)
+                    edges['dst_discipline'].append(dst_disc)
+            for col, arr in edges.items():
+                tmp_files[col].write(arr.tobytes())
+    finally:
+        for f in tmp_files.values():
+            f.close()
+
+    # convert raw columns to .npy
+    num_edges = os.path.getsize(tmp_fps['src']) // 4
+    for col, dtype in EDGE_COLUMNS.items():
+        if num_edges > 0:
+            col_arr = np.memmap(tmp_fps[col], dtype=dtype, mode='r')
+        else:
+            col_arr = np.zeros(0, dtype=dtype)
+        np.save(os.path.join(graph_dir, '{}.npy'.format(col)), col_arr)
+        del col_arr
+    shutil.rmtree(tmp_dir)
+    paper_ids.save(graph_dir)
+    with open(os.path.join(graph_dir, 'disciplines.json'), 'w') as f:
+        json.dump(list(discipline_codes.keys()), f)
+    print('stored {} papers and {} citation edges in `{}`'.format(
+        len(paper_ids), num_edges, graph_dir
+    ))
+
+
+def load_citation_graph(graph_dir, mmap=True):
+    """ Load the citation graph as a dict of NumPy arrays (one per edge
+        column), the ArxivIds table (paper_ids) and the list of disciplines.
+
+        With mmap=True, the arrays are memory-mapped rather than read.
+    """
+
+    mmap_mode = 'r' if mmap else None
+    graph = {}
+    for col in EDGE_COLUMNS:
+        graph[col] = np.load(
+            os.path.join(graph_dir, '{}.npy'.format(col)),
+            mmap_mode=mmap_mode
+        )
+    graph['paper_ids'] = ArxivIds.load(graph_dir, mmap=mmap)
+    with open(os.path.join(graph_dir, 'disciplines.json')) as f:
+        graph['disciplines'] = json.load(f)
+    return graph
+
+
+def count_discipline_pairs(graph, years=None):
+    """ Number of citation edges per (citing discipline, cited discipline)
+        pair, for edges whose cited discipline is known and non-empty.
+        years are full years (e.g. [1999, 2022]), default all.
+
+        Returns a dict {(src_discipline, dst_discipline): count}.
+    """
+
+    disciplines = graph['disciplines']
+    mask = graph['dst_discipline'] >= 0
+    if years is not None:
+        mask &= np.isin(graph['year'], [int(y) for y in years])
+    if '' in disciplines:
+        empty_code = disciplines.index('')
+        mask &= graph['dst_discipline'] != empty_code
+    num_discs = len(disciplines)
+    pair_codes = (
+        graph['src_discipline'][mask].astype(np.int64) * num_discs +
+        graph['dst_discipline'][mask]
+    )
+    counts = np.bincount(pair_codes, minlength=num_discs * num_discs)
+    pair_counts = {}
+    for pair_code in np.flatnonzero(counts):
+        src_code, dst_code = divmod(int(pair_code), num_discs)
+        pair_counts[
+            (disciplines[src_code], disciplines[dst_code])
+        ] = int(counts[pair_code])
+    return pair_counts
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('root_dir', help='/path/to/data')
+    parser.add_argument('graph_dir', help='/path/to/citation_graph')
+    parser.add_argument(
+        '--years', nargs='+',
+        help='year folders to extract (default: all)'
+    )
+    args = parser.parse_args()
+    build_citation_graph(args.root_dir, args.graph_dir, args.years)
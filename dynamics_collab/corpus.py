@@ -0,0 +1,364 @@
+""" Streaming access to the unarXive corpus.
+
+    The corpus is laid out as one folder per year (91, 92, ..., 22), each
+    containing JSONL files with one paper per line. Papers are parsed and
+    yielded one at a time, so peak memory is bounded by a single paper
+    rather than a whole file.
+
+    Besides plain .jsonl files, compressed JSONL files (.jsonl.gz,
+    .jsonl.zst) and tar archives of JSONL files (e.g. the year archives
+    91.tar.xz, ...) are streamed directly, decompressing incrementally in
+    a background thread. An archive is skipped if the year folder it would
+    be extracted to exists next to it.
+
+    Usage from other folders of this repo:
+
+        sys.path.append(<path to dynamics_collab>)
+        from corpus import iter_papers
+
+        for ppr in iter_papers(root_dir, years=['21', '22'],
+                               categories=['cs.LG', 'stat.ML'],
+                               fields=['paper_id', 'metadata']):
+            ...
+"""
+
+import gzip
+import os
+import queue
+import sys
+import tarfile
+import threading
+import time
+from paper_json import loads_projected
+
+
+YEARS = [str(y)[2:] for y in range(1991, 2023)]
+JSONL_EXTS = ['.jsonl', '.jsonl.gz', '.jsonl.zst', '.jsonl.zstd']
+ARCHIVE_EXTS = [
+    '.tar', '.tar.xz', '.txz', '.tar.gz', '.tgz', '.tar.bz2', '.tar.zst'
+]
+CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def normalize_year(year):
+    """ Map 1991, '1991', 91 or '91' to the year folder name '91'.
+    """
+
+    year = str(year)
+    if len(year) == 4:
+        year = year[2:]
+    return year.zfill(2)
+
+
+def get_full_year(year):
+    """ Map a year folder name like '91' or '05' to 1991 or 2005.
+    """
+
+    year = normalize_year(year)
+    if year[0] == '9':
+        return int('19' + year)
+    return int('20' + year)
+
+
+def get_year_month(paper_id):
+    """ Year and month of submission encoded in an arXiv ID.
+        e.g.
+            hep-th/9901001 -> (1999, 1)
+            2203.01234 -> (2022, 3)
+    """
+
+    pid = paper_id
+    if '/' in pid:
+        # old format ID
+        pref, pid = pid.split('/')
+    if pid[0] == '9':
+        # years 1991–1999
+        year = int('19' + pid[:2])
+    else:
+        # years 2000–2099
+        year = int('20' + pid[:2])
+    month = int(pid[2:4])
+    return year, month
+
+
+def get_categories(ppr):
+    """ List of arXiv categories of a paper (empty if there are none).
+    """
+
+    return [
+        c for c
+        in ppr.get('metadata', {}).get('categories', '').split(' ')
+        if len(c) > 0  # filter when categories is ''
+    ]
+
+
+def has_category(ppr, categories):
+    """ True if the paper is in at least one of the given categories.
+    """
+
+    return any(cat in categories for cat in get_categories(ppr))
+
+
+def get_source_ext(fn):
+    """ JSONL or archive extension of a file name (e.g. '.tar.xz'), or
+        None if the file is neither.
+    """
+
+    # longest first, s.t. '.jsonl.gz' is not mistaken for '.gz'
+    for ext in sorted(JSONL_EXTS + ARCHIVE_EXTS, key=len, reverse=True):
+        if fn.endswith(ext):
+            return ext
+    return None
+
+
+def is_archive(fp):
+    return get_source_ext(fp) in ARCHIVE_EXTS
+
+
+def get_fp_year(root_dir, fp):
+    """ Year folder name of a file below root_dir (or of a year archive
+        such as 91.tar.xz), or None if the file belongs to no year.
+    """
+
+    rel_path = os.path.relpath(fp, root_dir)
+    top_dir = rel_path.split(os.sep)[0]
+    if top_dir not in YEARS and get_source_ext(top_dir) in ARCHIVE_EXTS:
+        top_dir = top_dir[:-len(get_source_ext(top_dir))]
+    if top_dir in YEARS:
+        return top_dir
+    return None
+
+
+def get_jsonl_fps(root_dir, years=None):
+    """ Sorted list of paths of all non-empty (compressed) JSONL files and
+        JSONL archives below root_dir.
+
+        If years is given, only files inside the respective year folders
+        (or year archives) are returned.
+    """
+
+    if years is not None:
+        years = set(normalize_year(y) for y in years)
+    jsonl_fps = []
+    for path_to_file, subdirs, files in os.walk(root_dir):
+        for fn in files:
+            ext = get_source_ext(fn)
+            if ext is None:
+                continue
+            fp = os.path.join(path_to_file, fn)
+            if ext in ARCHIVE_EXTS and os.path.isdir(fp[:-len(ext)]):
+                # already extracted
+                continue
+            if years is not None and get_fp_year(root_dir, fp) not in years:
+                continue
+            if os.path.getsize(fp) > 0:
+                jsonl_fps.append(fp)
+    return sorted(jsonl_fps)
+
+
+def open_zstd(fp):
+    """ Open a zstd compressed file for streaming decompression.
+    """
+
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError(
+            'reading {} requires the zstandard package'.format(fp)
+        )
+    f = open(fp, 'rb')
+    return zstandard.ZstdDecompressor().stream_reader(f, closefd=True)
+
+
+def open_decompressed(fp):
+    """ Binary file object of the decompressed content of a JSONL file.
+    """
+
+    ext = get_source_ext(fp)
+    if ext == '.jsonl.gz':
+        return gzip.open(fp, 'rb')
+    if ext in ['.jsonl.zst', '.jsonl.zstd']:
+        return open_zstd(fp)
+    return open(fp, 'rb')
+
+
+def iter_chunks(f):
+    while True:
+        chunk = f.read(CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_decompressed_chunks(fp):
+    """ Decompressed content of a compressed JSONL file or of all JSONL
+        members of an archive, in chunks of up to CHUNK_SIZE bytes.
+    """
+
+    if not is_archive(fp):
+        with open_decompressed(fp) as f:
+            yield from iter_chunks(f)
+        return
+    if get_source_ext(fp) == '.tar.zst':
+        fileobj = open_zstd(fp)
+    else:
+        fileobj = open(fp, 'rb')
+    # stream mode (r|*), i.e. no seeking in the compressed data
+    with fileobj, tarfile.open(fileobj=fileobj, mode='r|*') as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            if get_source_ext(member.name) not in JSONL_EXTS:
+                continue
+            f = tar.extractfile(member)
+            if get_source_ext(member.name) == '.jsonl.gz':
+                f = gzip.GzipFile(fileobj=f)
+            yield from iter_chunks(f)
+            # keep last line of a member from running into the next one
+            yield b'\n'
+
+
+class _ProducerError:
+
+    def __init__(self, error):
+        self.error = error
+
+
+def iter_in_background(iterable, queue_size=8):
+    """ Consume iterable in a background thread and yield its items.
+
+        Decompression in lzma, zlib and zstandard releases the GIL, so
+        decompressing in the background overlaps with parsing in the
+        calling thread.
+    """
+
+    q = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    end = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    break
+            else:
+                put(end)
+        except BaseException as e:
+            put(_ProducerError(e))
+        finally:
+            if hasattr(iterable, 'close'):
+                iterable.close()
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = q.get()
+            if item is end:
+                return
+            if isinstance(item, _ProducerError):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+def iter_lines(chunks):
+    """ Split a stream of byte chunks into lines.
+
+        The chunks of a line that is not complete yet are collected and
+        joined once its end is found, so that very long lines are not
+        copied again with every chunk.
+    """
+
+    rest = []
+    for chunk in chunks:
+        rest.append(chunk)
+        if b'\n' not in chunk:
+            continue
+        lines = b''.join(rest).split(b'\n')
+        rest = [lines.pop()]
+        yield from lines
+    rest = b''.join(rest)
+    if rest:
+        yield rest
+
+
+def report_throughput(fp, num_pprs, num_bytes, duration, out=sys.stderr):
+    """ Print papers/s and MB/s for a file that was read.
+    """
+
+    duration = max(duration, 1e-9)
+    print(
+        '{}: {} papers, {:.1f} MB in {:.2f}s ({:.0f} papers/s, {:.1f} MB/s)'
+        .format(
+            fp,
+            num_pprs,
+            num_bytes / 1e6,
+            duration,
+            num_pprs / duration,
+            num_bytes / 1e6 / duration
+        ),
+        file=out
+    )
+
+
+def iter_jsonl(fp, report=False, fields=None):
+    """ Lazily yield the papers in a single (compressed) JSONL file or
+        JSONL archive.
+
+        If fields is given, only these top-level fields of each paper are
+        parsed (see paper_json.loads_projected).
+        If report is True, the file's throughput (based on the
+        decompressed size) is printed once it has been read completely.
+    """
+
+    num_pprs = 0
+    num_bytes = 0
+    t_start = time.perf_counter()
+    if get_source_ext(fp) == '.jsonl':
+        lines = open(fp, 'rb')
+    else:
+        lines = iter_lines(iter_in_background(iter_decompressed_chunks(fp)))
+    try:
+        for line in lines:
+            num_bytes += len(line)
+            if not line.strip():
+                continue
+            num_pprs += 1
+            yield loads_projected(line, fields)
+    finally:
+        lines.close()
+    if report:
+        report_throughput(
+            fp, num_pprs, num_bytes, time.perf_counter() - t_start
+        )
+
+
+def iter_papers(root_dir, years=None, categories=None, report=True,
+                fields=None):
+    """ Lazily yield all papers below root_dir.
+
+        years       restrict to these year folders (e.g. ['91', '22'])
+        categories  only yield papers in at least one of these categories
+        report      print the throughput of each file once it is read
+        fields      only parse these top-level fields of each paper
+    """
+
+    if fields is not None and categories is not None:
+        fields = set(fields) | {'metadata'}
+    for fp in get_jsonl_fps(root_dir, years):
+        for ppr in iter_jsonl(fp, report=report, fields=fields):
+            if categories is not None and not has_category(ppr, categories):
+                continue
+            yield ppr
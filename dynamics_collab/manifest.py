@@ -0,0 +1,146 @@
+""" Manifest of the input files consumed by derived artifacts.
+
+    For each input JSONL file (path relative to the corpus root), the
+    manifest records size, mtime and a content hash. The hash is only
+    recomputed when size or mtime change, so checking an unchanged corpus
+    is a stat() per file.
+
+    For each derived artifact (e.g. the stats partial of one year), it
+    records the hashes of the inputs the artifact was computed from and
+    its output files. An artifact is stale if its inputs were added,
+    removed or changed, or if an output file is missing, so a pipeline
+    can recompute only the affected partitions:
+
+        manifest = Manifest(manifest_fp, root_dir)
+        for year in YEARS:
+            jsonl_fps = get_jsonl_fps(root_dir, years=[year])
+            artifact = 'my_stage/{}'.format(year)
+            if manifest.is_stale(artifact, jsonl_fps, [out_fp]):
+                ...  # compute and write out_fp
+                manifest.record(artifact, jsonl_fps, [out_fp])
+                manifest.save()
+"""
+
+import hashlib
+import json
+import os
+from corpus import CHUNK_SIZE
+
+
+def hash_file(fp):
+    """ Hex digest of a file's content.
+    """
+
+    h = hashlib.blake2b(digest_size=16)
+    with open(fp, 'rb') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def fingerprint_files(root_dir, fps, extra=None):
+    """ Hex digest of the paths (relative to root_dir), sizes and mtimes
+        of fps, and of extra (any JSON serializable value, e.g. a schema).
+
+        Unlike content hashes this only takes a stat() per file, and it
+        changes whenever a file is modified or touched.
+    """
+
+    records = []
+    for fp in sorted(fps):
+        stat = os.stat(fp)
+        records.append(
+            [os.path.relpath(fp, root_dir), stat.st_size, stat.st_mtime_ns]
+        )
+    h = hashlib.blake2b(digest_size=8)
+    h.update(
+        json.dumps([records, extra], sort_keys=True).encode('utf-8')
+    )
+    return h.hexdigest()
+
+
+class Manifest:
+    """ Input file records and artifact dependencies, persisted as JSON.
+    """
+
+    def __init__(self, manifest_fp, root_dir):
+        self.manifest_fp = manifest_fp
+        self.root_dir = root_dir
+        self.inputs = {}
+        self.artifacts = {}
+        if os.path.exists(manifest_fp):
+            with open(manifest_fp) as f:
+                manifest = json.load(f)
+            self.inputs = manifest['inputs']
+            self.artifacts = manifest['artifacts']
+
+    def save(self):
+        """ Write the manifest (atomically, so an interrupted run leaves
+            the previous version intact).
+        """
+
+        manifest_dir = os.path.dirname(os.path.abspath(self.manifest_fp))
+        os.makedirs(manifest_dir, exist_ok=True)
+        tmp_fp = self.manifest_fp + '.tmp'
+        with open(tmp_fp, 'w') as f:
+            json.dump(
+                {'inputs': self.inputs, 'artifacts': self.artifacts},
+                f, indent=1, sort_keys=True
+            )
+        os.replace(tmp_fp, self.manifest_fp)
+
+    def get_input_hash(self, fp):
+        """ Content hash of an input file, recomputed only if its size or
+            mtime differ from the recorded ones.
+        """
+
+        rel_fp = os.path.relpath(fp, self.root_dir)
+        stat = os.stat(fp)
+        record = self.inputs.get(rel_fp)
+        if (
+            record is not None and
+            record['size'] == stat.st_size and
+            record['mtime'] == stat.st_mtime_ns
+        ):
+            return record['hash']
+        print('hashing {}'.format(fp))
+        self.inputs[rel_fp] = {
+            'size': stat.st_size,
+            'mtime': stat.st_mtime_ns,
+            'hash': hash_file(fp)
+        }
+        return self.inputs[rel_fp]['hash']
+
+    def get_input_hashes(self, jsonl_fps):
+        return {
+            os.path.relpath(fp, self.root_dir): self.get_input_hash(fp)
+            for fp in jsonl_fps
+        }
+
+    def is_stale(self, artifact, jsonl_fps, output_fps=()):
+        """ True if artifact has not been recorded for exactly the current
+            contents of jsonl_fps, or if one of its outputs is missing.
+        """
+
+        record = self.artifacts.get(artifact)
+        if record is None:
+            return True
+        if any(not os.path.exists(fp) for fp in output_fps):
+            return True
+        return record['inputs'] != self.get_input_hashes(jsonl_fps)
+
+    def record(self, artifact, jsonl_fps, output_fps=()):
+        """ Record that artifact was computed from the current contents of
+            jsonl_fps (call save() to persist).
+        """
+
+        self.artifacts[artifact] = {
+            'inputs': self.get_input_hashes(jsonl_fps),
+            'outputs': list(output_fps)
+        }
+
+    def forget(self, artifact):
+        self.artifacts.pop(artifact, None)
@@ -0,0 +1,210 @@
+""" Columnar store of per-paper metadata.
+
+    Most analyses only need a paper's ID, categories, discipline, license,
+    versions, authors or the IDs of its references. Parsing the full-text
+    JSONL for that means reading hundreds of GB of body text, so this module
+    extracts the metadata once into a typed Parquet table partitioned by
+    year (one directory year=<YYYY> per year), and loads it back as a
+    pandas DataFrame.
+
+    Build:
+        python metadata_store.py /path/to/unarXive /path/to/metadata_store
+
+    Load:
+        from metadata_store import load_metadata
+        df = load_metadata(store_dir, years=[2021, 2022],
+                           columns=['paper_id', 'categories'])
+"""
+
+import argparse
+import os
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from corpus import get_jsonl_fps, get_year_month, iter_jsonl
+
+
+METADATA_SCHEMA = pa.schema([
+    ('paper_id', pa.string()),
+    ('month', pa.int8()),
+    ('title', pa.string()),
+    ('has_abstract', pa.bool_()),
+    # null if the metadata has no categories field
+    ('categories', pa.list_(pa.string())),
+    ('discipline', pa.string()),
+    ('license', pa.string()),
+    ('versions', pa.list_(pa.struct([
+        ('version', pa.string()),
+        ('created', pa.string())
+    ]))),
+    ('authors_parsed', pa.list_(pa.list_(pa.string()))),
+    # keys of bib_entries and the (OpenAlex) discipline of each entry
+    # (null if the entry has no discipline field)
+    ('bib_entry_ids', pa.list_(pa.string())),
+    ('bib_entry_disciplines', pa.list_(pa.string())),
+    # non-empty arXiv IDs of referenced papers
+    ('cited_arxiv_ids', pa.list_(pa.string())),
+])
+# top-level fields of a paper needed to fill the table
+METADATA_FIELDS = [
+    'paper_id', 'metadata', 'discipline', 'abstract', 'bib_entries'
+]
+PARTITIONING = ds.partitioning(
+    pa.schema([('year', pa.int16())]),
+    flavor='hive'
+)
+BATCH_SIZE = 10000
+
+
+def get_cited_arxiv_ids(ppr):
+    """ arXiv IDs of the papers referenced in a paper's bib_entries.
+    """
+
+    cited_arxiv_ids = []
+    for ref in ppr.get('bib_entries', {}).values():
+        arxiv_id = ref.get('ids', {}).get('arxiv_id', '')
+        if arxiv_id:
+            cited_arxiv_ids.append(arxiv_id)
+    return cited_arxiv_ids
+
+
+def get_metadata_row(ppr):
+    """ Row of the metadata table for a single paper.
+    """
+
+    metadata = ppr.get('metadata', {})
+    year, month = get_year_month(ppr['paper_id'])
+    if 'categories' in metadata:
+        categories = [c for c in metadata['categories'].split(' ') if c]
+    else:
+        categories = None
+    bib_entries = ppr.get('bib_entries', {})
+    row = {
+        'paper_id': ppr['paper_id'],
+        'month': month,
+        'title': metadata.get('title'),
+        'has_abstract': 'abstract' in ppr,
+        'categories': categories,
+        'discipline': ppr.get('discipline'),
+        'license': metadata.get('license'),
+        'versions': [
+            {'version': v.get('version'), 'created': v.get('created')}
+            for v in metadata.get('versions', [])
+        ],
+        'authors_parsed': metadata.get('authors_parsed', []),
+        'bib_entry_ids': list(bib_entries.keys()),
+        'bib_entry_disciplines': [
+            ref.get('discipline') for ref in bib_entries.values()
+        ],
+        'cited_arxiv_ids': get_cited_arxiv_ids(ppr),
+    }
+    return year, row
+
+
+def get_partition_fp(store_dir, year):
+    return os.path.join(store_dir, 'year={}'.format(year), 'part-0.parquet')
+
+
+def build_metadata_store(root_dir, store_dir, years=None):
+    """ Extract the metadata of all papers below root_dir into store_dir.
+
+        Rows are written in batches of BATCH_SIZE papers, so memory use
+        does not depend on the corpus size.
+    """
+
+    writers = {}
+    batches = {}
+
+    def flush(year):
+        if len(batches[year]) == 0:
+            return
+        if year not in writers:
+            fp = get_partition_fp(store_dir, year)
+            os.makedirs(os.path.dirname(fp), exist_ok=True)
+            writers[year] = pq.ParquetWriter(fp, METADATA_SCHEMA)
+        table = pa.Table.from_pylist(batches[year], schema=METADATA_SCHEMA)
+        writers[year].write_table(table)
+        batches[year] = []
+
+    jsonl_fps = get_jsonl_fps(root_dir, years)
+    print('found {} JSONLs to parse'.format(len(jsonl_fps)))
+    num_pprs = 0
+    for fp in jsonl_fps:
+        for ppr in iter_jsonl(fp, report=True, fields=METADATA_FIELDS):
+            year, row = get_metadata_row(ppr)
+            batches.setdefault(year, []).append(row)
+            if len(batches[year]) >= BATCH_SIZE:
+                flush(year)
+            num_pprs += 1
+    for year in batches:
+        flush(year)
+    for writer in writers.values():
+        writer.close()
+    print('stored metadata of {} papers in `{}`'.format(num_pprs, store_dir))
+
+
+def filter_by_categories(table, categories):
+    """ Rows of table with at least one of the given categories.
+    """
+
+    cats_col = table.column('categories')
+    flat_cats = pc.list_flatten(cats_col)
+    parent_rows = pc.list_parent_indices(cats_col)
+    in_cats = pc.is_in(flat_cats, value_set=pa.array(categories))
+    rows = np.unique(pc.filter(parent_rows, in_cats).to_numpy())
+    return table.take(rows)
+
+
+def load_metadata_table(store_dir, years=None, columns=None,
+                        categories=None):
+    """ Load the metadata store as a pyarrow Table.
+
+        years       full years (e.g. [1999, 2022]) to load, default all
+        columns     columns to load, default all (plus year)
+        categories  only rows with at least one of these categories
+    """
+
+    dataset = ds.dataset(store_dir, format='parquet',
+                         partitioning=PARTITIONING)
+    filter_expr = None
+    if years is not None:
+        years = [int(y) for y in years]
+        filter_expr = ds.field('year').isin(years)
+    load_columns = columns
+    if columns is not None:
+        load_columns = list(columns)
+        if 'year' not in load_columns:
+            load_columns.append('year')
+        if categories is not None and 'categories' not in load_columns:
+            load_columns.append('categories')
+    table = dataset.to_table(columns=load_columns, filter=filter_expr)
+    if categories is not None:
+        table = filter_by_categories(table, categories)
+        if columns is not None and 'categories' not in columns:
+            table = table.drop(['categories'])
+    return table
+
+
+def load_metadata(store_dir, years=None, columns=None, categories=None):
+    """ Load the metadata store as a pandas DataFrame.
+
+        See load_metadata_table for the arguments.
+    """
+
+    return load_metadata_table(
+        store_dir, years, columns, categories
+    ).to_pandas()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('root_dir', help='/path/to/data')
+    parser.add_argument('store_dir', help='/path/to/metadata_store')
+    parser.add_argument(
+        '--years', nargs='+',
+        help='year folders to extract (default: all)'
+    )
+    args = parser.parse_args()
+    build_metadata_store(args.root_dir, args.store_dir, args.years)
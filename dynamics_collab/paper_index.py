@@ -0,0 +1,172 @@
+""" Byte-offset index for random access to single papers.
+
+    For every paper in the plain .jsonl files of the corpus, the index
+    stores the file, byte offset and length of its line, so a paper can be
+    read with one seek instead of scanning a year folder. Compressed files
+    and archives cannot be seeked into and are not indexed.
+
+    The index is stored in a directory as
+        ids.npy, sorted_ids.npy, sorted_codes.npy   ArxivIds table of the
+                                                    paper IDs, code = row
+        file_idx.npy, offset.npy, length.npy        location of each paper
+        files.json                                  root_dir and the paths
+                                                    of the JSONL files
+                                                    relative to it
+
+    Build:
+        python paper_index.py /path/to/unarXive /path/to/paper_index
+
+    Use:
+        from paper_index import PaperIndex
+        index = PaperIndex.load(index_dir)
+        ppr = index.get_paper('quant-ph/0001014')
+        for ppr in index.sample_papers(10, years=[2021]):
+            ...
+"""
+
+import argparse
+import json
+import os
+import numpy as np
+from arxiv_ids import ArxivIds
+from corpus import get_full_year, get_jsonl_fps, get_source_ext
+from paper_json import loads_projected
+
+
+INDEX_COLUMNS = {
+    'file_idx': np.int32,
+    'offset': np.int64,
+    'length': np.int32,
+}
+
+
+def index_jsonl(fp):
+    """ Yield (paper_id, offset, length) for each paper in a .jsonl file.
+    """
+
+    offset = 0
+    with open(fp, 'rb') as f:
+        for line in f:
+            if line.strip():
+                paper_id = loads_projected(line, ['paper_id'])['paper_id']
+                yield paper_id, offset, len(line)
+            offset += len(line)
+
+
+def build_paper_index(root_dir, index_dir, years=None):
+    """ Index all papers in the .jsonl files below root_dir.
+
+        If a paper ID occurs more than once, the first occurrence is used.
+    """
+
+    paper_ids = ArxivIds()
+    columns = {col: [] for col in INDEX_COLUMNS}
+    files = []
+    for fp in get_jsonl_fps(root_dir, years):
+        if get_source_ext(fp) != '.jsonl':
+            print('skipping compressed file {}'.format(fp))
+            continue
+        file_idx = len(files)
+        files.append(os.path.relpath(fp, root_dir))
+        for paper_id, offset, length in index_jsonl(fp):
+            if paper_ids.get_code(paper_id) < len(columns['offset']):
+                print('skipping duplicate paper {} in {}'.format(paper_id, fp))
+                continue
+            columns['file_idx'].append(file_idx)
+            columns['offset'].append(offset)
+            columns['length'].append(length)
+    os.makedirs(index_dir, exist_ok=True)
+    paper_ids.save(index_dir)
+    for col, dtype in INDEX_COLUMNS.items():
+        np.save(
+            os.path.join(index_dir, '{}.npy'.format(col)),
+            np.array(columns[col], dtype=dtype)
+        )
+    with open(os.path.join(index_dir, 'files.json'), 'w') as f:
+        json.dump({'root_dir': os.path.abspath(root_dir), 'files': files}, f)
+    print('indexed {} papers in {} files'.format(len(paper_ids), len(files)))
+
+
+class PaperIndex:
+    """ Random access to papers through an index built by
+        build_paper_index.
+    """
+
+    def __init__(self, paper_ids, columns, root_dir, files):
+        self.paper_ids = paper_ids
+        self.file_idx = columns['file_idx']
+        self.offset = columns['offset']
+        self.length = columns['length']
+        self.root_dir = root_dir
+        self.files = files
+
+    def __len__(self):
+        return len(self.offset)
+
+    @classmethod
+    def load(cls, index_dir, root_dir=None):
+        """ Load (memory-map) an index. root_dir overrides the corpus
+            location recorded when the index was built.
+        """
+
+        paper_ids = ArxivIds.load(index_dir)
+        columns = {
+            col: np.load(
+                os.path.join(index_dir, '{}.npy'.format(col)), mmap_mode='r'
+            )
+            for col in INDEX_COLUMNS
+        }
+        with open(os.path.join(index_dir, 'files.json')) as f:
+            files_info = json.load(f)
+        if root_dir is None:
+            root_dir = files_info['root_dir']
+        return cls(paper_ids, columns, root_dir, files_info['files'])
+
+    def read_line(self, code):
+        fp = os.path.join(self.root_dir, self.files[self.file_idx[code]])
+        with open(fp, 'rb') as f:
+            f.seek(int(self.offset[code]))
+            return f.read(int(self.length[code]))
+
+    def get_paper(self, paper_id, fields=None):
+        """ Parse a single paper (only the given top-level fields, if
+            fields is given). Raises KeyError if the paper is not indexed.
+        """
+
+        code = self.paper_ids.encode([paper_id])[0]
+        if code == -1:
+            raise KeyError(paper_id)
+        return loads_projected(self.read_line(code), fields)
+
+    def sample_ids(self, n, years=None, seed=None):
+        """ IDs of n papers drawn uniformly without replacement, optionally
+            only from the given years (e.g. [1999, '22']).
+        """
+
+        codes = np.arange(len(self))
+        if years is not None:
+            paper_years, _ = self.paper_ids.year_month(codes)
+            full_years = [get_full_year(y) for y in years]
+            codes = codes[np.isin(paper_years, full_years)]
+        rng = np.random.default_rng(seed)
+        sample = rng.choice(codes, size=min(n, len(codes)), replace=False)
+        return self.paper_ids.decode(sample).tolist()
+
+    def sample_papers(self, n, years=None, seed=None, fields=None):
+        """ Lazily yield n randomly sampled papers (see sample_ids).
+        """
+
+        for paper_id in self.sample_ids(n, years, seed):
+            yield self.get_paper(paper_id, fields)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('root_dir', help='/path/to/data')
+    parser.add_argument('index_dir', help='/path/to/paper_index')
+    parser.add_argument(
+        '--years', nargs='+',
+        help='year folders to index (default: all)'
+    )
+    args = parser.parse_args()
+    build_paper_index(args.root_dir, args.index_dir, args.years)
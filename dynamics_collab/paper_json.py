@@ -0,0 +1,148 @@
+""" Parsing of unarXive JSONL lines restricted to a set of top-level fields.
+
+    Most analyses only need a few top-level fields of a paper (e.g.
+    paper_id, metadata and bib_entries), but json.loads builds the large
+    body_text and ref_entries subtrees of every paper as well.
+
+    loads_projected(line, fields) avoids this by
+        1. parsing the top-level fields from the front of the line and
+           stopping as soon as all requested fields are found, or as soon
+           as it reaches an unrequested array/object (e.g. body_text), and
+        2. parsing the remaining requested fields from the shortest suffix
+           of the line that contains them, i.e. starting at the last
+           occurrence of a remaining field's key. A key-value pair followed
+           by the closing brace of the line can only be a top-level one,
+           so '{' + suffix is valid JSON exactly if the guess was right.
+    If the guess was wrong (e.g. because a nested object has a key of the
+    same name), the line is parsed as a whole.
+
+    Requested large fields (LARGE_FIELDS, e.g. body_text) are not parsed
+    from the front, and if the suffix would span most of the line
+    (FULL_PARSE_SHARE), the line is parsed as a whole right away, since
+    loads_full is faster than parsing almost all of it piecewise.
+
+    The suffix is parsed with orjson if it is installed, and with the
+    json module otherwise.
+"""
+
+import json
+import re
+from json.decoder import scanstring
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+DECODER = json.JSONDecoder()
+# top-level fields that make up most of an unarXive paper
+LARGE_FIELDS = {'body_text', 'bib_entries', 'ref_entries'}
+# parse the whole line if the suffix to parse is longer than this share of it
+FULL_PARSE_SHARE = 0.5
+
+
+def loads_full(line):
+    """ Parse a complete line (str or bytes).
+    """
+
+    if orjson is not None:
+        return orjson.loads(line)
+    return json.loads(line)
+
+
+def project(ppr, fields):
+    return {k: v for k, v in ppr.items() if k in fields}
+
+
+def parse_prefix(line, fields, ppr):
+    """ Parse top-level fields of line from the front into ppr until all
+        requested fields are found or an unrequested or large (see
+        LARGE_FIELDS) array/object is reached.
+
+        Returns the position in line where parsing stopped, or None if the
+        whole object was parsed.
+    """
+
+    idx = WHITESPACE.match(line, 0).end()
+    if line[idx] != '{':
+        raise ValueError('not a JSON object')
+    idx = WHITESPACE.match(line, idx + 1).end()
+    while line[idx] != '}':
+        if all(field in ppr for field in fields):
+            return idx
+        key_start = idx
+        key, idx = scanstring(line, idx + 1)
+        idx = WHITESPACE.match(line, idx).end()
+        if line[idx] != ':':
+            raise ValueError('expected ":" at {}'.format(idx))
+        idx = WHITESPACE.match(line, idx + 1).end()
+        if line[idx] in '[{' and (key not in fields or key in LARGE_FIELDS):
+            return key_start
+        val, idx = DECODER.raw_decode(line, idx)
+        if key in fields:
+            ppr[key] = val
+        idx = WHITESPACE.match(line, idx).end()
+        if line[idx] == ',':
+            idx = WHITESPACE.match(line, idx + 1).end()
+    return None
+
+
+def find_last_key(line, key, start):
+    """ Position of the last occurrence of key as an object key in
+        line[start:], or -1.
+    """
+
+    needle = '"{}"'.format(key)
+    end = len(line)
+    while True:
+        pos = line.rfind(needle, start, end)
+        if pos == -1:
+            return -1
+        after = WHITESPACE.match(line, pos + len(needle)).end()
+        if after < len(line) and line[after] == ':':
+            return pos
+        end = pos
+
+
+def loads_projected(line, fields=None):
+    """ Parse a JSONL line (str or bytes) into a dict that contains only
+        the given top-level fields (all fields if fields is None).
+    """
+
+    if fields is None:
+        return loads_full(line)
+    raw_line = line
+    if isinstance(line, bytes):
+        line = line.decode('utf-8')
+    fields = set(fields)
+    ppr = {}
+    try:
+        stop_idx = parse_prefix(line, fields, ppr)
+        missing = [field for field in fields if field not in ppr]
+        if stop_idx is None or len(missing) == 0:
+            return ppr
+        key_positions = {
+            field: find_last_key(line, field, stop_idx) for field in missing
+        }
+        found_positions = [
+            pos for pos in key_positions.values() if pos != -1
+        ]
+        if len(found_positions) == 0:
+            # none of the missing fields occurs in the line at all
+            return ppr
+        suffix_start = min(found_positions)
+        if len(line) - suffix_start > FULL_PARSE_SHARE * len(line):
+            return project(loads_full(raw_line), fields)
+        suffix = loads_full('{' + line[suffix_start:])
+    except (ValueError, IndexError):
+        # ValueError includes json's and orjson's JSONDecodeError
+        return project(loads_full(raw_line), fields)
+    for field, pos in key_positions.items():
+        if pos != -1 and field not in suffix:
+            # the last occurrence of the field's key is a nested one, so
+            # a top-level occurrence would precede the suffix
+            return project(loads_full(raw_line), fields)
+    ppr.update(project(suffix, fields))
+    return ppr
@@ -0,0 +1,144 @@
+""" Single pass over the corpus feeding any number of analyses.
+
+    Each analysis is an Accumulator with
+        fields      top-level paper fields it needs (None: all fields)
+        update      called once per paper (and the paper's year folder)
+        merge       adds the state of another accumulator of the same kind
+                    that has seen a different set of papers
+        finalize    returns the analysis result
+    scan() reads and parses every paper once (only the union of the
+    fields the accumulators need) and passes it to all accumulators.
+
+    Usage:
+        from scanner import scan
+        stats_mtrxs, ml_df = scan(
+            root_dir,
+            [PaperStatsAccumulator(), MLProportionAccumulator(years)],
+            years=years,
+            workers=8
+        )
+"""
+
+import copy
+import multiprocessing as mp
+import os
+from corpus import get_fp_year, get_jsonl_fps, iter_jsonl, normalize_year
+
+
+class Accumulator:
+    """ Base class of the analyses run by scan.
+    """
+
+    fields = None
+
+    def update(self, ppr, year):
+        """ Add a paper. year is the name of the paper's year folder
+            (e.g. '99'), or None for files outside year folders.
+        """
+
+        raise NotImplementedError
+
+    def merge(self, other):
+        """ Add the state of other (which has seen different papers).
+        """
+
+        raise NotImplementedError
+
+    def finalize(self):
+        raise NotImplementedError
+
+
+def is_mergeable(acc):
+    return type(acc).merge is not Accumulator.merge
+
+
+def get_fields(accumulators):
+    """ Union of the fields needed by the accumulators (None: all).
+    """
+
+    fields = set()
+    for acc in accumulators:
+        if acc.fields is None:
+            return None
+        fields.update(acc.fields)
+    return sorted(fields)
+
+
+def scan_files(root_dir, jsonl_fps, accumulators, report=True):
+    """ Feed the papers of the given files to the accumulators.
+    """
+
+    fields = get_fields(accumulators)
+    for fp in jsonl_fps:
+        year = get_fp_year(root_dir, fp)
+        for ppr in iter_jsonl(fp, report=report, fields=fields):
+            for acc in accumulators:
+                acc.update(ppr, year)
+    return accumulators
+
+
+def split_jsonl_fps(jsonl_fps, num_splits):
+    """ Split files into num_splits subsets of roughly equal total size
+        (largest file first into the currently smallest subset).
+    """
+
+    splits = [[] for _ in range(num_splits)]
+    split_sizes = [0] * num_splits
+    for fp in sorted(jsonl_fps, key=os.path.getsize, reverse=True):
+        i = split_sizes.index(min(split_sizes))
+        splits[i].append(fp)
+        split_sizes[i] += os.path.getsize(fp)
+    return [split for split in splits if len(split) > 0]
+
+
+def _scan_split(args):
+    return scan_files(*args)
+
+
+def scan(root_dir, accumulators, years=None, workers=1, report=True):
+    """ Scan all papers below root_dir (only in the given year folders, in
+        the given order, if years is given) and return the finalized
+        accumulators' results.
+
+        With workers > 1, the files are split among that many worker
+        processes, each of which feeds a copy of the (empty) accumulators;
+        the copies are then merged. This requires all accumulators to
+        implement merge.
+    """
+
+    jsonl_fps = get_jsonl_fps(root_dir, years)
+    if years is not None:
+        # scan years in the given order (matters for accumulators that are
+        # not mergeable, i.e. order dependent)
+        year_order = [normalize_year(y) for y in years]
+        jsonl_fps.sort(
+            key=lambda fp: year_order.index(get_fp_year(root_dir, fp))
+        )
+    print('found {} JSONLs to parse'.format(len(jsonl_fps)))
+    if workers > 1 and len(jsonl_fps) > 1:
+        not_mergeable = [
+            type(acc).__name__ for acc in accumulators
+            if not is_mergeable(acc)
+        ]
+        if len(not_mergeable) > 0:
+            raise ValueError(
+                'cannot scan in parallel, {} not mergeable'.format(
+                    ', '.join(not_mergeable)
+                )
+            )
+        fp_splits = split_jsonl_fps(jsonl_fps, workers)
+        print('scanning with {} worker processes'.format(len(fp_splits)))
+        # copy the empty accumulators up front, the pool pickles task
+        # arguments lazily, i.e. possibly after the first merges
+        tasks = [
+            (root_dir, fp_split, copy.deepcopy(accumulators), report)
+            for fp_split in fp_splits
+        ]
+        with mp.Pool(len(fp_splits)) as pool:
+            # keep merge order deterministic
+            for partial_accs in pool.imap(_scan_split, tasks):
+                for acc, partial_acc in zip(accumulators, partial_accs):
+                    acc.merge(partial_acc)
+    else:
+        scan_files(root_dir, jsonl_fps, accumulators, report)
+    return [acc.finalize() for acc in accumulators]
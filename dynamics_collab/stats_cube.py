@@ -0,0 +1,639 @@
+""" Single-file container for the stats calculated by calc_stats.
+
+    A stats cube file holds all stats layers (num_stats × num_categories ×
+    num_months) together with their keys and axis indices:
+
+        magic           8 bytes  b'STATCUBE'
+        version         uint32   (little endian)
+        header length   uint32   (little endian)
+        header          JSON: layout, dtype, shape, stats_keys, indices,
+                        blocks (dtype, length and offset of each array)
+        blocks          raw arrays, each starting at a multiple of
+                        ALIGNMENT bytes
+
+    In the 'dense' layout, the only block ('data') is the C-order tensor.
+    Mostly empty tensors are stored in the 'csr' layout instead, i.e. as
+    one CSR matrix of (num_stats * num_categories) rows (blocks 'data',
+    'indices' and 'indptr', see stats_sparse.py). save_cube picks the
+    layout by density, so adding dimensions to the stats does not blow up
+    the file size. Optionally, the blocks 'sketch_keys' and 'sketch_counts'
+    hold a QuantileSketch of the per-paper stats (see stats_sketch.py).
+
+    Loading only parses the header and memory-maps the blocks, so only the
+    layers/slices that are actually used are read from disk. Version 1
+    files (dense, without blocks) are still read.
+
+    A StatsCube wraps the loaded (or freshly calculated) stats for
+    queries along the arXiv taxonomy (group/archive/category) and time
+    (year/month):
+
+        cube = StatsCube.load('stats/stats.cube')
+        cube.sum('num_pprs', archive='cs', start='2015', end='2019-06')
+        grps, years, vals = cube.rollup('num_pprs', 'group', 'year')
+        grps, years, rates = cube.ratio('num_refs_linked', 'num_refs')
+        grps, years, medians = cube.quantiles('num_refs', [0.5])
+
+    Roll-ups are cached, so repeatedly generating plots does not re-sum
+    the matrices. Cells of categories that did not exist in a month (per
+    the taxonomy dates) are dead; ratios are NaN instead of 0 where all
+    cells of a roll-up are dead (see StatsCube.active).
+
+    Legacy stats directories (one stats_<key>.npy per stat plus
+    stats_idx<name>.json per index) can be converted with
+        python stats_cube.py /path/to/stats
+
+    The corpus independent stats/stats.cube is committed (the per-corpus
+    caches in its sub directories are not). It is regenerated with
+        python calc_stats.py /path/to/unarXive --export
+"""
+
+import json
+import os
+import struct
+import sys
+import numpy as np
+from arxiv_taxonomy import ARCHIVES, CATEGORIES, get_active_mask
+from stats_query import aggregate, prefix_sums, range_sums, ratio
+from stats_sketch import ALPHA, QuantileSketch, get_quantiles
+from stats_sparse import CSRMatrix, density, to_dense
+
+
+MAGIC = b'STATCUBE'
+VERSION = 2
+ALIGNMENT = 64
+PREAMBLE = struct.Struct('<8sII')
+CUBE_FN = 'stats.cube'
+LEGACY_MATRIX_PREFIX = 'stats_'
+LEGACY_INDEX_PREFIX = 'stats_idx'
+# store sparse below this fraction of non-zero entries (CSR needs 12 bytes
+# per non-zero float64 entry vs. 8 bytes per entry for dense, queries on
+# CSR are slower though)
+DENSITY_THRESHOLD = 0.25
+LAYOUTS = ['dense', 'csr']
+
+
+def get_layout(stats_tensor):
+    if density(stats_tensor) < DENSITY_THRESHOLD:
+        return 'csr'
+    return 'dense'
+
+
+def save_cube(
+        fp, stats_tensor, stats_keys, indices, layout=None, sketch=None
+):
+    """ Write a stats tensor (one layer per key in stats_keys) and its axis
+        indices to fp. The file is replaced atomically.
+
+        layout is 'dense' or 'csr' (default: chosen by the density of the
+        tensor, see DENSITY_THRESHOLD).
+
+        A QuantileSketch of the same cells (see stats_sketch.py) can be
+        stored along with the tensor.
+    """
+
+    stats_tensor = np.ascontiguousarray(stats_tensor)
+    assert stats_tensor.shape[0] == len(stats_keys)
+    if layout is None:
+        layout = get_layout(stats_tensor)
+    if layout not in LAYOUTS:
+        raise ValueError('unknown stats cube layout {}'.format(layout))
+    if layout == 'dense':
+        blocks = [('data', stats_tensor)]
+    else:
+        # all layers as one (num_stats * num_categories) × num_months matrix
+        num_stats, num_cats, num_months = stats_tensor.shape
+        csr = CSRMatrix.from_dense(
+            stats_tensor.reshape(num_stats * num_cats, num_months)
+        )
+        blocks = [
+            ('data', csr.data),
+            ('indices', csr.indices),
+            ('indptr', csr.indptr)
+        ]
+    if sketch is not None:
+        sketch.compact()
+        blocks += [
+            ('sketch_keys', np.asarray(sketch.keys)),
+            ('sketch_counts', np.asarray(sketch.counts))
+        ]
+    header = {
+        'layout': layout,
+        'dtype': stats_tensor.dtype.str,
+        'shape': list(stats_tensor.shape),
+        'stats_keys': list(stats_keys),
+        'indices': indices,
+        'blocks': {
+            name: {'dtype': arr.dtype.str, 'length': arr.size, 'offset': 0}
+            for name, arr in blocks
+        }
+    }
+    if sketch is not None:
+        header['sketch'] = {
+            'stats_keys': sketch.stats_keys,
+            'num_cells': sketch.num_cells,
+            'alpha': ALPHA
+        }
+    # offsets depend on the header length, so serialize twice
+    header_len = (
+        len(json.dumps(header).encode('utf-8')) + 32 * (len(blocks) + 1)
+    )
+    offset = PREAMBLE.size + header_len
+    for name, arr in blocks:
+        offset += -offset % ALIGNMENT
+        header['blocks'][name]['offset'] = offset
+        offset += arr.nbytes
+    header_bytes = json.dumps(header).encode('utf-8')
+    data_offset = header['blocks'][blocks[0][0]]['offset']
+    header_bytes += b' ' * (data_offset - PREAMBLE.size - len(header_bytes))
+
+    tmp_fp = fp + '.tmp'
+    with open(tmp_fp, 'wb') as f:
+        f.write(PREAMBLE.pack(MAGIC, VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        for name, arr in blocks:
+            f.write(b'\0' * (header['blocks'][name]['offset'] - f.tell()))
+            f.write(arr.tobytes())
+    os.replace(tmp_fp, fp)
+
+
+def read_header(fp):
+    with open(fp, 'rb') as f:
+        magic, version, header_len = PREAMBLE.unpack(f.read(PREAMBLE.size))
+        if magic != MAGIC:
+            raise ValueError('{} is not a stats cube file'.format(fp))
+        if version > VERSION:
+            raise ValueError(
+                '{} has version {}, only versions up to {} are '
+                'supported'.format(fp, version, VERSION)
+            )
+        header = json.loads(f.read(header_len).decode('utf-8'))
+    if version == 1:
+        # dense only, single data offset
+        header['layout'] = 'dense'
+        header['blocks'] = {
+            'data': {
+                'dtype': header['dtype'],
+                'length': int(np.prod(header['shape'])),
+                'offset': header['offset']
+            }
+        }
+    return header
+
+
+def load_blocks(fp, header, mmap_mode='r'):
+    """ Memory-map the blocks of a stats cube file.
+    """
+
+    blocks = {}
+    for name, block in header['blocks'].items():
+        if block['length'] == 0:
+            # cannot memory-map zero bytes
+            blocks[name] = np.zeros(0, dtype=np.dtype(block['dtype']))
+            continue
+        blocks[name] = np.memmap(
+            fp,
+            dtype=np.dtype(block['dtype']),
+            mode=mmap_mode,
+            offset=block['offset'],
+            shape=(block['length'],)
+        )
+    return blocks
+
+
+def load_cube(fp, mmap_mode='r'):
+    """ Memory-map a stats cube file.
+
+        Returns
+            stats layers (np.memmap tensor for dense cubes, list of one
+                          CSRMatrix per layer for sparse ones)
+            stats keys (one per layer)
+            stats matrix indices
+    """
+
+    header = read_header(fp)
+    blocks = load_blocks(fp, header, mmap_mode)
+    shape = tuple(header['shape'])
+    if header['layout'] == 'dense':
+        stats_layers = blocks['data'].reshape(shape)
+    else:
+        num_stats, num_cats, num_months = shape
+        csr = CSRMatrix(
+            blocks['data'],
+            blocks['indices'],
+            blocks['indptr'],
+            (num_stats * num_cats, num_months)
+        )
+        stats_layers = [
+            csr.row_slice(i * num_cats, (i + 1) * num_cats)
+            for i in range(num_stats)
+        ]
+    return stats_layers, header['stats_keys'], header['indices']
+
+
+def load_sketch(fp, mmap_mode='r'):
+    """ The QuantileSketch stored in a stats cube file, None if there is
+        none.
+    """
+
+    header = read_header(fp)
+    if 'sketch' not in header:
+        return None
+    if header['sketch']['alpha'] != ALPHA:
+        raise ValueError(
+            'sketch in {} has relative error {}, expected {}'.format(
+                fp, header['sketch']['alpha'], ALPHA
+            )
+        )
+    blocks = load_blocks(fp, header, mmap_mode)
+    return QuantileSketch(
+        header['sketch']['stats_keys'],
+        header['sketch']['num_cells'],
+        blocks['sketch_keys'],
+        blocks['sketch_counts']
+    )
+
+
+def load_legacy_stats(save_dir):
+    """ Load a directory of per-stat .npy and per-index .json files.
+    """
+
+    stats_matrix_dict = {}
+    stats_matrix_indices = {}
+    for fn in sorted(os.listdir(save_dir)):
+        fp = os.path.join(save_dir, fn)
+        fn_base, ext = os.path.splitext(fn)
+        if ext == '.npy':
+            dict_key = fn_base.replace(LEGACY_MATRIX_PREFIX, '')
+            stats_matrix_dict[dict_key] = np.load(fp)
+        elif ext == '.json' and fn_base.startswith(LEGACY_INDEX_PREFIX):
+            dict_key = fn_base.replace(LEGACY_INDEX_PREFIX, '')
+            with open(fp) as f:
+                stats_matrix_indices[dict_key] = json.load(f)
+    return stats_matrix_dict, stats_matrix_indices
+
+
+def migrate_legacy_stats(save_dir, stats_keys=None, remove=True):
+    """ Convert a legacy stats directory into a single CUBE_FN file.
+
+        stats_keys gives the layer order (default: sorted keys). With
+        remove=True, the legacy files are deleted afterwards.
+    """
+
+    stats_matrix_dict, stats_matrix_indices = load_legacy_stats(save_dir)
+    if stats_keys is None:
+        stats_keys = sorted(stats_matrix_dict)
+    stats_tensor = np.stack([stats_matrix_dict[k] for k in stats_keys])
+    cube_fp = os.path.join(save_dir, CUBE_FN)
+    save_cube(cube_fp, stats_tensor, stats_keys, stats_matrix_indices)
+    # verify before removing anything
+    loaded_layers, loaded_keys, loaded_indices = load_cube(cube_fp)
+    assert loaded_keys == list(stats_keys)
+    assert loaded_indices == stats_matrix_indices
+    assert all(
+        np.array_equal(to_dense(layer), stats_tensor[i])
+        for i, layer in enumerate(loaded_layers)
+    )
+    if remove:
+        for fn in os.listdir(save_dir):
+            fn_base, ext = os.path.splitext(fn)
+            if (
+                (ext == '.npy' and fn_base.startswith(LEGACY_MATRIX_PREFIX))
+                or
+                (ext == '.json' and fn_base.startswith(LEGACY_INDEX_PREFIX))
+            ):
+                os.remove(os.path.join(save_dir, fn))
+    print('migrated {} stats to `{}`'.format(len(stats_keys), cube_fp))
+
+
+def get_label_ranges(labels):
+    """ Keys (in order of appearance) and inclusive (first_idx, last_idx)
+        ranges of a list of labels, one per index, in which all indices
+        with the same label are consecutive.
+    """
+
+    keys = []
+    ranges = []
+    for idx, label in enumerate(labels):
+        if len(keys) > 0 and keys[-1] == label:
+            ranges[-1][1] = idx
+            continue
+        if label in keys:
+            raise ValueError(
+                'indices of {} are not consecutive'.format(label)
+            )
+        keys.append(label)
+        ranges.append([idx, idx])
+    return keys, np.array(ranges, dtype=np.int64).reshape(-1, 2)
+
+
+class StatsCube:
+    """ Stats matrices (dense or sparse) and their indices, with selectors
+        and cached roll-ups along the arXiv taxonomy and time.
+    """
+
+    def __init__(self, stats_matrix_dict, stats_matrix_indices, sketch=None):
+        self.matrices = stats_matrix_dict
+        self.indices = stats_matrix_indices
+        self.sketch = sketch
+        cat_to_idx = stats_matrix_indices['cat_to_idx']
+        mon_to_idx = stats_matrix_indices['mon_to_idx']
+        cat_keys = sorted(cat_to_idx, key=cat_to_idx.get)
+        mon_keys = sorted(mon_to_idx, key=mon_to_idx.get)
+        archive_keys = [CATEGORIES[c]['in_archive'] for c in cat_keys]
+        # label of each row/column for the levels the axes can be
+        # aggregated by
+        self.row_labels = {
+            'all': ['all'] * len(cat_keys),
+            'group': [ARCHIVES[a]['in_group'] for a in archive_keys],
+            'archive': archive_keys,
+            'category': cat_keys
+        }
+        self.col_labels = {
+            'all': ['all'] * len(mon_keys),
+            'year': [m[:4] for m in mon_keys],
+            'month': mon_keys
+        }
+        self.ranges = {}
+        self.psums = {}
+        self.rollups = {}
+        self.cum_histograms = {}
+        self._active = None
+        self.active_psums = None
+        self.active_rollups = {}
+
+    @classmethod
+    def load(cls, fp, mmap_mode='r'):
+        stats_layers, stats_keys, stats_matrix_indices = load_cube(
+            fp, mmap_mode
+        )
+        stats_matrix_dict = {
+            stats_key: stats_layers[i]
+            for i, stats_key in enumerate(stats_keys)
+        }
+        return cls(
+            stats_matrix_dict, stats_matrix_indices,
+            load_sketch(fp, mmap_mode)
+        )
+
+    @property
+    def stats_keys(self):
+        return list(self.matrices.keys())
+
+    def get_ranges(self, level, axis):
+        """ Keys and ranges of a level of the category axis (axis=0: all,
+            group, archive or category) or the month axis (axis=1: all,
+            year or month).
+        """
+
+        if (level, axis) not in self.ranges:
+            labels = [self.row_labels, self.col_labels][axis].get(level)
+            if labels is None:
+                raise ValueError(
+                    'cannot aggregate axis {} by {}'.format(axis, level)
+                )
+            self.ranges[(level, axis)] = get_label_ranges(labels)
+        return self.ranges[(level, axis)]
+
+    def select_rows(self, group=None, archive=None, category=None):
+        """ Row range of a group, archive or category (default: all).
+        """
+
+        selection = [
+            (level, key) for level, key in [
+                ('group', group), ('archive', archive),
+                ('category', category)
+            ]
+            if key is not None
+        ]
+        if len(selection) > 1:
+            raise ValueError('select one of group, archive or category')
+        level, key = selection[0] if len(selection) > 0 else ('all', 'all')
+        keys, ranges = self.get_ranges(level, 0)
+        if key not in keys:
+            raise KeyError('no {} {} in the stats'.format(level, key))
+        return ranges[keys.index(key)]
+
+    def select_cols(self, start=None, end=None):
+        """ Column range from start to end (inclusive), each a year
+            ('2015') or month ('2015-06'). Default: from the first to the
+            last month.
+        """
+
+        first, last = 0, len(self.col_labels['month']) - 1
+        for bound, key in [('start', start), ('end', end)]:
+            if key is None:
+                continue
+            level = 'year' if len(key) == 4 else 'month'
+            keys, ranges = self.get_ranges(level, 1)
+            if key not in keys:
+                raise KeyError('no {} {} in the stats'.format(level, key))
+            if bound == 'start':
+                first = ranges[keys.index(key)][0]
+            else:
+                last = ranges[keys.index(key)][1]
+        return np.array([first, last], dtype=np.int64)
+
+    def range_sums(self, stat, row_ranges, col_ranges):
+        """ Sums of a stat for all pairs of row and column ranges. Prefix
+            sums of dense matrices are cached, i.e. computed once per stat.
+        """
+
+        mtrx = self.matrices[stat]
+        if isinstance(mtrx, CSRMatrix):
+            return aggregate(mtrx, row_ranges, col_ranges)
+        if stat not in self.psums:
+            self.psums[stat] = prefix_sums(mtrx)
+        return range_sums(self.psums[stat], row_ranges, col_ranges)
+
+    def sum(
+            self, stat, group=None, archive=None, category=None,
+            start=None, end=None
+    ):
+        """ Sum of a stat over a group, archive or category (default: all)
+            and the months from start to end (see select_cols).
+        """
+
+        return self.range_sums(
+            stat,
+            self.select_rows(group, archive, category),
+            self.select_cols(start, end)
+        )[0, 0]
+
+    def rollup(self, stat, rows='group', cols='year'):
+        """ Sums of a stat for each key of the rows and cols levels (see
+            get_ranges).
+
+            Returns
+                row keys
+                col keys
+                len(row keys) × len(col keys) array (cached, read-only)
+        """
+
+        cache_key = (stat, rows, cols)
+        if cache_key not in self.rollups:
+            row_keys, row_ranges = self.get_ranges(rows, 0)
+            col_keys, col_ranges = self.get_ranges(cols, 1)
+            sums = self.range_sums(stat, row_ranges, col_ranges)
+            sums.setflags(write=False)
+            self.rollups[cache_key] = (row_keys, col_keys, sums)
+        return self.rollups[cache_key]
+
+    def rollup_many(self, stats, rows='group', cols='year'):
+        """ Roll-ups of several stats (see rollup). The ones of dense stats
+            matrices that are not cached yet are computed together, from
+            the prefix sums of the stacked matrices.
+        """
+
+        dense_stats = [
+            stat for stat in dict.fromkeys(stats)
+            if (stat, rows, cols) not in self.rollups and
+            not isinstance(self.matrices[stat], CSRMatrix)
+        ]
+        if len(dense_stats) > 0:
+            row_keys, row_ranges = self.get_ranges(rows, 0)
+            col_keys, col_ranges = self.get_ranges(cols, 1)
+            sums = range_sums(
+                prefix_sums(
+                    np.stack([self.matrices[stat] for stat in dense_stats])
+                ),
+                row_ranges,
+                col_ranges
+            )
+            for stat, stat_sums in zip(dense_stats, sums):
+                stat_sums.setflags(write=False)
+                self.rollups[(stat, rows, cols)] = (
+                    row_keys, col_keys, stat_sums
+                )
+        return [self.rollup(stat, rows, cols) for stat in stats]
+
+    @property
+    def active(self):
+        """ Category × month mask of the cells in which papers can be
+            filed according to the taxonomy dates (see
+            arxiv_taxonomy.get_active_mask), or which have papers anyway.
+            All other cells are dead, i.e. zero because the category did
+            not exist (yet).
+        """
+
+        if self._active is None:
+            active = get_active_mask(
+                self.row_labels['category'], self.col_labels['month']
+            )
+            if 'num_pprs' in self.matrices:
+                active |= to_dense(self.matrices['num_pprs']) != 0
+            active.setflags(write=False)
+            self._active = active
+        return self._active
+
+    def active_counts(self, rows='group', cols='year'):
+        """ Number of active category × month cells (see active) for each
+            pair of row and col keys (cached, read-only), 0 where all cells
+            are dead.
+        """
+
+        cache_key = (rows, cols)
+        if cache_key not in self.active_rollups:
+            if self.active_psums is None:
+                self.active_psums = prefix_sums(self.active)
+            _, row_ranges = self.get_ranges(rows, 0)
+            _, col_ranges = self.get_ranges(cols, 1)
+            counts = range_sums(
+                self.active_psums, row_ranges, col_ranges
+            ).astype(np.int64)
+            counts.setflags(write=False)
+            self.active_rollups[cache_key] = counts
+        return self.active_rollups[cache_key]
+
+    def mask_dead(self, values, rows='group', cols='year'):
+        """ Roll-up values (e.g. of rollup) with NaN where all cells are
+            dead, so that plots leave out disciplines before they existed.
+        """
+
+        return np.where(
+            self.active_counts(rows, cols) > 0, values, np.nan
+        )
+
+    def ratio(self, part_stat, total_stat, rows='group', cols='year'):
+        """ Roll-up of part_stat divided by the roll-up of total_stat
+            (0 where the total is 0, NaN where all cells are dead), e.g.
+            linked / total references.
+        """
+
+        row_keys, col_keys, part = self.rollup(part_stat, rows, cols)
+        _, _, total = self.rollup(total_stat, rows, cols)
+        return row_keys, col_keys, self.mask_dead(
+            ratio(part, total), rows, cols
+        )
+
+    def mean_per_cell(self, stat, rows='group', cols='year'):
+        """ Roll-up of a stat divided by the number of active category ×
+            month cells (NaN where all cells are dead), e.g. papers per
+            category and month, not diluted by categories that did not
+            exist yet.
+        """
+
+        row_keys, col_keys, sums = self.rollup(stat, rows, cols)
+        counts = self.active_counts(rows, cols)
+        return row_keys, col_keys, self.mask_dead(
+            ratio(sums, counts), rows, cols
+        )
+
+    def get_cum_histograms(self, stat, rows='group', cols='year'):
+        """ Cumulative sketch histograms of a per-paper stat for each pair
+            of row and col keys (cached), as a len(row keys) ×
+            len(col keys) × num_buckets array.
+        """
+
+        if self.sketch is None:
+            raise ValueError(
+                'no quantile sketch, calculate the stats with sketches=True'
+            )
+        cache_key = (stat, rows, cols)
+        if cache_key not in self.cum_histograms:
+            row_keys, row_ranges = self.get_ranges(rows, 0)
+            col_keys, col_ranges = self.get_ranges(cols, 1)
+            # group of each category × month cell
+            row_groups = np.repeat(
+                np.arange(len(row_keys)), np.diff(row_ranges, axis=1)[:, 0] + 1
+            )
+            col_groups = np.repeat(
+                np.arange(len(col_keys)), np.diff(col_ranges, axis=1)[:, 0] + 1
+            )
+            cell_groups = (
+                row_groups[:, None] * len(col_keys) + col_groups[None, :]
+            ).ravel()
+            cum_histograms = np.cumsum(
+                self.sketch.get_histograms(
+                    stat, cell_groups, len(row_keys) * len(col_keys)
+                ),
+                axis=1
+            ).reshape(len(row_keys), len(col_keys), -1)
+            cum_histograms.setflags(write=False)
+            self.cum_histograms[cache_key] = (
+                row_keys, col_keys, cum_histograms
+            )
+        return self.cum_histograms[cache_key]
+
+    def quantiles(self, stat, qs, rows='group', cols='year'):
+        """ Approximate quantiles qs (e.g. [0.5, 0.95]) of a per-paper
+            stat for each pair of row and col keys (see stats_sketch.py).
+
+            Returns
+                row keys
+                col keys
+                len(row keys) × len(col keys) × len(qs) array (NaN where
+                there are no papers)
+        """
+
+        row_keys, col_keys, cum_histograms = self.get_cum_histograms(
+            stat, rows, cols
+        )
+        quantiles = get_quantiles(
+            cum_histograms.reshape(-1, cum_histograms.shape[2]), qs
+        ).reshape(len(row_keys), len(col_keys), -1)
+        return row_keys, col_keys, quantiles
+
+
+if __name__ == '__main__':
+    from calc_stats import STATS_KEYS
+    migrate_legacy_stats(sys.argv[1], STATS_KEYS)
@@ -0,0 +1,120 @@
+""" Range queries over the stats matrices of calc_stats.
+
+    Categories of a group and months of a year have continuous row/column
+    ranges (see calc_stats.get_stats_matrix_indices), so the sum of a stat
+    over any group × year (or category range × month range) is a
+    rectangle sum. With the 2-D prefix sums of a matrix
+        P[i, j] = sum(mtrx[:i, :j])
+    each rectangle sum takes four lookups, and the sums for all pairs of
+    row ranges and column ranges are computed in one vectorized step.
+
+    All ranges are inclusive on both ends, i.e. (first_idx, last_idx).
+
+    aggregate() works on dense matrices as well as on sparse ones (see
+    stats_sparse.py), for which the sums are computed from the non-zero
+    entries instead.
+"""
+
+import numpy as np
+from stats_sparse import CSRMatrix, sparse_range_sums
+
+
+def prefix_sums(mtrx):
+    """ Zero padded 2-D prefix sums of mtrx, i.e. an array P of shape
+        (rows + 1) × (cols + 1) with P[i, j] = sum(mtrx[:i, :j]).
+
+        For a stack of matrices (e.g. a stats tensor), the prefix sums of
+        each matrix along the last two axes.
+    """
+
+    psums = np.zeros(
+        mtrx.shape[:-2] + (mtrx.shape[-2] + 1, mtrx.shape[-1] + 1),
+        dtype=np.result_type(mtrx.dtype, np.float64)
+    )
+    np.cumsum(mtrx, axis=-2, out=psums[..., 1:, 1:])
+    np.cumsum(psums[..., 1:, 1:], axis=-1, out=psums[..., 1:, 1:])
+    return psums
+
+
+def get_ranges(idx_dict):
+    """ Keys and inclusive (first_idx, last_idx) ranges of an index such
+        as grp_to_idx or year_to_idx, which map keys to lists of
+        consecutive indices.
+    """
+
+    keys = list(idx_dict.keys())
+    ranges = np.array(
+        [(idx_dict[k][0], idx_dict[k][-1]) for k in keys], dtype=np.int64
+    ).reshape(-1, 2)
+    return keys, ranges
+
+
+def range_sum(psums, row_range, col_range):
+    """ Sum over the inclusive row and column range of the matrix psums was
+        computed from.
+    """
+
+    (r0, r1), (c0, c1) = row_range, col_range
+    return (
+        psums[r1 + 1, c1 + 1] - psums[r0, c1 + 1]
+        - psums[r1 + 1, c0] + psums[r0, c0]
+    )
+
+
+def range_sums(psums, row_ranges, col_ranges):
+    """ Sums for all pairs of inclusive row ranges and column ranges, as a
+        len(row_ranges) × len(col_ranges) array (per matrix, for the
+        prefix sums of a stack of matrices).
+    """
+
+    row_ranges = np.asarray(row_ranges, dtype=np.int64).reshape(-1, 2)
+    col_ranges = np.asarray(col_ranges, dtype=np.int64).reshape(-1, 2)
+    r0 = row_ranges[:, 0][:, None]
+    r1 = row_ranges[:, 1][:, None] + 1
+    c0 = col_ranges[:, 0][None, :]
+    c1 = col_ranges[:, 1][None, :] + 1
+    return (
+        psums[..., r1, c1] - psums[..., r0, c1]
+        - psums[..., r1, c0] + psums[..., r0, c0]
+    )
+
+
+def aggregate(mtrx, row_ranges, col_ranges):
+    """ Sums of a dense or sparse stats matrix for all pairs of inclusive
+        row ranges and column ranges, as a len(row_ranges) ×
+        len(col_ranges) array.
+    """
+
+    if isinstance(mtrx, CSRMatrix):
+        return sparse_range_sums(mtrx, row_ranges, col_ranges)
+    return range_sums(prefix_sums(mtrx), row_ranges, col_ranges)
+
+
+def full_range(length):
+    return np.array([[0, length - 1]], dtype=np.int64)
+
+
+def group_year_sums(mtrx, idxs):
+    """ Sums of a stats matrix for each group (rows) and year (columns).
+
+        Returns
+            group keys
+            year keys
+            len(groups) × len(years) array
+    """
+
+    grps, grp_ranges = get_ranges(idxs['grp_to_idx'])
+    years, year_ranges = get_ranges(idxs['year_to_idx'])
+    sums = aggregate(mtrx, grp_ranges, year_ranges)
+    return grps, years, sums
+
+
+def ratio(part, total):
+    """ Element-wise part / total, 0 where total is 0.
+    """
+
+    part = np.asarray(part, dtype=np.float64)
+    total = np.asarray(total, dtype=np.float64)
+    quota = np.zeros(np.broadcast(part, total).shape)
+    np.divide(part, total, out=quota, where=total != 0)
+    return quota
@@ -0,0 +1,222 @@
+""" Render the full set of stats figures in one go.
+
+    Unlike demoplot, which builds a single figure per call, the report
+        1. loads the stats cube once (see calc_stats.load_stats_cube),
+        2. computes the discipline × year roll-ups of all stats the figures
+           need in one vectorized step (StatsCube.rollup_many), and
+        3. renders the figures in parallel worker processes, each of which
+           only receives the (small) series of its figure.
+
+    Usage:
+        python stats_report.py /path/to/data /path/to/report [--workers 4]
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import numpy as np
+from matplotlib.figure import Figure
+from calc_stats import STATS_KEYS, load_stats_cube, plot_cats_over_years
+from stats_query import ratio
+
+
+CM = 1/2.54
+FIGSIZE = [15*CM, 9*CM]
+LICENSE_KEYS = [k for k in STATS_KEYS if k.startswith('num_license_')]
+# part / total per discipline over the years (total None: part only). a
+# part or total given as a list is the sum of these stats
+REPORT_FIGURES = [
+    {
+        'name': 'papers',
+        'part': 'num_pprs',
+        'total': None,
+        'ylabel': 'Number of papers'
+    },
+    {
+        'name': 'refs_per_paper',
+        'part': 'num_refs',
+        'total': 'num_pprs',
+        'ylabel': 'Number of references per paper'
+    },
+    {
+        'name': 'refs_per_paragraph',
+        'part': 'num_refs',
+        'total': 'num_paras',
+        'ylabel': 'Number of references per paragraph',
+        'major_only': True
+    },
+    {
+        'name': 'cit_markers_per_paragraph',
+        'part': 'num_cit_markers',
+        'total': 'num_paras',
+        'ylabel': 'Number of citation markers per paragraph'
+    },
+    {
+        'name': 'ref_link_rate',
+        'part': 'num_refs_linked',
+        'total': 'num_refs',
+        'ylabel': 'Share of linked references'
+    },
+    {
+        'name': 'cit_marker_link_rate',
+        'part': 'num_cit_markers_linked',
+        'total': 'num_cit_markers',
+        'ylabel': 'Share of linked citation markers'
+    },
+    {
+        'name': 'fig_success_rate',
+        'part': 'num_fig_succs',
+        'total': ['num_fig_succs', 'num_fig_fails'],
+        'ylabel': 'Share of successfully extracted figures'
+    },
+    {
+        'name': 'tbl_success_rate',
+        'part': 'num_tbl_succs',
+        'total': ['num_tbl_succs', 'num_tbl_fails'],
+        'ylabel': 'Share of successfully extracted tables'
+    },
+    {
+        'name': 'formula_success_rate',
+        'part': 'num_formula_succs',
+        'total': ['num_formula_succs', 'num_formula_fails'],
+        'ylabel': 'Share of successfully extracted formulae'
+    },
+    {
+        'name': 'license_mix',
+        'stack': LICENSE_KEYS,
+        'ylabel': 'Share of papers'
+    }
+]
+
+
+def as_list(stat_keys):
+    if stat_keys is None:
+        return []
+    if isinstance(stat_keys, str):
+        return [stat_keys]
+    return list(stat_keys)
+
+
+def get_report_series(cube, figures=REPORT_FIGURES):
+    """ Series of each figure, computed from one roll-up per stat.
+
+        Returns
+            {figure name: (series, years)}
+            where series maps a discipline (or, for stacked figures, a
+            stat) to one value per year
+    """
+
+    line_stats = []
+    stack_stats = []
+    for figure in figures:
+        line_stats += as_list(figure.get('part'))
+        line_stats += as_list(figure.get('total'))
+        stack_stats += as_list(figure.get('stack'))
+    rollups = {}
+    for stats, rows in [(line_stats, 'group'), (stack_stats, 'all')]:
+        for stat, (_, _, sums) in zip(
+            stats, cube.rollup_many(stats, rows, 'year')
+        ):
+            rollups[(stat, rows)] = sums
+    grps, _ = cube.get_ranges('group', 0)
+    years, _ = cube.get_ranges('year', 1)
+
+    report_series = {}
+    for figure in figures:
+        if 'stack' in figure:
+            # share of each stat in the total of the stack, all disciplines
+            vals = np.stack(
+                [rollups[(stat, 'all')][0] for stat in figure['stack']]
+            )
+            shares = ratio(vals, vals.sum(axis=0)[None, :])
+            series = {
+                stat: list(shares[i]) for i, stat in enumerate(figure['stack'])
+            }
+        else:
+            vals = sum(
+                rollups[(stat, 'group')] for stat in as_list(figure['part'])
+            )
+            if figure['total'] is not None:
+                vals = ratio(vals, sum(
+                    rollups[(stat, 'group')]
+                    for stat in as_list(figure['total'])
+                ))
+            # leave out the years before a discipline existed
+            vals = cube.mask_dead(vals, 'group', 'year')
+            series = {grp: list(vals[i]) for i, grp in enumerate(grps)}
+        report_series[figure['name']] = (series, years)
+    return report_series
+
+
+def render_figure(args):
+    """ Render a single figure to out_dir/<name>.<fmt> (runs in a worker
+        process, hence the single argument).
+    """
+
+    figure, series, years, out_dir, fmt = args
+    fig = Figure(figsize=FIGSIZE)
+    ax = fig.add_subplot(111)
+    if 'stack' in figure:
+        ax.stackplot(
+            [int(y) for y in years],
+            [series[stat] for stat in figure['stack']],
+            labels=[
+                stat.replace('num_license_', '').replace('_', ' ')
+                for stat in figure['stack']
+            ]
+        )
+        ax.set_xlabel('Year')
+        ax.set_ylabel(figure['ylabel'])
+        fig.legend(loc='upper center', ncol=3)
+        fig.tight_layout()
+    else:
+        plot_cats_over_years(
+            fig, ax, series, years, 'Year', figure['ylabel'],
+            major_only=figure.get('major_only', False),
+            thousands=figure['total'] is None
+        )
+    fp = os.path.join(out_dir, '{}.{}'.format(figure['name'], fmt))
+    fig.savefig(fp)
+    return fp
+
+
+def render_report(
+        cube, out_dir, figures=REPORT_FIGURES, workers=1, fmt='pdf'
+):
+    """ Render all figures of the report into out_dir.
+
+        Returns
+            paths of the rendered figures
+    """
+
+    os.makedirs(out_dir, exist_ok=True)
+    report_series = get_report_series(cube, figures)
+    tasks = [
+        (figure, *report_series[figure['name']], out_dir, fmt)
+        for figure in figures
+    ]
+    if workers > 1:
+        with mp.Pool(min(workers, len(tasks))) as pool:
+            fps = pool.map(render_figure, tasks)
+    else:
+        fps = [render_figure(task) for task in tasks]
+    print('rendered {} figures to `{}`'.format(len(fps), out_dir))
+    return fps
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('root_dir', help='/path/to/data')
+    parser.add_argument('out_dir', help='where to write the figures')
+    parser.add_argument(
+        '--workers', type=int, default=1,
+        help='number of worker processes rendering figures (default: 1)'
+    )
+    parser.add_argument(
+        '--format', default='pdf', help='figure file format (default: pdf)'
+    )
+    args = parser.parse_args()
+    render_report(
+        load_stats_cube(args.root_dir), args.out_dir,
+        workers=args.workers, fmt=args.format
+    )
@@ -0,0 +1,179 @@
+""" Mergeable quantile sketches of per-paper stats.
+
+    The stats matrices only hold sums. To get e.g. the median number of
+    references per paper for each discipline and year, a QuantileSketch
+    keeps a histogram of each per-paper stat for each category × month
+    cell, with logarithmically sized buckets:
+        bucket 0        value 0
+        bucket b > 0    values in [GAMMA^(b - 1), GAMMA^b)
+    Quantiles estimated from these histograms are within a relative error
+    of ALPHA of the true value (as in DDSketch). Histograms are exact
+    counts, so merging sketches (of parallel workers, or of cells into
+    disciplines and years) is adding them up.
+
+    Most (stat, cell, bucket) combinations never occur, so the sketch is
+    stored sparse, as sorted keys
+        (stat_idx * num_cells + cell_idx) * NUM_BUCKETS + bucket
+    and their counts.
+"""
+
+import numpy as np
+
+
+ALPHA = 0.01
+GAMMA = (1 + ALPHA) / (1 - ALPHA)
+# enough buckets for values up to 2^31
+NUM_BUCKETS = int(np.ceil(np.log(2 ** 31) / np.log(GAMMA))) + 2
+# minimum number of pending keys before they are merged into the sketch
+COMPACT_SIZE = 1 << 20
+
+
+def get_buckets(values):
+    """ Bucket of each (non-negative) value.
+    """
+
+    values = np.asarray(values, dtype=np.float64)
+    buckets = np.zeros(values.shape, dtype=np.int64)
+    pos = values >= 1
+    buckets[pos] = 1 + np.floor(np.log(values[pos]) / np.log(GAMMA))
+    return np.minimum(buckets, NUM_BUCKETS - 1)
+
+
+def get_bucket_values(buckets):
+    """ Representative value of each bucket (0 for bucket 0), within a
+        relative error of ALPHA of all values in the bucket.
+    """
+
+    buckets = np.asarray(buckets)
+    values = 2 * GAMMA ** buckets / (GAMMA + 1)
+    return np.where(buckets == 0, 0.0, values)
+
+
+def sum_by_key(keys, counts):
+    """ Sorted unique keys and the summed counts of each.
+    """
+
+    uniq_keys, inverse = np.unique(keys, return_inverse=True)
+    uniq_counts = np.bincount(
+        inverse, weights=counts, minlength=len(uniq_keys)
+    ).astype(np.int64)
+    return uniq_keys, uniq_counts
+
+
+class QuantileSketch:
+    """ Histograms (see module docstring) of the values of each stat in
+        stats_keys for each of num_cells cells.
+    """
+
+    def __init__(self, stats_keys, num_cells, keys=None, counts=None):
+        self.stats_keys = list(stats_keys)
+        self.num_cells = num_cells
+        if keys is None:
+            keys = np.zeros(0, dtype=np.int64)
+            counts = np.zeros(0, dtype=np.int64)
+        self.keys = keys
+        self.counts = counts
+        self.pending = []
+        self.num_pending = 0
+
+    def add(self, stat_idxs, cell_idxs, values):
+        """ Add values (arrays of equal length: stat, cell and value of each
+            observation).
+        """
+
+        keys = (
+            (
+                np.asarray(stat_idxs, dtype=np.int64) * self.num_cells +
+                np.asarray(cell_idxs, dtype=np.int64)
+            ) * NUM_BUCKETS + get_buckets(values)
+        )
+        self.add_counts(*sum_by_key(keys, np.ones(len(keys))))
+
+    def add_counts(self, keys, counts):
+        self.pending.append((keys, counts))
+        self.num_pending += len(keys)
+        # merge into the sorted keys only once the pending keys outgrow
+        # them, so that each key is re-sorted a bounded number of times
+        if self.num_pending >= max(len(self.keys), COMPACT_SIZE):
+            self.compact()
+
+    def compact(self):
+        if len(self.pending) == 0:
+            return
+        self.keys, self.counts = sum_by_key(
+            np.concatenate([self.keys] + [k for k, _ in self.pending]),
+            np.concatenate([self.counts] + [c for _, c in self.pending])
+        )
+        self.pending = []
+        self.num_pending = 0
+
+    def merge(self, other):
+        assert other.stats_keys == self.stats_keys
+        assert other.num_cells == self.num_cells
+        other.compact()
+        self.add_counts(other.keys, other.counts)
+
+    def get_histograms(self, stats_key, cell_groups, num_groups):
+        """ Histograms of a stat summed over groups of cells.
+
+            cell_groups gives the group (0 ... num_groups - 1) of each cell.
+
+            Returns
+                num_groups × num_buckets array of counts, where num_buckets
+                is the highest occurring bucket + 1
+        """
+
+        self.compact()
+        stat_idx = self.stats_keys.index(stats_key)
+        first, last = np.searchsorted(
+            self.keys,
+            [
+                stat_idx * self.num_cells * NUM_BUCKETS,
+                (stat_idx + 1) * self.num_cells * NUM_BUCKETS
+            ]
+        )
+        keys = np.asarray(self.keys[first:last])
+        counts = np.asarray(self.counts[first:last])
+        buckets = keys % NUM_BUCKETS
+        cells = (keys // NUM_BUCKETS) % self.num_cells
+        num_buckets = int(buckets.max()) + 1 if len(keys) > 0 else 1
+        groups = np.asarray(cell_groups)[cells]
+        return np.bincount(
+            groups * num_buckets + buckets,
+            weights=counts,
+            minlength=num_groups * num_buckets
+        ).reshape(num_groups, num_buckets)
+
+
+def get_quantiles(cum_counts, qs):
+    """ Estimated quantiles qs (e.g. [0.5, 0.95]) of each histogram given
+        by its cumulative counts (rows of cum_counts, i.e. the np.cumsum of
+        histograms of QuantileSketch.get_histograms along axis 1), as a
+        len(cum_counts) × len(qs) array (NaN for empty histograms).
+    """
+
+    qs = np.asarray(qs, dtype=np.float64).reshape(-1)
+    quantiles = np.full((cum_counts.shape[0], len(qs)), np.nan)
+    # empty histograms have no quantiles
+    non_empty = np.flatnonzero(cum_counts[:, -1] > 0)
+    cum_counts = cum_counts[non_empty]
+    num_hists, num_buckets = cum_counts.shape
+    if num_hists == 0:
+        return quantiles
+    totals = cum_counts[:, -1]
+    # rank of the quantile among the sorted values of each histogram
+    ranks = qs[None, :] * (totals - 1)[:, None]
+    # the quantile is in the first bucket whose cumulative count exceeds
+    # the rank. offsetting each row by more than the largest total makes
+    # all rows one sorted array, so a single searchsorted finds them all
+    row_offsets = np.arange(num_hists)[:, None] * (totals.max() + 1.0)
+    flat_idxs = np.searchsorted(
+        (cum_counts + row_offsets).ravel(),
+        (ranks + row_offsets).ravel(),
+        side='right'
+    ).reshape(num_hists, len(qs))
+    buckets = flat_idxs - np.arange(num_hists)[:, None] * num_buckets
+    quantiles[non_empty] = get_bucket_values(
+        np.minimum(buckets, num_buckets - 1)
+    )
+    return quantiles
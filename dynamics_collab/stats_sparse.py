@@ -0,0 +1,161 @@
+""" Sparse (CSR) stats matrices.
+
+    Most cells of the category × month stats matrices are zero (categories
+    that did not exist yet, or have few papers), so with more or finer
+    dimensions storing them densely gets expensive. A CSRMatrix keeps only
+    the non-zero entries:
+        data        non-zero values, row by row
+        indices     column of each value
+        indptr      values of row i are data[indptr[i]:indptr[i + 1]]
+    The arrays can be memory-mapped (see stats_cube.py).
+
+    Range sums (see stats_query.py) are computed directly on the non-zero
+    entries, without densifying the matrix.
+"""
+
+import numpy as np
+
+
+INDEX_DTYPE = np.int32
+INDPTR_DTYPE = np.int64
+
+
+def density(arr):
+    """ Fraction of non-zero entries.
+    """
+
+    if arr.size == 0:
+        return 0.0
+    return np.count_nonzero(arr) / arr.size
+
+
+class CSRMatrix:
+    """ Compressed sparse row matrix.
+    """
+
+    def __init__(self, data, indices, indptr, shape):
+        self.data = data
+        self.indices = indices
+        self.indptr = indptr
+        self.shape = tuple(shape)
+        self.dtype = data.dtype
+
+    @classmethod
+    def from_dense(cls, mtrx):
+        mtrx = np.asarray(mtrx)
+        rows, cols = np.nonzero(mtrx)
+        indptr = np.zeros(mtrx.shape[0] + 1, dtype=INDPTR_DTYPE)
+        np.cumsum(
+            np.bincount(rows, minlength=mtrx.shape[0]), out=indptr[1:]
+        )
+        return cls(
+            mtrx[rows, cols],
+            cols.astype(INDEX_DTYPE),
+            indptr,
+            mtrx.shape
+        )
+
+    @property
+    def nnz(self):
+        return int(self.indptr[-1] - self.indptr[0])
+
+    def row_slice(self, start, stop):
+        """ Rows start to stop (exclusive) as a CSRMatrix sharing the data
+            and indices arrays.
+        """
+
+        indptr = self.indptr[start:stop + 1]
+        first, last = indptr[0], indptr[-1]
+        return CSRMatrix(
+            self.data[first:last],
+            self.indices[first:last],
+            indptr - first,
+            (stop - start, self.shape[1])
+        )
+
+    def rows(self):
+        """ Row of each non-zero entry.
+        """
+
+        return np.repeat(
+            np.arange(self.shape[0], dtype=INDEX_DTYPE),
+            np.diff(self.indptr)
+        )
+
+    def toarray(self):
+        mtrx = np.zeros(self.shape, dtype=self.dtype)
+        mtrx[self.rows(), self.indices] = self.data
+        return mtrx
+
+    def sum(self):
+        return self.data.sum()
+
+    def __repr__(self):
+        return '<CSRMatrix {}×{}, {} non-zero>'.format(
+            self.shape[0], self.shape[1], self.nnz
+        )
+
+
+def to_dense(mtrx):
+    if isinstance(mtrx, CSRMatrix):
+        return mtrx.toarray()
+    return np.asarray(mtrx)
+
+
+def _elementary_intervals(ranges):
+    """ Sorted boundaries of the intervals the inclusive ranges split an
+        axis into (interval k is [bounds[k], bounds[k + 1])), and the first
+        and past-the-end interval of each range.
+    """
+
+    bounds = np.unique(np.concatenate([ranges[:, 0], ranges[:, 1] + 1]))
+    first = np.searchsorted(bounds, ranges[:, 0])
+    stop = np.maximum(np.searchsorted(bounds, ranges[:, 1] + 1), first)
+    return bounds, first, stop
+
+
+def sparse_range_sums(mtrx, row_ranges, col_ranges):
+    """ Sums of a CSRMatrix for all pairs of inclusive row ranges and
+        column ranges, as a len(row_ranges) × len(col_ranges) array.
+
+        The range bounds split the rows and columns into intervals (the
+        ranges themselves if they are disjoint). Each non-zero entry is
+        binned into its row interval × column interval cell with
+        np.searchsorted and a single weighted np.bincount. The range sums
+        are then rectangle sums over the prefix sums of that small grid,
+        so ranges may overlap.
+    """
+
+    row_ranges = np.asarray(row_ranges, dtype=np.int64).reshape(-1, 2)
+    col_ranges = np.asarray(col_ranges, dtype=np.int64).reshape(-1, 2)
+    dtype = np.result_type(mtrx.dtype, np.float64)
+    if len(row_ranges) == 0 or len(col_ranges) == 0:
+        return np.zeros((len(row_ranges), len(col_ranges)), dtype=dtype)
+    row_bounds, row_first, row_stop = _elementary_intervals(row_ranges)
+    col_bounds, col_first, col_stop = _elementary_intervals(col_ranges)
+    n_row_ivals = len(row_bounds) - 1
+    n_col_ivals = len(col_bounds) - 1
+
+    # interval of each row, repeated for its non-zero entries (-1 and
+    # n_ivals: before the first or after the last bound)
+    row_ival = np.searchsorted(
+        row_bounds, np.arange(mtrx.shape[0]), side='right'
+    ) - 1
+    row_ival = np.repeat(row_ival, np.diff(mtrx.indptr))
+    col_ival = np.searchsorted(col_bounds, mtrx.indices, side='right') - 1
+    in_ranges = (
+        (row_ival >= 0) & (row_ival < n_row_ivals) &
+        (col_ival >= 0) & (col_ival < n_col_ivals)
+    )
+    grid = np.bincount(
+        row_ival[in_ranges] * n_col_ivals + col_ival[in_ranges],
+        weights=np.asarray(mtrx.data)[in_ranges],
+        minlength=n_row_ivals * n_col_ivals
+    ).reshape(n_row_ivals, n_col_ivals)
+
+    psums = np.zeros((n_row_ivals + 1, n_col_ivals + 1), dtype=dtype)
+    np.cumsum(grid, axis=0, out=psums[1:, 1:])
+    np.cumsum(psums[1:, 1:], axis=1, out=psums[1:, 1:])
+    r0, r1 = row_first[:, None], row_stop[:, None]
+    c0, c1 = col_first[None, :], col_stop[None, :]
+    return psums[r1, c1] - psums[r0, c1] - psums[r1, c0] + psums[r0, c0]
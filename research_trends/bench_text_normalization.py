@@ -0,0 +1,111 @@
+import sys
+import json
+import random
+import string
+import time
+
+from text_normalization import normalize_text, normalize_texts
+
+# Benchmark text_normalization.normalize_texts against the previous
+# character-by-character normalization of save_paper_n_grams, per paper.
+#
+# Usage:
+#     python bench_text_normalization.py [/path/to/sample.jsonl]
+#
+# Without a path, papers with long intro/method sections full of
+# {{cite:...}} and {{formula:...}} markers are generated.
+
+SECTIONS = ['Introduction', 'Method', 'Model', 'Approach', 'Results']
+
+
+def reference_remove_bracketed_sections(text):
+    new_text = ""
+    num_brackets = 0
+
+    for character in text:
+        add_character = True
+        if character == "{":
+            num_brackets += 1
+            add_character = False
+        elif character == "}":
+            num_brackets -= 1
+            add_character = False
+        elif num_brackets > 0:
+            add_character = False
+
+        if add_character:
+            new_text += character
+
+    return new_text
+
+def reference_normalize_text(text):
+    text = text.lower().replace('\n', ' ')
+    text = reference_remove_bracketed_sections(text)
+    text = text.translate(str.maketrans('', '', string.punctuation))
+    tokens = text.split(' ')
+    tokens = [token for token in tokens if token != '']
+
+    return tokens
+
+def make_paragraph(rnd, num_sentences):
+    sentences = []
+    for i in range(num_sentences):
+        sentences.append(rnd.choice([
+            f'We train the Model on {rnd.randint(2, 9)} datasets {{{{cite:b{i}}}}}, as in prior work.',
+            f'The loss {{{{formula:f{i}}}}} is minimized (see Section {rnd.randint(1, 6)}).\n',
+            'Results are reported in Table {{table:t1}} and Fig. {{figure:f2}}; "state-of-the-art" '
+            'methods {{cite:b3}}{{cite:b4}} are compared.',
+        ]))
+    return ' '.join(sentences)
+
+def make_paper(rnd, num_paragraphs):
+    return {
+        'body_text': [
+            {'section': rnd.choice(SECTIONS), 'text': make_paragraph(rnd, rnd.randint(5, 40))}
+            for _ in range(num_paragraphs)
+        ]
+    }
+
+def get_section_texts(paper):
+    return [body['text'] for body in paper['body_text'] if body.get('text')]
+
+def time_per_paper(normalize, papers, repeat=3):
+    start_time = time.perf_counter()
+    for _ in range(repeat):
+        for paper in papers:
+            normalize(get_section_texts(paper))
+    return (time.perf_counter() - start_time) / (repeat * len(papers))
+
+def bench(papers):
+    # Print ms per paper for the reference and the linear normalization
+    avg_chars = sum(sum(len(text) for text in get_section_texts(paper)) for paper in papers) / len(papers)
+    print(f'{len(papers)} papers, {avg_chars / 1e3:.1f}k characters per paper on average')
+    for paper in papers:
+        texts = get_section_texts(paper)
+        assert normalize_texts(texts) == [reference_normalize_text(text) for text in texts]
+
+    base = time_per_paper(lambda texts: [reference_normalize_text(text) for text in texts], papers)
+    print(f'{"reference (character by character)":<40} {base * 1e3:>8.3f} ms')
+    duration = time_per_paper(normalize_texts, papers)
+    print(f'{"normalize_texts":<40} {duration * 1e3:>8.3f} ms  ({base / duration:.1f}x)')
+
+    # A single long text, both scale linearly with its length (about a 4x constant factor)
+    long_text = ' '.join(get_section_texts(max(papers, key=lambda paper: len(paper['body_text']))))
+    start_time = time.perf_counter()
+    reference_normalize_text(long_text)
+    base = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    normalize_text(long_text)
+    duration = time.perf_counter() - start_time
+    print(f'{"single text of " + str(len(long_text) // 1000) + "k characters":<40} '
+          f'{base * 1e3:>8.3f} ms -> {duration * 1e3:.3f} ms  ({base / duration:.1f}x)')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        with open(sys.argv[1]) as f:
+            papers = [json.loads(line) for line in f if line.strip()]
+    else:
+        rnd = random.Random(0)
+        papers = [make_paper(rnd, rnd.randint(60, 240)) for _ in range(50)]
+    bench(papers)
@@ -1,4 +1,5 @@
 import os
+import sys
 import json
 import pickle
 import argparse
@@ -6,6 +7,12 @@ import string
 from tqdm import tqdm
 from datetime import date
 import numpy as np
+from collections import defaultdict
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'dynamics_collab'))
+from arxiv_ids import ArxivIds, CODE_DTYPE
+from metadata_store import load_metadata
+from category_mask import encode_masks
 
 SCRATCH_PATH = '/scratch/datasets/aw588/'
 UNARXIVE_PATH = SCRATCH_PATH + "unarXive"
@@ -17,27 +24,94 @@ METHOD_SUBSTRINGS = ['method', 'model', 'approach']
 
 MAX_NGRAM_SIZE = 5
 
-def get_combined_n_grams():
-    years = [str(i)[2:] for i in range(1991, 2023)]
+def get_paper_ids(paper_to_metadata):
+    # ArxivIds table (see dynamics_collab/arxiv_ids.py) in which the code of each paper
+    # is its index in paper_to_metadata, i.e. its row in the discipline membership
+    # matrix (see disciplines.py). Papers added later get codes after those
+    paper_ids = ArxivIds()
+    paper_ids.add(paper_to_metadata.keys())
+    return paper_ids
+
+def load_year_n_grams(year, paper_ids):
+    # n-gram -> sorted int32 codes of the papers of a year containing it (see
+    # save_paper_n_grams.py), mapped from the year's own table to paper_ids
+    # (papers not in paper_ids yet are added). A paper saved twice counts once
+    year_meme_path = os.path.join(CACHE_PATH, f'n_gram_to_papers_{year}.pkl')
+    with open(year_meme_path, 'rb') as f:
+        year_memes = pickle.load(f)
+    year_ids = ArxivIds.load(os.path.join(CACHE_PATH, f'paper_ids_{year}'), mmap=False)
+    year_to_codes = paper_ids.add(year_ids.decode(np.arange(len(year_ids))))
+
+    return {
+        meme: np.unique(year_to_codes[np.frombuffer(codes, dtype=CODE_DTYPE)])
+        for meme, codes in year_memes.items()
+    }
+
+def get_combined_n_grams(years=None, paper_ids=None):
+    # n-gram -> sorted int32 codes (in paper_ids, a new table by default) of the
+    # papers of all years containing it
+    if years is None:
+        years = range(1991, 2023)
+    if paper_ids is None:
+        paper_ids = ArxivIds()
 
     # Iterate over all years
-    all_paper_ids = set()
+    meme_to_codes = defaultdict(list)
+    for year in tqdm([str(year)[2:] for year in years]):
+        for meme, codes in load_year_n_grams(year, paper_ids).items():
+            meme_to_codes[meme].append(codes)
+
     meme_to_articles = {}
-    for year in tqdm(years):
-        year_meme_path = os.path.join(CACHE_PATH, f'n_gram_to_papers_{year}.pkl')
-        with open(year_meme_path, 'rb') as f:
-            year_memes = pickle.load(f)
+    for meme, codes in meme_to_codes.items():
+        meme_to_articles[meme] = np.unique(np.concatenate(codes)) if len(codes) > 1 else codes[0]
+
+    return paper_ids, meme_to_articles
+
+def get_citation_codes(paper_to_metadata, paper_ids):
+    # Codes (in paper_ids) of the cited papers of each paper of paper_to_metadata as
+    # flat arrays: paper i cites codes[indptr[i]:indptr[i + 1]] (cited papers without
+    # n-grams are not in paper_ids and left out)
+    num_cited = [len(metadata['cited_papers']) for metadata in paper_to_metadata.values()]
+    indptr = np.zeros(len(num_cited) + 1, dtype=np.int64)
+    np.cumsum(num_cited, out=indptr[1:])
+    codes = paper_ids.encode([paper for metadata in paper_to_metadata.values()
+                              for paper in metadata['cited_papers']])
+
+    # Drop the unknown cited papers (code -1)
+    known = codes >= 0
+    known_before = np.zeros(len(codes) + 1, dtype=np.int64)
+    np.cumsum(known, out=known_before[1:])
+    return known_before[indptr], codes[known]
+
+def get_metadata_from_store(store_dir):
+    # Build the same paper_to_metadata dict as save_paper_n_grams.add_paper_metadata,
+    # but from the metadata store instead of the full text
+    df = load_metadata(store_dir, columns=['paper_id', 'title', 'has_abstract', 'categories',
+                                           'versions', 'cited_arxiv_ids'])
+    df = df[df['title'].notna() & df['has_abstract']]
+
+    paper_to_metadata = {}
+    for row in tqdm(df.itertuples(index=False), total=len(df)):
+        paper_categories = [] if row.categories is None else list(row.categories)
+        v1 = [version for version in row.versions if version['version'] == 'v1'][0]['created']
+        paper_to_metadata[row.paper_id] = {
+            "categories" : paper_categories,
+            "release_date" : v1.split(' ')[1:4],
+            "cited_papers" : list(row.cited_arxiv_ids)
+        }
+
+    return paper_to_metadata
 
-        for meme, containing_docs in year_memes.items():
-            if meme not in meme_to_articles:
-                meme_to_articles[meme] = set()
-            for containing_doc in containing_docs:
-                meme_to_articles[meme].add(containing_doc)
-                all_paper_ids.add(containing_doc)
+def get_category_masks(paper_to_metadata):
+    # Encode the category list of each paper once, as a bitmask (see category_mask.py)
+    paper_ids = list(paper_to_metadata.keys())
+    paper_masks = encode_masks([paper_to_metadata[paper]['categories'] for paper in paper_ids])
+    return paper_ids, paper_masks
 
-    return meme_to_articles
+def get_combined_metadata(store_dir=None):
+    if store_dir is not None:
+        return get_metadata_from_store(store_dir)
 
-def get_combined_metadata():
     years = [str(i)[2:] for i in range(1991, 2023)]
 
     # Iterate over all years again, focusing on metadata
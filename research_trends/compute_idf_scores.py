@@ -7,6 +7,8 @@ from tqdm import tqdm
 from datetime import date
 import numpy as np
 
+from combine_meme_files import get_combined_n_grams
+
 SCRATCH_PATH = '/scratch/datasets/aw588/'
 UNARXIVE_PATH = SCRATCH_PATH + "unarXive"
 CACHE_PATH = '/scratch/datasets/mog29/unarXive'
@@ -18,25 +20,15 @@ METHOD_SUBSTRINGS = ['method', 'model', 'approach']
 MAX_NGRAM_SIZE = 5
 
 if __name__ == "__main__":
-    years = [str(i)[2:] for i in range(1991, 2023)]
-
-    # Iterate over all years
-    all_paper_ids = set()
-    meme_to_articles = {}
-    for year in tqdm(years):
-        year_meme_path = os.path.join(CACHE_PATH, f'n_gram_to_papers_{year}.pkl')
-        with open(year_meme_path, 'rb') as f:
-            year_memes = pickle.load(f)
-
-        for meme, containing_docs in year_memes.items():
-            if meme not in meme_to_articles:
-                meme_to_articles[meme] = set()
-            for containing_doc in containing_docs:
-                meme_to_articles[meme].add(containing_doc)
-                all_paper_ids.add(containing_doc)
+    # Codes of the papers containing each meme, over all years
+    paper_ids, meme_to_articles = get_combined_n_grams()
 
     # Compute idf
-    num_articles = len(all_paper_ids)
+    # Papers containing any meme
+    has_memes = np.zeros(len(paper_ids), dtype=bool)
+    for containing_docs in meme_to_articles.values():
+        has_memes[containing_docs] = True
+    num_articles = int(has_memes.sum())
     meme_to_idf = {}
     for meme, containing_docs in meme_to_articles.items():
         num_meme_articles = len(containing_docs) + 1
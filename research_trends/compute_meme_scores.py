@@ -8,97 +8,84 @@ from datetime import date
 import numpy as np
 from time import time
 
-from combine_meme_files import get_combined_metadata
+from combine_meme_files import get_citation_codes, get_combined_metadata, get_combined_n_grams, get_paper_ids
+from disciplines import DISCIPLINE_GROUPS, get_membership, get_group_column
 
 SCRATCH_PATH = '/scratch/datasets/aw588/'
 UNARXIVE_PATH = SCRATCH_PATH + "unarXive"
 CACHE_PATH = '/scratch/datasets/mog29/unarXive'
-VALID_DISCIPLINES = ["cs.AI", "cs.CL", "cs.CV", "cs.LG", "stat.ML"]
 INTRO_SUBSTRING = 'introduction'
 RW_SUBSTRING = 'related'
 METHOD_SUBSTRINGS = ['method', 'model', 'approach']
 IDF_THRESHOLD = 1.6
 
 
-def compute_overall_frequencies(year_to_frequencies, paper_to_metadata, disciplines):
+def compute_overall_frequencies(year_to_frequencies, paper_years, in_discipline):
     max_year = max(list(year_to_frequencies.keys()))
 
-    for paper, metadata in tqdm(paper_to_metadata.items()):
-        categories = metadata['categories']
-        found_match = any([cat in disciplines for cat in categories])
-        if not found_match:
-            continue
-
-        year = int(metadata['release_date'][-1])
-        for curr_year in range(year, max_year + 1): 
-            year_to_frequencies[curr_year]['num_papers'] += 1
-
-def get_combined_n_grams(years):
-    new_years = [str(year)[2:] for year in years]
-
-    # Iterate over all years
-    all_paper_ids = set()
-    meme_to_articles = {}
-    for year in tqdm(new_years):
-        year_meme_path = os.path.join(CACHE_PATH, f'n_gram_to_papers_{year}.pkl')
-        with open(year_meme_path, 'rb') as f:
-            year_memes = pickle.load(f)
-
-        for meme, containing_docs in year_memes.items():
-            if meme not in meme_to_articles:
-                meme_to_articles[meme] = set()
-            for containing_doc in containing_docs:
-                meme_to_articles[meme].add(containing_doc)
-                all_paper_ids.add(containing_doc)
-
-    return meme_to_articles
-
-
-def is_meme_in_paper(paper, meme, meme_to_articles):
-    if meme not in meme_to_articles:
-        return False
-    return paper in meme_to_articles[meme]
-
-def is_meme_in_citations(citations, meme, meme_to_articles):
-    truth_vals = []
-    for paper in citations:
-        truth_vals.append(is_meme_in_paper(paper, meme, meme_to_articles))
-    return any(truth_vals)
-
-def compute_n_gram_meme_score_terms(year, meme_to_articles, common_memes, meme_to_score_components,
-                                    paper_to_metadata, disciplines):
-    for paper, metadata in tqdm(paper_to_metadata.items()):
-        # Skip paper if out of discipline
-        categories = metadata['categories']
-        found_match = any([cat in disciplines for cat in categories])
-        if not found_match:
-            continue
-
-        # Skip paper if published after year
-        paper_year = int(metadata["release_date"][-1])
-        if paper_year > year:
-            continue
-        citations = metadata['cited_papers']
-
-        # Iterate over each meme
-        for meme in common_memes:
-            meme_in_paper = is_meme_in_paper(paper, meme, meme_to_articles)
-            meme_in_citations = is_meme_in_citations(citations, meme, meme_to_articles)            
-
-            if meme_in_paper:
-                meme_to_score_components[meme]['frequency'] += 1
-                if meme_in_citations:
-                    meme_to_score_components[meme]['in_paper_in_citations'] += 1
-                    meme_to_score_components[meme]['in_citations'] += 1
-                else:
-                    meme_to_score_components[meme]['in_paper_not_in_citations'] += 1
-                    meme_to_score_components[meme]['not_in_citations'] += 1
-            else:
-                if meme_in_citations:
-                    meme_to_score_components[meme]['in_citations'] += 1
-                else:
-                    meme_to_score_components[meme]['not_in_citations'] += 1                    
-                            
+    # Papers of the discipline released per year, then counted for every later year as well
+    year_counts = np.bincount(paper_years[in_discipline], minlength=max_year + 1)
+    cumulative_counts = np.cumsum(year_counts)
+    for curr_year in year_to_frequencies:
+        year_to_frequencies[curr_year]['num_papers'] += int(cumulative_counts[curr_year])
+
+def get_paper_citations(citation_indptr, citation_codes, papers):
+    # Citations of the given papers only, in the same flat format as get_citation_codes
+    starts = citation_indptr[papers]
+    num_cited = citation_indptr[papers + 1] - starts
+    indptr = np.zeros(len(papers) + 1, dtype=np.int64)
+    np.cumsum(num_cited, out=indptr[1:])
+    positions = np.repeat(starts - indptr[:-1], num_cited) + np.arange(indptr[-1])
+    return indptr, citation_codes[positions]
+
+def is_meme_in_paper(papers, meme, meme_to_articles):
+    # For each paper code, whether the meme appears in it (codes containing a meme are sorted)
+    if meme not in meme_to_articles or len(meme_to_articles[meme]) == 0:
+        return np.zeros(len(papers), dtype=bool)
+    containing_docs = meme_to_articles[meme]
+    idxs = np.minimum(np.searchsorted(containing_docs, papers), len(containing_docs) - 1)
+    return containing_docs[idxs] == papers
+
+def is_meme_in_citations(citation_indptr, citations, meme, meme_to_articles):
+    # For each paper, whether the meme appears in any of its citations
+    cited_hits = np.zeros(len(citations) + 1, dtype=np.int64)
+    np.cumsum(is_meme_in_paper(citations, meme, meme_to_articles), out=cited_hits[1:])
+    return cited_hits[citation_indptr[1:]] > cited_hits[citation_indptr[:-1]]
+
+def compute_n_gram_meme_score_terms(years, meme_to_articles, memes, paper_years,
+                                    citation_indptr, citation_codes, in_discipline):
+    # Only papers in the discipline, with their citations gathered once
+    discipline_papers = np.flatnonzero(in_discipline)
+    discipline_indptr, discipline_citations = get_paper_citations(citation_indptr, citation_codes,
+                                                                  discipline_papers)
+    discipline_years = paper_years[discipline_papers]
+    max_year = max(years)
+
+    def get_year_counts(counted):
+        # Papers counted in their release year, then in every later year as well
+        year_counts = np.bincount(discipline_years[counted], minlength=max_year + 1)
+        return np.cumsum(year_counts)
+
+    # Both tests are done once per paper, the score terms of all years follow from them
+    meme_to_year_components = {}
+    for meme in tqdm(memes):
+        meme_in_paper = is_meme_in_paper(discipline_papers, meme, meme_to_articles)
+        meme_in_citations = is_meme_in_citations(discipline_indptr, discipline_citations,
+                                                 meme, meme_to_articles)
+
+        component_counts = {
+            'frequency' : get_year_counts(meme_in_paper),
+            'in_paper_in_citations' : get_year_counts(meme_in_paper & meme_in_citations),
+            'in_citations' : get_year_counts(meme_in_citations),
+            'in_paper_not_in_citations' : get_year_counts(meme_in_paper & ~meme_in_citations),
+            'not_in_citations' : get_year_counts(~meme_in_citations)
+        }
+        meme_to_year_components[meme] = {year : {
+            component : int(counts[year]) for component, counts in component_counts.items()
+        } for year in years}
+
+    return meme_to_year_components
+
 def save_year_discipline_meme_scores(year_to_frequencies, meme_to_score_components, year, discipline_suffix):
     meme_to_scores = {}
     for meme, score_components in meme_to_score_components.items():
@@ -129,52 +116,37 @@ if __name__ == "__main__":
     years = [i for i in range(1991, 2023)]
 
     paper_to_metadata = get_combined_metadata()
-    meme_to_articles = get_combined_n_grams(years)
-
-    # Compute the total number of publications per year
-    all_disciplines = [
-        VALID_DISCIPLINES,
-        ['astro-ph.CO', 'astro-ph.EP', 'astro-ph.GA', 'astro-ph.HE', 'astro-ph.IM', 'astro-ph.SR'],
-        ['cond-mat.dis-nn', 'cond-mat.mes-hall', 'cond-mat.mtrl-sci', 'cond-mat.other',
-         'cond-mat.quant-gas', 'cond-mat.soft', 'cond-mat.stat-mech', 'cond-mat.str-el',
-         'cond-mat.supr-con'],
-        ['hep-ex', 'hep-lat', 'hep-ph', 'hep-th'],
-        ['nlin.AO', 'nlin.CD', 'nlin.CG', 'nlin.PS', 'nlin.SI'],
-        ['nucl-ex', 'nucl-th']]
-    discipline_suffixes = [
-        'ai',
-        'astrophysics',
-        'condensed_matter',
-        'high_energy',
-        'nonlinear',
-        'nuclear']
+    paper_years = np.array([int(metadata['release_date'][-1]) for metadata in paper_to_metadata.values()])
+    # Papers as int32 codes, the code of a paper is its row in paper_to_metadata
+    paper_ids, meme_to_articles = get_combined_n_grams(years, get_paper_ids(paper_to_metadata))
+    citation_indptr, citation_codes = get_citation_codes(paper_to_metadata, paper_ids)
+
+    # Papers × discipline groups membership, shared with the other stages
+    membership = get_membership(paper_to_metadata)
 
     # Iterate over each year/discipline pair
-    for i in range(len(all_disciplines)):
-        discipline = all_disciplines[i]
-        discipline_suffix = discipline_suffixes[i]
+    for discipline_suffix, discipline in DISCIPLINE_GROUPS.items():
         print(discipline, discipline_suffix)
+        in_discipline = get_group_column(membership, discipline_suffix)
 
         year_to_frequencies = {year : {'num_papers' : 0} for year in years}        
-        compute_overall_frequencies(year_to_frequencies, paper_to_metadata, discipline)
+        compute_overall_frequencies(year_to_frequencies, paper_years, in_discipline)
 
+        # Load most common memes for each year of that discipline
+        year_to_common_memes = {}
         for year in years:
-            print(year)
-
-            # Load most common memes for that pairing
             common_meme_savepath = os.path.join(CACHE_PATH, f'year_{year}_most_common_{discipline_suffix}.pkl')
             with open(common_meme_savepath, 'rb') as f:
-                common_memes = pickle.load(f)[:2500]
-
-            meme_to_score_components = {meme : {
-                'frequency' : 0,
-                'in_paper_in_citations' : 0,
-                'in_citations' : 0,
-                'in_paper_not_in_citations' : 0,
-                'not_in_citations' : 0
-            } for meme in common_memes}
-            compute_n_gram_meme_score_terms(year, meme_to_articles, common_memes, meme_to_score_components,
-                                            paper_to_metadata, discipline)
-            save_year_discipline_meme_scores(year_to_frequencies, meme_to_score_components, year, discipline_suffix)
-            
+                year_to_common_memes[year] = pickle.load(f)[:2500]
 
+        # Score terms of all years, computed once for each meme common in any year
+        common_memes = list(dict.fromkeys(meme for year in years for meme in year_to_common_memes[year]))
+        meme_to_year_components = compute_n_gram_meme_score_terms(years, meme_to_articles, common_memes,
+                                                                   paper_years, citation_indptr,
+                                                                   citation_codes, in_discipline)
+
+        for year in years:
+            print(year)
+            meme_to_score_components = {meme : meme_to_year_components[meme][year]
+                                        for meme in year_to_common_memes[year]}
+            save_year_discipline_meme_scores(year_to_frequencies, meme_to_score_components, year, discipline_suffix)
@@ -0,0 +1,117 @@
+import os
+import sys
+import json
+import hashlib
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'dynamics_collab'))
+from arxiv_taxonomy import get_taxonomy_tables
+from category_mask import encode_mask, in_categories
+from combine_meme_files import CACHE_PATH, get_category_masks
+
+# Named discipline groups (the suffix used in file names: categories of the group).
+# Membership is checked on the category bitmasks, so papers filed under an alias or
+# a subsumed archive of a group's category count too (e.g. cmp-lg papers are in 'ai'
+# through cs.CL, solv-int papers in 'nonlinear' through nlin.SI), see category_mask.py
+DISCIPLINE_GROUPS = {
+    'ai': ["cs.AI", "cs.CL", "cs.CV", "cs.LG", "stat.ML"],
+    'astrophysics': ['astro-ph.CO', 'astro-ph.EP', 'astro-ph.GA', 'astro-ph.HE', 'astro-ph.IM', 'astro-ph.SR'],
+    'condensed_matter': ['cond-mat.dis-nn', 'cond-mat.mes-hall', 'cond-mat.mtrl-sci', 'cond-mat.other',
+                         'cond-mat.quant-gas', 'cond-mat.soft', 'cond-mat.stat-mech', 'cond-mat.str-el',
+                         'cond-mat.supr-con'],
+    'high_energy': ['hep-ex', 'hep-lat', 'hep-ph', 'hep-th'],
+    'nonlinear': ['nlin.AO', 'nlin.CD', 'nlin.CG', 'nlin.PS', 'nlin.SI'],
+    'nuclear': ['nucl-ex', 'nucl-th'],
+    'signal_processing': ['eess.AS', 'eess.IV', 'eess.SP']
+}
+MEMBERSHIP_FILENAME = 'paper_discipline_membership.npz'
+
+
+def get_membership_fingerprint(paper_to_metadata):
+    # Hex digest of the papers' category lists and of the taxonomy tables the
+    # masks are encoded with (category codes, aliases and subsumed archives)
+    tables = get_taxonomy_tables()
+    h = hashlib.blake2b(digest_size=16)
+    h.update(json.dumps([tables['category_keys'], sorted(tables['category_code'].items())]).encode('utf-8'))
+    for paper_id, metadata in paper_to_metadata.items():
+        h.update(json.dumps([paper_id, list(metadata['categories'])]).encode('utf-8'))
+    return h.hexdigest()
+
+def build_membership(paper_to_metadata, groups=DISCIPLINE_GROUPS, membership=None, fingerprint=None):
+    # Boolean papers × groups matrix: whether a paper has any category of a group.
+    # Columns of an existing membership (same papers, category lists, taxonomy
+    # and group categories, i.e. same fingerprint) are reused, so only new or
+    # changed groups are computed
+    paper_ids = list(paper_to_metadata.keys())
+    if fingerprint is None:
+        fingerprint = get_membership_fingerprint(paper_to_metadata)
+    reusable = {}
+    if membership is not None and membership['fingerprint'] == fingerprint \
+            and list(membership['paper_ids']) == paper_ids:
+        for j, name in enumerate(membership['groups']):
+            if groups.get(name) == membership['group_categories'][j]:
+                reusable[name] = membership['matrix'][:, j]
+
+    matrix = np.zeros((len(paper_ids), len(groups)), dtype=bool)
+    paper_masks = None
+    for j, (name, categories) in enumerate(groups.items()):
+        if name in reusable:
+            matrix[:, j] = reusable[name]
+            continue
+        if paper_masks is None:
+            _, paper_masks = get_category_masks(paper_to_metadata)
+        matrix[:, j] = in_categories(paper_masks, encode_mask(categories))
+
+    return {
+        'paper_ids': np.array(paper_ids),
+        'fingerprint': fingerprint,
+        'groups': list(groups.keys()),
+        'group_categories': [list(categories) for categories in groups.values()],
+        'matrix': matrix
+    }
+
+def save_membership(membership, path):
+    np.savez(
+        path,
+        paper_ids=membership['paper_ids'],
+        fingerprint=np.array(membership['fingerprint']),
+        groups=np.array(json.dumps(dict(zip(membership['groups'], membership['group_categories'])))),
+        matrix=membership['matrix']
+    )
+
+def load_membership(path):
+    with np.load(path) as f:
+        groups = json.loads(str(f['groups']))
+        return {
+            'paper_ids': f['paper_ids'],
+            # Files written before the fingerprint was stored are rebuilt
+            'fingerprint': str(f['fingerprint']) if 'fingerprint' in f else None,
+            'groups': list(groups.keys()),
+            'group_categories': list(groups.values()),
+            'matrix': f['matrix']
+        }
+
+def get_membership(paper_to_metadata, groups=DISCIPLINE_GROUPS, cache_path=CACHE_PATH):
+    # Load the persisted membership matrix, (re)building it (or only its new
+    # columns) if it does not cover the papers and groups, or if the papers'
+    # categories or the taxonomy changed since it was built
+    path = os.path.join(cache_path, MEMBERSHIP_FILENAME)
+    membership = load_membership(path) if os.path.exists(path) else None
+    fingerprint = get_membership_fingerprint(paper_to_metadata)
+    if membership is not None and membership['fingerprint'] == fingerprint \
+            and membership['groups'] == list(groups.keys()) \
+            and membership['group_categories'] == list(groups.values()) \
+            and membership['paper_ids'].tolist() == list(paper_to_metadata.keys()):
+        return membership
+
+    membership = build_membership(paper_to_metadata, groups, membership, fingerprint)
+    save_membership(membership, path)
+    return membership
+
+def get_group_column(membership, name):
+    # Boolean column of a discipline group (rows in the order of paper_to_metadata)
+    return membership['matrix'][:, membership['groups'].index(name)]
+
+def get_group_papers(membership, name):
+    # Papers in a discipline group, in the order of paper_to_metadata
+    return membership['paper_ids'][get_group_column(membership, name)].tolist()
@@ -1,11 +1,16 @@
 import os
-import json
+import sys
 import pickle
 import argparse
-import string
+from array import array
 from tqdm import tqdm
 from datetime import date
-import spacy
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'dynamics_collab'))
+from arxiv_ids import ArxivIds, TABLE_FILES
+from corpus import get_jsonl_fps, iter_jsonl
+from manifest import Manifest
+from text_normalization import normalize_text, normalize_texts
 
 SCRATCH_PATH = '/scratch/datasets/aw588/'
 UNARXIVE_PATH = SCRATCH_PATH + "unarXive"
@@ -16,6 +21,8 @@ RW_SUBSTRING = 'related'
 METHOD_SUBSTRINGS = ['method', 'model', 'approach']
 
 MAX_NGRAM_SIZE = 5
+# Version of the n_gram_to_papers files, years saved with another version are recalculated
+N_GRAMS_VERSION = 2
 
 def get_args():
     parser = argparse.ArgumentParser(description="Getting trends in the data")
@@ -23,14 +30,11 @@ def get_args():
                         help="If set, we will slice from the provided index (inclusive)")
     parser.add_argument('--end_index', type=int,
                         help="If set, we will end the slice at the given index (non-inclusive)")
+    parser.add_argument('--manifest', type=str,
+                        help="If set, years whose files did not change since the last run are skipped (see dynamics_collab/manifest.py)")
     args = parser.parse_args()
     return args
 
-def read_jsonl(filepath):
-    with open(filepath, "r") as f:
-        data = [json.loads(line) for line in f]
-    return data
-
 def get_cited_papers(paper):
     cited_papers = []
     bib_entries = paper['bib_entries']
@@ -72,49 +76,22 @@ def add_paper_metadata(paper, paper_id, paper_to_metadata):
         "cited_papers" : cited_papers
     }
 
-def get_lemmatized_text(text, tokenizer):
-    # First process the text normally
-    text = text.lower().replace('\n', ' ')
-    text = remove_bracketed_sections(text)
-    text = text.translate(str.maketrans('', '', string.punctuation))
-    tokens = text.split(' ')
-    tokens = [token for token in tokens if token != '']
-
-    return tokens
-
-def remove_bracketed_sections(text):
-    new_text = ""
-    num_brackets = 0
-
-    for character in text:
-        add_character = True
-        if character == "{":
-            num_brackets += 1
-            add_character = False
-        elif character == "}":
-            num_brackets -= 1
-            add_character = False
-        elif num_brackets > 0:
-            add_character = False
-
-        if add_character:
-            new_text += character
-
-    return new_text
-
-            
-def get_paper_n_grams(paper, paper_id, n_gram_to_papers, tokenizer):
+def get_lemmatized_text(text):
+    # Lower-case, strip bracketed sections and punctuation, tokenize (see text_normalization.py)
+    return normalize_text(text)
+
+def get_paper_n_grams(paper, paper_code, n_gram_to_papers):
     # Get the lemmatized tokens of each relevant section
-    title = [get_lemmatized_text(paper['metadata']['title'], tokenizer)]
-    abstract = [get_lemmatized_text(paper['abstract']['text'], tokenizer)]
-    intro = get_lemmatized_intro_texts(paper['body_text'], tokenizer)
-    method = get_lemmatized_method_texts(paper['body_text'], tokenizer)
+    title = [get_lemmatized_text(paper['metadata']['title'])]
+    abstract = [get_lemmatized_text(paper['abstract']['text'])]
+    intro = get_lemmatized_intro_texts(paper['body_text'])
+    method = get_lemmatized_method_texts(paper['body_text'])
     collected_tokens = title + abstract + intro + method
 
     # Get n_grams from within this collection
-    add_memes(n_gram_to_papers, paper_id, collected_tokens)
+    add_memes(n_gram_to_papers, paper_code, collected_tokens)
 
-def get_lemmatized_intro_texts(body_text, tokenizer):
+def get_lemmatized_intro_texts(body_text):
     intro = []
     for body in body_text:
         section_name = body['section']
@@ -122,9 +99,9 @@ def get_lemmatized_intro_texts(body_text, tokenizer):
             continue
 
         if INTRO_SUBSTRING in process_text_basic(section_name):
-            intro.append(get_lemmatized_text(body['text'], tokenizer))
+            intro.append(body['text'])
 
-    return intro
+    return normalize_texts(intro)
 
 def get_section_number(body_text, section_substring):
     for body in body_text:
@@ -140,7 +117,7 @@ def get_section_number(body_text, section_substring):
 
     return None
 
-def get_lemmatized_method_texts(body_text, tokenizer):
+def get_lemmatized_method_texts(body_text):
     method = []
     for body in body_text:
         section_name = body['section']
@@ -149,9 +126,9 @@ def get_lemmatized_method_texts(body_text, tokenizer):
 
         for method_substring in METHOD_SUBSTRINGS:
             if method_substring in process_text_basic(section_name):
-                method.append(get_lemmatized_text(body['text'], tokenizer))
+                method.append(body['text'])
 
-    return method
+    return normalize_texts(method)
 
 def get_method_numbers(body_text):
     method_numbers = set()
@@ -187,7 +164,7 @@ def get_method_numbers(body_text):
 
     return method_numbers
 
-def add_memes(n_gram_to_papers, paper_id, collected_tokens):
+def add_memes(n_gram_to_papers, paper_code, collected_tokens):
     meme_to_following_word = {}
     for n in range(MAX_NGRAM_SIZE, 0, -1):
         for token_list in collected_tokens:
@@ -203,59 +180,76 @@ def add_memes(n_gram_to_papers, paper_id, collected_tokens):
                 else:
                     meme_to_following_word[meme_span].add(token_list[i+n])
 
-    # Add the memes that appear in varying contexts
+    # Add the memes that appear in varying contexts (each meme once per paper, as
+    # the int32 code of the paper, see get_json_n_grams)
     for meme, contexts in meme_to_following_word.items():
         add_meme = len(contexts) > 1 or "N/A" in contexts
         if add_meme:
             if meme not in n_gram_to_papers:
-                n_gram_to_papers[meme] = set()
-            n_gram_to_papers[meme].add(paper_id)
+                n_gram_to_papers[meme] = array('i')
+            n_gram_to_papers[meme].append(paper_code)
 
-def get_json_n_grams(json_data, paper_to_metadata, n_gram_to_papers,
-                     tokenizer):
+def get_json_n_grams(json_data, paper_to_metadata, n_gram_to_papers, paper_ids):
+    # n_gram_to_papers holds the codes of the papers in the paper_ids table
+    # (see dynamics_collab/arxiv_ids.py) instead of their ID strings
     for paper in json_data:
         if 'title' not in paper['metadata'] or 'abstract' not in paper:
             continue
         paper_id = paper['paper_id']
         add_paper_metadata(paper, paper_id, paper_to_metadata)
-        get_paper_n_grams(paper, paper_id, n_gram_to_papers, tokenizer)
+        get_paper_n_grams(paper, paper_ids.get_code(paper_id), n_gram_to_papers)
+
+def get_paper_ids_dir(year):
+    # ArxivIds table of the paper codes in n_gram_to_papers_{year}.pkl
+    return os.path.join(CACHE_PATH, f'paper_ids_{year}')
 
 if __name__ == "__main__":
     args = get_args()
+    years = [str(i)[2:] for i in range(1991, 2023)]
+
     start_index = 0 if args.start_index is None else args.start_index
     end_index = len(years) if args.end_index is None else args.end_index
-
-    years = [str(i)[2:] for i in range(1991, 2023)]
     years = years[start_index:end_index]
 
-    tokenizer = spacy.load("en_core_web_sm")
+    manifest = None if args.manifest is None else Manifest(args.manifest, UNARXIVE_PATH)
 
     # Iterate over each year
     for year in years:
         paper_to_metadata = {}
         n_gram_to_papers = {}
+        paper_ids = ArxivIds()
 
-        if ".tar.xz" in year:
+        # Extracted year folders as well as year archives (e.g. 91.tar.xz)
+        year_jsons = get_jsonl_fps(UNARXIVE_PATH, years=[year])
+        n_gram_filename = os.path.join(CACHE_PATH, f'n_gram_to_papers_{year}.pkl')
+        metadata_filename = os.path.join(CACHE_PATH, f'paper_to_metadata_{year}.pkl')
+        paper_ids_dir = get_paper_ids_dir(year)
+        output_files = [n_gram_filename, metadata_filename] + \
+            [os.path.join(paper_ids_dir, f'{name}.npy') for name in TABLE_FILES]
+        artifact = f'n_grams/v{N_GRAMS_VERSION}/{year}'
+        if manifest is not None and not manifest.is_stale(artifact, year_jsons, output_files):
+            print(f"{year} is up to date, skipping")
             continue
-        year_folder = os.path.join(UNARXIVE_PATH, year)
-        year_jsons = sorted(os.listdir(year_folder))
 
         # Iterate over each json in said year
         print(year)
         for year_json in tqdm(year_jsons):
-            # Read the json
-            full_path = os.path.join(year_folder, year_json)
-            json_data = read_jsonl(full_path)
-        
-            get_json_n_grams(json_data, paper_to_metadata, n_gram_to_papers, tokenizer)
+            # Stream the papers of the json
+            json_data = iter_jsonl(year_json)
+
+            get_json_n_grams(json_data, paper_to_metadata, n_gram_to_papers, paper_ids)
 
-        n_gram_filename = os.path.join(CACHE_PATH, f'n_gram_to_papers_{year}.pkl')
         with open(n_gram_filename, 'wb') as f:
             pickle.dump(n_gram_to_papers, f)
 
-        metadata_filename = os.path.join(CACHE_PATH, f'paper_to_metadata_{year}.pkl')
         with open(metadata_filename, 'wb') as f:
             pickle.dump(paper_to_metadata, f)
 
+        paper_ids.save(paper_ids_dir)
+
+        if manifest is not None:
+            manifest.record(artifact, year_jsons, output_files)
+            manifest.save()
+
 
 
@@ -1,11 +1,13 @@
 import os
-import json
+import sys
 import pickle
 import argparse
 import string
-from tqdm import tqdm
 from datetime import date
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'dynamics_collab'))
+from scanner import Accumulator, scan
+
 SCRATCH_PATH = '/scratch/datasets/aw588/'
 UNARXIVE_PATH = SCRATCH_PATH + "unarXive"
 CACHE_PATH = '/scratch/datasets/mog29/unarXive'
@@ -21,11 +23,6 @@ def get_args():
     args = parser.parse_args()
     return args
 
-def read_jsonl(filepath):
-    with open(filepath, "r") as f:
-        data = [json.loads(line) for line in f]
-    return data
-
 def get_json_section_metadata(p2s_metadata, json_data):
     for paper in json_data:
         paper_id = paper['paper_id']
@@ -51,32 +48,33 @@ def get_json_section_metadata(p2s_metadata, json_data):
             "name_number_pairs" : section_name_number_pairs
         }
 
+class SectionNamesAccumulator(Accumulator):
+    fields = ['paper_id', 'metadata', 'body_text']
+
+    def __init__(self):
+        self.p2s_metadata = {}
+
+    def update(self, paper, year):
+        get_json_section_metadata(self.p2s_metadata, [paper])
+
+    def merge(self, other):
+        self.p2s_metadata.update(other.p2s_metadata)
+
+    def finalize(self):
+        return self.p2s_metadata
+
 if __name__ == "__main__":
     args = get_args()
     years = [str(i)[2:] for i in range(1991, 2023)]
-    paper_to_section_metadata = {}
-
     print(len(years))
 
     start_index = 0 if args.start_index is None else args.start_index
     end_index = len(years) if args.end_index is None else args.end_index
     years = years[start_index:end_index]
 
-    # Iterate over each year
-    for year in years:
-        if ".tar.xz" in year:
-            continue
-        year_folder = os.path.join(UNARXIVE_PATH, year)
-        year_jsons = sorted(os.listdir(year_folder))
-
-        # Iterate over each json in said year
-        print(year)
-        for year_json in tqdm(year_jsons):
-            # Read the json
-            full_path = os.path.join(year_folder, year_json)
-            json_data = read_jsonl(full_path)
-        
-            get_json_section_metadata(paper_to_section_metadata, json_data)
+    # Single pass over the papers of all years (extracted year folders as
+    # well as year archives, e.g. 91.tar.xz)
+    paper_to_section_metadata, = scan(UNARXIVE_PATH, [SectionNamesAccumulator()], years=years)
 
     cache_filename = os.path.join(CACHE_PATH, f'paper_to_section_metadata_{start_index}_{end_index}.pkl')
     with open(cache_filename, 'wb') as f:
@@ -0,0 +1,54 @@
+import re
+import string
+
+# Normalization of paragraph texts into tokens for the n-gram memes, in linear
+# time with precompiled patterns and tables:
+#   1. lower-casing
+#   2. removing bracketed sections, i.e. everything within curly braces such
+#      as {{cite:...}} markers (nesting is counted, the count may go negative
+#      on unbalanced closing braces, text is kept wherever it is <= 0)
+#   3. newlines become spaces, punctuation is removed
+#   4. splitting at spaces, dropping empty tokens
+
+BRACE_PATTERN = re.compile(r'([{}])')
+INNERMOST_BRACKETS_PATTERN = re.compile(r'\{[^{}]*\}')
+# properly nested brackets deeper than this are stripped brace by brace
+MAX_NESTED_PASSES = 4
+# newlines -> spaces, punctuation -> removed
+NORMALIZATION_TABLE = str.maketrans({'\n': ' ', **{char: None for char in string.punctuation}})
+
+
+def strip_bracketed_sections(text):
+    # Remove curly braces and all text within them
+    if '{' not in text and '}' not in text:
+        return text
+
+    # Common case: properly nested brackets (e.g. {{cite:...}}), removed
+    # innermost first, one regex pass per nesting level
+    stripped = text
+    for _ in range(MAX_NESTED_PASSES):
+        stripped, num_removed = INNERMOST_BRACKETS_PATTERN.subn('', stripped)
+        if num_removed == 0:
+            break
+    if '{' not in stripped and '}' not in stripped:
+        return stripped
+
+    # Otherwise count the brackets: pieces of text at even positions, the
+    # braces between them at odd positions
+    parts = BRACE_PATTERN.split(text)
+    kept_parts = [parts[0]]
+    num_brackets = 0
+    for i in range(1, len(parts), 2):
+        num_brackets += 1 if parts[i] == '{' else -1
+        if num_brackets <= 0:
+            kept_parts.append(parts[i + 1])
+    return ''.join(kept_parts)
+
+def normalize_text(text):
+    # Tokens of a text (see the steps above)
+    text = strip_bracketed_sections(text.lower()).translate(NORMALIZATION_TABLE)
+    return list(filter(None, text.split(' ')))
+
+def normalize_texts(texts):
+    # Tokens of each of many texts (e.g. all paragraphs of a section)
+    return [normalize_text(text) for text in texts]
@@ -0,0 +1,48 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'dynamics_collab'))
+from arxiv_taxonomy import ARCHIVES, CATEGORIES, get_active_mask, get_category_months, get_taxonomy_tables
+
+
+MONTHS = ['1992-12', '1993-01', '2004-01', '2004-02', '2008-12', '2009-01', '2017-08', '2017-09', '2020-06']
+
+
+def active(cat_id, month):
+    return bool(get_active_mask([cat_id], [month])[0, 0])
+
+
+def test_active_months():
+    # eess.SY has papers from the start of cs on, through its alias cs.SY
+    assert active('eess.SY', '1993-01')
+    assert not active('eess.SY', '1992-12')
+    assert not active('eess.AS', '2017-08')
+    assert active('eess.AS', '2017-09')
+    assert active('cs.CL', '2020-06')
+    # cs.CL spans the subsumed cmp-lg archive
+    assert active('cs.CL', '1994-04')
+    # bare archives used as categories until LEGACY_ARCHIVE_AS_PRIMARY
+    assert active('cond-mat', '2004-01')
+    assert not active('cond-mat', '2004-02')
+    # aliases and subsumed archives are never used themselves
+    assert not get_active_mask(['cs.SY', 'cmp-lg'], MONTHS).any()
+
+
+def test_active_mask_equals_category_months():
+    tables = get_taxonomy_tables()
+    cat_keys = tables['category_keys']
+    starts, ends = get_category_months(cat_keys, tables['category_code'])
+    mask = get_active_mask(cat_keys, MONTHS)
+    assert mask.shape == (len(cat_keys), len(MONTHS))
+    for i, key in enumerate(cat_keys):
+        for j, month in enumerate(MONTHS):
+            number = int(month[:4]) * 12 + int(month[5:]) - 1
+            assert mask[i, j] == (starts[i] <= number <= ends[i])
+    # canonical categories start no later than their archive
+    for i, key in enumerate(cat_keys):
+        if tables['category_code'][key] == i and key in CATEGORIES:
+            start = ARCHIVES[CATEGORIES[key]['in_archive']]['start_date']
+            assert starts[i] <= start.year * 12 + start.month - 1
+    assert np.all(mask[[cat_keys.index('eess.SY')], 1:])
@@ -0,0 +1,52 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'dynamics_collab'))
+from arxiv_taxonomy import (
+    ARCHIVES_SUBSUMED, CATEGORIES, CATEGORY_ALIASES, encode_categories, get_taxonomy_tables, resolve_category
+)
+from calc_stats import get_coarse_arxiv_category, paper_stats
+
+
+def test_resolve_category():
+    assert resolve_category('cs.CL') == 'cs.CL'
+    assert resolve_category('cs.SY') == 'eess.SY'
+    assert resolve_category('math.MP') == 'math-ph'
+    assert resolve_category('cmp-lg') == 'cs.CL'
+    assert resolve_category('no.such') is None
+    for alias, canonical in list(CATEGORY_ALIASES.items()) + list(ARCHIVES_SUBSUMED.items()):
+        assert resolve_category(alias) == canonical
+        assert resolve_category(canonical) == canonical
+
+
+def test_aliases_share_the_code_of_their_canonical_category():
+    tables = get_taxonomy_tables()
+    codes = encode_categories(['cs.SY', 'eess.SY', 'cs.NA', 'math.NA', 'no.such'])
+    assert codes[0] == codes[1]
+    assert codes[2] == codes[3]
+    assert codes[4] == -1
+    assert tables['category_keys'][codes[0]] == 'eess.SY'
+    # every other category is its own canonical category
+    own_codes = encode_categories(list(CATEGORIES))
+    is_alias = np.isin(list(CATEGORIES), list(CATEGORY_ALIASES) + list(ARCHIVES_SUBSUMED))
+    assert np.array_equal(own_codes[~is_alias], np.flatnonzero(~is_alias))
+
+
+def test_aliases_move_papers_to_the_canonical_group():
+    # see the README: papers of alias categories count for the group of the canonical category
+    assert get_coarse_arxiv_category('cs.SY') == 'grp_eess'
+    assert get_coarse_arxiv_category('math.IT') == 'grp_cs'
+    assert get_coarse_arxiv_category('cs.CL') == 'grp_cs'
+
+    ppr_stats = paper_stats({
+        'paper_id': '2001.00001',
+        'metadata': {'categories': 'cs.SY cs.LG'},
+        'body_text': [],
+        'bib_entries': {},
+        'ref_entries': {}
+    })
+    assert ppr_stats['main_fine_cat'] == 'eess.SY'
+    assert ppr_stats['main_coarse_cat'] == 'grp_eess'
+    assert ppr_stats['fine_cats'] == ['cs.SY', 'cs.LG']
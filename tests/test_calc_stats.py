@@ -0,0 +1,109 @@
+import json
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'dynamics_collab'))
+import calc_stats
+from stats_sparse import to_dense
+
+
+CATEGORIES = ['cs.CL', 'hep-th', 'math.MP cs.LG', 'cs.SY', 'astro-ph.GA stat.ML']
+
+
+def make_paper(paper_id, categories, num_cits):
+    return {
+        'paper_id': paper_id,
+        'metadata': {'categories': categories, 'license': 'http://creativecommons.org/licenses/by/4.0/'},
+        'bib_entries': {
+            'b0': {'bib_entry_raw': 'A reference', 'ids': {'arxiv_id': '2101.00001'}}
+        },
+        'body_text': [
+            {
+                'section': 'Introduction',
+                'content_type': 'paragraph',
+                'text': ' '.join(['Some text {{cite:b0}}.'] * num_cits),
+                'cite_spans': [],
+                'ref_spans': []
+            }
+        ],
+        'ref_entries': {}
+    }
+
+
+def write_corpus(root_dir):
+    i = 0
+    for year in ['20', '21']:
+        os.makedirs(os.path.join(root_dir, year))
+        for file_num in range(1, 4):
+            with open(os.path.join(root_dir, year, 'arXiv_src_{}{:02}_001.jsonl'.format(year, file_num)), 'w') as f:
+                for _ in range(3):
+                    paper_id = '{}{:02}.{:05}'.format(year, file_num, i)
+                    f.write(json.dumps(make_paper(paper_id, CATEGORIES[i % len(CATEGORIES)], i % 4)) + '\n')
+                    i += 1
+
+
+def assert_equal_stats(stats_matrix_dict, other_stats_matrix_dict):
+    assert stats_matrix_dict.keys() == other_stats_matrix_dict.keys()
+    for key, mtrx in stats_matrix_dict.items():
+        assert np.array_equal(to_dense(mtrx), to_dense(other_stats_matrix_dict[key])), key
+
+
+def test_parallel_calc_stats_equals_serial(tmp_path):
+    root_dir = str(tmp_path / 'corpus')
+    write_corpus(root_dir)
+
+    serial_stats, serial_indices = calc_stats.calc_stats(
+        root_dir, force_calc=True, save_dir=str(tmp_path / 'serial')
+    )
+    parallel_stats, parallel_indices = calc_stats.calc_stats(
+        root_dir, force_calc=True, save_dir=str(tmp_path / 'parallel'), workers=2
+    )
+    assert serial_indices == parallel_indices
+    assert_equal_stats(serial_stats, parallel_stats)
+    assert serial_stats['num_pprs'].sum() == 18
+
+    # the cached stats are used for the same corpus
+    cached_stats, _ = calc_stats.calc_stats(root_dir, save_dir=str(tmp_path / 'parallel'))
+    assert_equal_stats(serial_stats, cached_stats)
+
+
+def iter_papers():
+    for i in range(18):
+        yield make_paper('20{:02}.{:05}'.format(i % 12 + 1, i), CATEGORIES[i % len(CATEGORIES)], i % 4)
+
+
+def test_batched_stats_tensor_equals_per_paper_sums(monkeypatch):
+    monkeypatch.setattr(calc_stats, 'BATCH_SIZE', 4)
+    acc = calc_stats.PaperStatsAccumulator()
+    for ppr in iter_papers():
+        acc.update(ppr, '20')
+    stats_matrix_dict = acc.finalize()
+
+    # stats are layers of the single tensor
+    for i, key in enumerate(calc_stats.STATS_KEYS):
+        assert np.shares_memory(stats_matrix_dict[key], acc.stats_tensor)
+        assert np.array_equal(stats_matrix_dict[key], acc.stats_tensor[i])
+
+    indices = acc.stats_matrix_indices
+    num_pprs = np.zeros_like(stats_matrix_dict['num_pprs'])
+    for ppr in iter_papers():
+        ppr_stats = calc_stats.paper_stats(ppr)
+        num_pprs[indices['cat_to_idx'][ppr_stats['main_fine_cat']], indices['mon_to_idx'][ppr_stats['month']]] += 1
+    assert np.array_equal(stats_matrix_dict['num_pprs'], num_pprs)
+
+
+def test_shared_paper_stats_equal_separate_accumulators():
+    shared_accs = [calc_stats.PaperStatsAccumulator(), calc_stats.PaperTableAccumulator()]
+    shared = calc_stats.SharedPaperStatsAccumulator(shared_accs)
+    separate_accs = [calc_stats.PaperStatsAccumulator(), calc_stats.PaperTableAccumulator()]
+    for ppr in iter_papers():
+        shared.update(ppr, '20')
+        for acc in separate_accs:
+            acc.update(ppr, '20')
+
+    shared_stats, shared_table = shared.finalize()
+    separate_stats, separate_table = [acc.finalize() for acc in separate_accs]
+    assert_equal_stats(shared_stats, separate_stats)
+    assert shared_table.equals(separate_table)
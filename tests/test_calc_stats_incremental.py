@@ -0,0 +1,69 @@
+import json
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'dynamics_collab'))
+import calc_stats
+
+
+def make_paper(paper_id, categories):
+    return {
+        'paper_id': paper_id,
+        'metadata': {
+            'categories': categories,
+            'license': 'http://creativecommons.org/licenses/by/4.0/'
+        },
+        'bib_entries': {
+            'b0': {'bib_entry_raw': 'A reference', 'ids': {'arxiv_id': '2101.00001'}}
+        },
+        'body_text': [
+            {
+                'section': 'Introduction',
+                'content_type': 'paragraph',
+                'text': 'Some text {{cite:b0}}.',
+                'cite_spans': [{'start': 10, 'end': 22, 'ref_id': 'b0'}],
+                'ref_spans': []
+            }
+        ],
+        'ref_entries': {}
+    }
+
+
+def write_corpus(root_dir):
+    papers = {
+        '20': [make_paper('2001.00001', 'cs.CL'), make_paper('2002.00002', 'hep-th')],
+        '21': [make_paper('2103.00003', 'math.MP cs.LG')]
+    }
+    for year, year_papers in papers.items():
+        os.makedirs(os.path.join(root_dir, year))
+        with open(os.path.join(root_dir, year, 'arXiv_src_{}01_001.jsonl'.format(year)), 'w') as f:
+            for paper in year_papers:
+                f.write(json.dumps(paper) + '\n')
+
+
+def run_incremental(root_dir, tmp_path, capsys):
+    calc_stats.calc_stats_incremental(
+        str(root_dir), str(tmp_path / 'manifest.json'), str(tmp_path / 'partial')
+    )
+    return capsys.readouterr().out
+
+
+def test_schema_bump_recalculates_all_years(tmp_path, monkeypatch, capsys):
+    root_dir = tmp_path / 'corpus'
+    write_corpus(str(root_dir))
+    # the stats cache is written relative to the working directory
+    monkeypatch.chdir(tmp_path)
+
+    out = run_incremental(root_dir, tmp_path, capsys)
+    assert 'calculating stats of year 20' in out
+    assert 'calculating stats of year 21' in out
+
+    out = run_incremental(root_dir, tmp_path, capsys)
+    assert 'stats of year 20 are up to date' in out
+    assert 'stats of year 21 are up to date' in out
+
+    monkeypatch.setattr(calc_stats, 'STATS_SCHEMA_VERSION', calc_stats.STATS_SCHEMA_VERSION + 1)
+    out = run_incremental(root_dir, tmp_path, capsys)
+    assert 'calculating stats of year 20' in out
+    assert 'calculating stats of year 21' in out
+    assert 'up to date' not in out
@@ -0,0 +1,43 @@
+import os
+import random
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'dynamics_collab'))
+from arxiv_taxonomy import CATEGORIES, CATEGORY_ALIASES, resolve_category
+from category_mask import NUM_WORDS, decode_mask, encode_mask, encode_masks, in_categories
+
+
+def make_cat_lists(n=200):
+    rnd = random.Random(0)
+    cat_ids = list(CATEGORIES) + list(CATEGORY_ALIASES) + ['cmp-lg', 'solv-int', 'no.such']
+    return [rnd.sample(cat_ids, rnd.randint(0, 4)) for _ in range(n)]
+
+
+def test_decode_is_the_resolved_categories():
+    cat_lists = make_cat_lists()
+    masks = encode_masks(cat_lists)
+    assert masks.shape == (len(cat_lists), NUM_WORDS)
+    for cat_ids, mask in zip(cat_lists, masks):
+        resolved = {resolve_category(cat_id) for cat_id in cat_ids} - {None}
+        assert set(decode_mask(mask)) == resolved
+        assert np.array_equal(encode_mask(cat_ids), mask)
+
+
+def test_in_categories_equals_resolved_string_check():
+    cat_lists = make_cat_lists()
+    masks = encode_masks(cat_lists)
+    for group in [['cs.CL', 'cs.LG'], ['eess.SY'], ['math-ph', 'nlin.SI'], ['no.such'], []]:
+        resolved_group = {resolve_category(cat_id) for cat_id in group}
+        expected = [
+            any(resolve_category(cat_id) in resolved_group for cat_id in cat_ids if resolve_category(cat_id))
+            for cat_ids in cat_lists
+        ]
+        assert in_categories(masks, encode_mask(group)).tolist() == expected
+
+
+def test_aliases_and_subsumed_archives_match_their_category():
+    masks = encode_masks([['cs.SY'], ['cmp-lg'], ['cs.CL'], ['hep-th']])
+    assert in_categories(masks, encode_mask(['eess.SY'])).tolist() == [True, False, False, False]
+    assert in_categories(masks, encode_mask(['cs.CL'])).tolist() == [False, True, True, False]
@@ -0,0 +1,63 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'dynamics_collab'))
+from citation_graph import build_citation_graph, count_discipline_pairs, load_citation_graph
+
+
+PAPERS = {
+    '20': [
+        {'paper_id': '2001.00001', 'discipline': 'Physics', 'bib_entries': {
+            'b0': {'ids': {'arxiv_id': '1901.00001'}, 'discipline': 'Physics'},
+            'b1': {'ids': {'arxiv_id': ''}, 'discipline': 'Mathematics'},
+            'b2': {'ids': {}}
+        }},
+        {'paper_id': '2002.00002', 'discipline': 'Mathematics', 'bib_entries': {}}
+    ],
+    '21': [
+        {'paper_id': '2101.00003', 'discipline': 'Computer Science', 'bib_entries': {
+            'b0': {'ids': {'arxiv_id': '2001.00001'}, 'discipline': 'Physics'},
+            'b1': {'ids': {'arxiv_id': '2002.00002'}, 'discipline': ''}
+        }}
+    ]
+}
+
+
+def write_corpus(root_dir):
+    for year, papers in PAPERS.items():
+        os.makedirs(os.path.join(root_dir, year))
+        with open(os.path.join(root_dir, year, 'arXiv_src_{}01_001.jsonl'.format(year)), 'w') as f:
+            for paper in papers:
+                f.write(json.dumps(paper) + '\n')
+
+
+@pytest.mark.parametrize('mmap', [True, False])
+def test_build_and_load_citation_graph(tmp_path, mmap):
+    root_dir = str(tmp_path / 'corpus')
+    graph_dir = str(tmp_path / 'graph')
+    write_corpus(root_dir)
+    build_citation_graph(root_dir, graph_dir)
+
+    graph = load_citation_graph(graph_dir, mmap=mmap)
+    paper_ids = graph['paper_ids']
+    src = paper_ids.decode(graph['src']).tolist()
+    dst = [None if code == -1 else paper_ids.decode([code])[0] for code in graph['dst']]
+    assert list(zip(src, dst)) == [
+        ('2001.00001', '1901.00001'),
+        ('2001.00001', None),
+        ('2001.00001', None),
+        ('2101.00003', '2001.00001'),
+        ('2101.00003', '2002.00002')
+    ]
+    assert graph['year'].tolist() == [2020, 2020, 2020, 2021, 2021]
+    assert graph['dst_discipline'][2] == -1
+
+    assert count_discipline_pairs(graph) == {
+        ('Physics', 'Physics'): 1,
+        ('Physics', 'Mathematics'): 1,
+        ('Computer Science', 'Physics'): 1
+    }
+    assert count_discipline_pairs(graph, years=[2021]) == {('Computer Science', 'Physics'): 1}
@@ -0,0 +1,70 @@
+import gzip
+import io
+import json
+import os
+import sys
+import tarfile
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'dynamics_collab'))
+from corpus import get_fp_year, get_jsonl_fps, iter_jsonl, iter_lines, iter_papers
+
+
+def make_lines(paper_ids):
+    # no newline after the last paper
+    return '\n'.join(json.dumps({'paper_id': paper_id, 'metadata': {'categories': 'cs.CL'}})
+                     for paper_id in paper_ids).encode('utf-8')
+
+
+def add_member(tar, name, data):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    tar.addfile(info, io.BytesIO(data))
+
+
+def write_corpus(root_dir):
+    # a year folder of plain and compressed JSONLs
+    os.makedirs(os.path.join(root_dir, '20'))
+    with open(os.path.join(root_dir, '20', 'arXiv_src_2001_001.jsonl'), 'wb') as f:
+        f.write(make_lines(['2001.00001', '2001.00002']))
+    with gzip.open(os.path.join(root_dir, '20', 'arXiv_src_2002_001.jsonl.gz'), 'wb') as f:
+        f.write(make_lines(['2002.00003']))
+    # a year archive with a plain and a compressed member
+    with tarfile.open(os.path.join(root_dir, '21.tar.xz'), 'w:xz') as tar:
+        add_member(tar, '21/arXiv_src_2101_001.jsonl', make_lines(['2101.00004', '2101.00005']))
+        add_member(tar, '21/arXiv_src_2102_001.jsonl.gz', gzip.compress(make_lines(['2102.00006'])))
+
+
+def test_iter_papers_reads_folders_and_archives(tmp_path):
+    root_dir = str(tmp_path)
+    write_corpus(root_dir)
+
+    jsonl_fps = get_jsonl_fps(root_dir)
+    assert [os.path.relpath(fp, root_dir) for fp in jsonl_fps] == [
+        os.path.join('20', 'arXiv_src_2001_001.jsonl'),
+        os.path.join('20', 'arXiv_src_2002_001.jsonl.gz'),
+        '21.tar.xz'
+    ]
+    assert [get_fp_year(root_dir, fp) for fp in jsonl_fps] == ['20', '20', '21']
+    assert [ppr['paper_id'] for ppr in iter_jsonl(jsonl_fps[2])] == ['2101.00004', '2101.00005', '2102.00006']
+    assert len(list(iter_papers(root_dir, report=False))) == 6
+    assert [ppr['paper_id'] for ppr in iter_papers(root_dir, years=['2021'], report=False, fields=['paper_id'])] == [
+        '2101.00004', '2101.00005', '2102.00006'
+    ]
+
+
+def test_extracted_archives_are_skipped(tmp_path):
+    root_dir = str(tmp_path)
+    write_corpus(root_dir)
+    os.makedirs(os.path.join(root_dir, '21'))
+    with open(os.path.join(root_dir, '21', 'arXiv_src_2101_001.jsonl'), 'wb') as f:
+        f.write(make_lines(['2101.00004']))
+
+    assert [os.path.relpath(fp, root_dir) for fp in get_jsonl_fps(root_dir, years=['21'])] == [
+        os.path.join('21', 'arXiv_src_2101_001.jsonl')
+    ]
+
+
+def test_iter_lines_across_chunks():
+    chunks = [b'ab', b'c\nd', b'', b'e\n\nf', b'g']
+    assert list(iter_lines(chunks)) == [b'abc', b'de', b'', b'fg']
+    assert list(iter_lines([b'a\n'])) == [b'a']
@@ -0,0 +1,57 @@
+import os
+import random
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'dynamics_collab'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'research_trends'))
+import disciplines
+from arxiv_taxonomy import CATEGORIES, CATEGORY_ALIASES, resolve_category
+from disciplines import DISCIPLINE_GROUPS, build_membership, get_group_column, get_group_papers, get_membership
+
+
+def make_metadata(n=100, seed=0):
+    rnd = random.Random(seed)
+    cat_ids = list(CATEGORIES) + list(CATEGORY_ALIASES) + ['cmp-lg', 'solv-int']
+    return {'{:04d}.{:05d}'.format(1500 + i % 12, i): {'categories': rnd.sample(cat_ids, rnd.randint(1, 3))}
+            for i in range(n)}
+
+
+def naive_group_papers(paper_to_metadata, categories):
+    return [paper for paper, metadata in paper_to_metadata.items()
+            if any(resolve_category(cat_id) in categories for cat_id in metadata['categories'])]
+
+
+def test_membership_equals_category_check():
+    paper_to_metadata = make_metadata()
+    paper_to_metadata['9501.00001'] = {'categories': ['cmp-lg']}
+    membership = build_membership(paper_to_metadata)
+    assert membership['matrix'].shape == (len(paper_to_metadata), len(DISCIPLINE_GROUPS))
+    for name, categories in DISCIPLINE_GROUPS.items():
+        expected = naive_group_papers(paper_to_metadata, categories)
+        assert get_group_papers(membership, name) == expected
+        assert get_group_column(membership, name).sum() == len(expected)
+    assert '9501.00001' in get_group_papers(membership, 'ai')
+
+
+def test_persisted_membership_is_reused_and_rebuilt(tmp_path, monkeypatch):
+    paper_to_metadata = make_metadata()
+    membership = get_membership(paper_to_metadata, cache_path=str(tmp_path))
+    assert (tmp_path / disciplines.MEMBERSHIP_FILENAME).exists()
+
+    def fail(*args, **kwargs):
+        raise AssertionError('membership was rebuilt')
+
+    monkeypatch.setattr(disciplines, 'build_membership', fail)
+    loaded = get_membership(paper_to_metadata, cache_path=str(tmp_path))
+    assert np.array_equal(loaded['matrix'], membership['matrix'])
+    assert loaded['paper_ids'].tolist() == list(paper_to_metadata.keys())
+    monkeypatch.undo()
+
+    # changed categories and an added group are rebuilt
+    changed = make_metadata(seed=1)
+    groups = dict(DISCIPLINE_GROUPS, systems=['eess.SY'])
+    rebuilt = get_membership(changed, groups, cache_path=str(tmp_path))
+    for name, categories in groups.items():
+        assert get_group_papers(rebuilt, name) == naive_group_papers(changed, categories)
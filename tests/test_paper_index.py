@@ -0,0 +1,49 @@
+import gzip
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'dynamics_collab'))
+from paper_index import PaperIndex, build_paper_index
+
+
+def make_paper(paper_id):
+    return {'paper_id': paper_id, 'metadata': {'title': 'Title of {}'.format(paper_id)}, 'body_text': []}
+
+
+def write_corpus(root_dir):
+    os.makedirs(os.path.join(root_dir, '99'))
+    os.makedirs(os.path.join(root_dir, '21'))
+    with open(os.path.join(root_dir, '99', 'arXiv_src_9901_001.jsonl'), 'w') as f:
+        for paper_id in ['hep-th/9901001', 'hep-th/9901002']:
+            f.write(json.dumps(make_paper(paper_id)) + '\n')
+    with open(os.path.join(root_dir, '21', 'arXiv_src_2101_001.jsonl'), 'w') as f:
+        # an empty line and a duplicate paper
+        for paper_id in ['2101.00001', '', '2101.00002', 'hep-th/9901001']:
+            f.write((json.dumps(make_paper(paper_id)) if paper_id else '') + '\n')
+    # compressed files are not indexed
+    with gzip.open(os.path.join(root_dir, '21', 'arXiv_src_2102_001.jsonl.gz'), 'wt') as f:
+        f.write(json.dumps(make_paper('2102.00003')) + '\n')
+
+
+def test_get_and_sample_papers(tmp_path):
+    root_dir = str(tmp_path / 'corpus')
+    index_dir = str(tmp_path / 'index')
+    write_corpus(root_dir)
+    build_paper_index(root_dir, index_dir)
+
+    index = PaperIndex.load(index_dir)
+    assert len(index) == 4
+    for paper_id in ['hep-th/9901001', 'hep-th/9901002', '2101.00001', '2101.00002']:
+        assert index.get_paper(paper_id) == make_paper(paper_id)
+    assert index.get_paper('2101.00002', fields=['paper_id']) == {'paper_id': '2101.00002'}
+    with pytest.raises(KeyError):
+        index.get_paper('2102.00003')
+
+    assert sorted(index.sample_ids(10, years=['99'])) == ['hep-th/9901001', 'hep-th/9901002']
+    assert sorted(ppr['paper_id'] for ppr in index.sample_papers(2, years=[2021], seed=0)) == [
+        '2101.00001', '2101.00002'
+    ]
+    assert index.sample_ids(3, seed=1) == index.sample_ids(3, seed=1)
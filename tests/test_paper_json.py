@@ -0,0 +1,47 @@
+import json
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'dynamics_collab'))
+import paper_json
+from bench_paper_json import make_paper
+from paper_json import loads_projected
+
+
+PROJECTIONS = [
+    ['paper_id'],
+    ['paper_id', 'metadata'],
+    ['paper_id', 'metadata', 'discipline', 'bib_entries'],
+    ['body_text'],
+    ['ref_entries', 'paper_id'],
+    ['missing'],
+    None
+]
+
+
+def make_lines():
+    rnd = random.Random(0)
+    papers = [make_paper(i, rnd) for i in range(5)]
+    # keys of requested fields nested in other fields
+    papers[1]['metadata']['body_text'] = ['nested']
+    papers[2]['ref_entries']['r0']['paper_id'] = 'nested'
+    papers[3]['bib_entries']['b0']['discipline'] = 'nested'
+    return [json.dumps(paper) for paper in papers]
+
+
+@pytest.mark.parametrize('use_orjson', [True, False])
+@pytest.mark.parametrize('fields', PROJECTIONS)
+def test_loads_projected_equals_json_loads(fields, use_orjson, monkeypatch):
+    if not use_orjson:
+        monkeypatch.setattr(paper_json, 'orjson', None)
+    elif paper_json.orjson is None:
+        pytest.skip('orjson is not installed')
+    for line in make_lines():
+        ppr = json.loads(line)
+        if fields is not None:
+            ppr = {k: v for k, v in ppr.items() if k in fields}
+        assert loads_projected(line, fields) == ppr
+        assert loads_projected(line.encode('utf-8'), fields) == ppr
@@ -0,0 +1,90 @@
+import json
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'dynamics_collab'))
+from calc_stats import PaperStatsAccumulator, PaperTableAccumulator, QuantileSketchAccumulator
+from scanner import Accumulator, scan
+
+
+CATEGORIES = ['cs.CL', 'hep-th', 'math.MP cs.LG', 'cs.SY', 'astro-ph.GA stat.ML', '']
+
+
+def make_paper(paper_id, categories, num_cits):
+    text = ' '.join(['Some text {{cite:b0}}.'] * num_cits)
+    return {
+        'paper_id': paper_id,
+        'metadata': {'categories': categories, 'license': None},
+        'bib_entries': {
+            'b0': {'bib_entry_raw': 'A reference', 'ids': {'arxiv_id': '2101.00001'}}
+        },
+        'body_text': [
+            {'section': 'Introduction', 'content_type': 'paragraph', 'text': text,
+             'cite_spans': [], 'ref_spans': []}
+        ],
+        'ref_entries': {}
+    }
+
+
+def write_corpus(root_dir):
+    # several files per year, so that they are split among the workers
+    i = 0
+    for year in ['19', '20', '21']:
+        os.makedirs(os.path.join(root_dir, year))
+        for file_num in range(3):
+            fn = 'arXiv_src_{}{:02}_001.jsonl'.format(year, file_num + 1)
+            with open(os.path.join(root_dir, year, fn), 'w') as f:
+                for _ in range(4 + file_num):
+                    paper_id = '{}{:02}.{:05}'.format(year, file_num + 1, i)
+                    f.write(json.dumps(make_paper(paper_id, CATEGORIES[i % len(CATEGORIES)], i % 7)) + '\n')
+                    i += 1
+
+
+class CountAccumulator(Accumulator):
+    fields = ['paper_id']
+
+    def __init__(self):
+        self.counts = {}
+
+    def update(self, ppr, year):
+        self.counts[year] = self.counts.get(year, 0) + 1
+
+    def finalize(self):
+        return self.counts
+
+
+def test_parallel_scan_equals_serial_scan(tmp_path):
+    root_dir = str(tmp_path / 'corpus')
+    write_corpus(root_dir)
+
+    results = {}
+    for workers in [1, 3]:
+        results[workers] = scan(
+            root_dir,
+            [PaperStatsAccumulator(), PaperTableAccumulator(), QuantileSketchAccumulator()],
+            workers=workers,
+            report=False
+        )
+    (serial_mtrxs, serial_table, serial_sketch), (parallel_mtrxs, parallel_table, parallel_sketch) = (
+        results[1], results[3]
+    )
+
+    assert serial_mtrxs.keys() == parallel_mtrxs.keys()
+    for key, mtrx in serial_mtrxs.items():
+        assert np.array_equal(mtrx, parallel_mtrxs[key]), key
+    assert serial_table.num_rows == 45
+    assert serial_table.sort_by('paper_id').to_pylist() == parallel_table.sort_by('paper_id').to_pylist()
+    assert np.array_equal(serial_sketch.keys, parallel_sketch.keys)
+    assert np.array_equal(serial_sketch.counts, parallel_sketch.counts)
+
+
+def test_parallel_scan_requires_mergeable_accumulators(tmp_path):
+    root_dir = str(tmp_path / 'corpus')
+    write_corpus(root_dir)
+
+    assert scan(root_dir, [CountAccumulator()], report=False) == [{'19': 15, '20': 15, '21': 15}]
+    with pytest.raises(ValueError, match='CountAccumulator'):
+        scan(root_dir, [CountAccumulator()], workers=2, report=False)
@@ -0,0 +1,83 @@
+import json
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'dynamics_collab'))
+import stats_cube
+from stats_cube import load_cube, migrate_legacy_stats, save_cube
+from stats_sparse import to_dense
+
+
+STATS_KEYS = ['num_pprs', 'num_refs']
+INDICES = {'cat_to_idx': {'cs.CL': 0, 'hep-th': 1, 'math.AG': 2}, 'mon_to_idx': {'2020-01': 0, '2020-02': 1}}
+
+
+def make_tensor(density):
+    rng = np.random.default_rng(0)
+    tensor = rng.integers(1, 100, size=(len(STATS_KEYS), 3, 2)).astype(np.float64)
+    tensor[rng.random(tensor.shape) >= density] = 0
+    return tensor
+
+
+def write_v1_cube(fp, stats_tensor, stats_keys, indices):
+    # save_cube of version 1: dense only, the data offset in the header
+    header = {
+        'dtype': stats_tensor.dtype.str,
+        'shape': list(stats_tensor.shape),
+        'stats_keys': list(stats_keys),
+        'indices': indices,
+        'offset': 0
+    }
+    offset = stats_cube.PREAMBLE.size + len(json.dumps(header).encode('utf-8')) + 32
+    offset += -offset % stats_cube.ALIGNMENT
+    header['offset'] = offset
+    header_bytes = json.dumps(header).encode('utf-8')
+    header_bytes += b' ' * (offset - stats_cube.PREAMBLE.size - len(header_bytes))
+    with open(fp, 'wb') as f:
+        f.write(stats_cube.PREAMBLE.pack(stats_cube.MAGIC, 1, len(header_bytes)))
+        f.write(header_bytes)
+        f.write(stats_tensor.tobytes())
+
+
+@pytest.mark.parametrize('layout', ['dense', 'csr', None])
+def test_save_load_round_trip(tmp_path, layout):
+    fp = str(tmp_path / 'stats.cube')
+    tensor = make_tensor(0.3)
+    save_cube(fp, tensor, STATS_KEYS, INDICES, layout=layout)
+
+    stats_layers, stats_keys, indices = load_cube(fp)
+    assert stats_keys == STATS_KEYS
+    assert indices == INDICES
+    for i, layer in enumerate(stats_layers):
+        assert np.array_equal(to_dense(layer), tensor[i])
+
+
+def test_load_version_1_cube(tmp_path):
+    fp = str(tmp_path / 'stats.cube')
+    tensor = make_tensor(1.0)
+    write_v1_cube(fp, tensor, STATS_KEYS, INDICES)
+
+    stats_layers, stats_keys, indices = load_cube(fp)
+    assert stats_keys == STATS_KEYS
+    assert indices == INDICES
+    assert np.array_equal(np.asarray(stats_layers), tensor)
+
+
+def test_migrate_legacy_stats(tmp_path):
+    tensor = make_tensor(0.5)
+    for key, mtrx in zip(STATS_KEYS, tensor):
+        np.save(str(tmp_path / 'stats_{}.npy'.format(key)), mtrx)
+    for name, idx in INDICES.items():
+        with open(str(tmp_path / 'stats_idx{}.json'.format(name)), 'w') as f:
+            json.dump(idx, f)
+
+    migrate_legacy_stats(str(tmp_path), STATS_KEYS)
+    assert sorted(os.listdir(str(tmp_path))) == [stats_cube.CUBE_FN]
+    stats_layers, stats_keys, indices = load_cube(str(tmp_path / stats_cube.CUBE_FN))
+    assert stats_keys == STATS_KEYS
+    assert indices == INDICES
+    for i, layer in enumerate(stats_layers):
+        assert np.array_equal(to_dense(layer), tensor[i])
@@ -0,0 +1,66 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'dynamics_collab'))
+from calc_stats import get_stats_matrix_indices
+from stats_cube import StatsCube
+from stats_sparse import CSRMatrix
+
+
+def make_cube():
+    indices = get_stats_matrix_indices()
+    shape = (len(indices['cat_to_idx']), len(indices['mon_to_idx']))
+    rng = np.random.default_rng(0)
+    num_pprs = rng.integers(0, 5, size=shape).astype(np.float64)
+    num_refs = num_pprs * rng.integers(0, 30, size=shape)
+    num_refs[rng.random(shape) < 0.9] = 0
+    # one dense and one sparse stat
+    return StatsCube({'num_pprs': num_pprs, 'num_refs': CSRMatrix.from_dense(num_refs)}, indices), num_pprs, num_refs
+
+
+def naive_sums(cube, mtrx, rows, cols):
+    row_labels = np.array(cube.row_labels[rows])
+    col_labels = np.array(cube.col_labels[cols])
+    row_keys = list(dict.fromkeys(row_labels))
+    col_keys = list(dict.fromkeys(col_labels))
+    return np.array([
+        [mtrx[np.ix_(row_labels == row_key, col_labels == col_key)].sum() for col_key in col_keys]
+        for row_key in row_keys
+    ])
+
+
+def test_rollups_equal_naive_sums():
+    cube, num_pprs, num_refs = make_cube()
+    for rows, cols in [('group', 'year'), ('archive', 'all'), ('all', 'month'), ('category', 'year')]:
+        for stat, mtrx in [('num_pprs', num_pprs), ('num_refs', num_refs)]:
+            row_keys, col_keys, sums = cube.rollup(stat, rows, cols)
+            assert row_keys == list(dict.fromkeys(cube.row_labels[rows]))
+            assert col_keys == list(dict.fromkeys(cube.col_labels[cols]))
+            assert np.allclose(sums, naive_sums(cube, mtrx, rows, cols))
+            # cached
+            assert cube.rollup(stat, rows, cols)[2] is sums
+
+
+def test_rollup_many_equals_rollup():
+    cube, _, _ = make_cube()
+    many = cube.rollup_many(['num_pprs', 'num_refs'], 'archive', 'year')
+    other_cube, _, _ = make_cube()
+    for stat, (row_keys, col_keys, sums) in zip(['num_pprs', 'num_refs'], many):
+        other_row_keys, other_col_keys, other_sums = other_cube.rollup(stat, 'archive', 'year')
+        assert (row_keys, col_keys) == (other_row_keys, other_col_keys)
+        assert np.allclose(sums, other_sums)
+
+
+def test_sum_of_a_selection():
+    cube, num_pprs, num_refs = make_cube()
+    in_cs = np.array(cube.row_labels['archive']) == 'cs'
+    months = np.array(cube.col_labels['month'])
+    in_months = (months >= '2015-01') & (months <= '2019-06')
+    for stat, mtrx in [('num_pprs', num_pprs), ('num_refs', num_refs)]:
+        assert np.isclose(cube.sum(stat, archive='cs', start='2015', end='2019-06'),
+                          mtrx[np.ix_(in_cs, in_months)].sum())
+        assert np.isclose(cube.sum(stat), mtrx.sum())
+        assert np.isclose(cube.sum(stat, category='hep-th', start='2020-03', end='2020-03'),
+                          mtrx[cube.indices['cat_to_idx']['hep-th'], cube.indices['mon_to_idx']['2020-03']])
@@ -0,0 +1,37 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'dynamics_collab'))
+from stats_query import prefix_sums, range_sums
+
+
+def random_ranges(rng, length, num_ranges):
+    return np.sort(rng.integers(0, length, size=(num_ranges, 2)), axis=1)
+
+
+def test_range_sums_equal_slice_sums():
+    rng = np.random.default_rng(0)
+    mtrx = rng.integers(0, 5, size=(17, 23)).astype(np.float64)
+    row_ranges = random_ranges(rng, mtrx.shape[0], 6)
+    col_ranges = random_ranges(rng, mtrx.shape[1], 4)
+
+    sums = range_sums(prefix_sums(mtrx), row_ranges, col_ranges)
+    expected = np.array([
+        [mtrx[r0:r1 + 1, c0:c1 + 1].sum() for c0, c1 in col_ranges]
+        for r0, r1 in row_ranges
+    ])
+    assert np.array_equal(sums, expected)
+
+
+def test_range_sums_of_a_stack_of_matrices():
+    rng = np.random.default_rng(1)
+    tensor = rng.integers(0, 5, size=(3, 8, 9))
+    row_ranges = random_ranges(rng, 8, 3)
+    col_ranges = random_ranges(rng, 9, 2)
+
+    sums = range_sums(prefix_sums(tensor), row_ranges, col_ranges)
+    assert sums.shape == (3, 3, 2)
+    for i, mtrx in enumerate(tensor):
+        assert np.array_equal(sums[i], range_sums(prefix_sums(mtrx), row_ranges, col_ranges))
@@ -0,0 +1,70 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'dynamics_collab'))
+from stats_sketch import ALPHA, QuantileSketch, get_quantiles
+
+
+QS = [0.1, 0.5, 0.9, 0.99]
+
+
+def true_quantiles(values, qs):
+    # the value at rank q * (n - 1), as estimated by get_quantiles
+    values = np.sort(values)
+    return values[np.floor(np.asarray(qs) * (len(values) - 1)).astype(int)]
+
+
+def within_relative_error(estimates, expected):
+    # bucket bounds are hit exactly, allow for the rounding of the estimates
+    return np.all(np.abs(estimates - expected) <= ALPHA * expected * (1 + 1e-9))
+
+
+def sketch_quantiles(sketch, stats_key, cell_groups, num_groups, qs):
+    hists = sketch.get_histograms(stats_key, cell_groups, num_groups)
+    return get_quantiles(np.cumsum(hists, axis=1), qs)
+
+
+def test_quantiles_within_relative_error():
+    rng = np.random.default_rng(0)
+    values = np.concatenate([
+        np.zeros(50), rng.integers(1, 10, 500), rng.lognormal(4, 2, 2000).astype(np.int64)
+    ])
+    cells = rng.integers(0, 6, len(values))
+    sketch = QuantileSketch(['num_refs'], 6)
+    sketch.add(np.zeros(len(values)), cells, values)
+
+    # all cells together, and each cell on its own
+    estimates = sketch_quantiles(sketch, 'num_refs', np.zeros(6, dtype=int), 1, QS)[0]
+    assert within_relative_error(estimates, true_quantiles(values, QS))
+    estimates = sketch_quantiles(sketch, 'num_refs', np.arange(6), 6, QS)
+    for cell in range(6):
+        assert within_relative_error(estimates[cell], true_quantiles(values[cells == cell], QS))
+
+
+def test_merged_sketches_equal_a_single_sketch():
+    rng = np.random.default_rng(1)
+    stat_idxs = rng.integers(0, 2, 1000)
+    cell_idxs = rng.integers(0, 4, 1000)
+    values = rng.integers(0, 1000, 1000)
+    single = QuantileSketch(['num_refs', 'num_paras'], 4)
+    single.add(stat_idxs, cell_idxs, values)
+    merged = QuantileSketch(['num_refs', 'num_paras'], 4)
+    for part in np.array_split(np.arange(1000), 3):
+        part_sketch = QuantileSketch(['num_refs', 'num_paras'], 4)
+        part_sketch.add(stat_idxs[part], cell_idxs[part], values[part])
+        merged.merge(part_sketch)
+
+    single.compact()
+    merged.compact()
+    assert np.array_equal(merged.keys, single.keys)
+    assert np.array_equal(merged.counts, single.counts)
+
+
+def test_empty_histograms_have_no_quantiles():
+    sketch = QuantileSketch(['num_refs'], 2)
+    sketch.add([0, 0], [0, 0], [3, 5])
+    quantiles = sketch_quantiles(sketch, 'num_refs', np.arange(2), 2, [0.5])
+    assert not np.isnan(quantiles[0, 0])
+    assert np.isnan(quantiles[1, 0])
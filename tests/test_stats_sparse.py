@@ -0,0 +1,49 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'dynamics_collab'))
+from stats_query import aggregate, prefix_sums, range_sums
+from stats_sparse import CSRMatrix, sparse_range_sums
+
+
+def make_sparse_matrix(rng, shape, density):
+    mtrx = rng.integers(1, 10, size=shape).astype(np.float64)
+    mtrx[rng.random(shape) >= density] = 0
+    return mtrx
+
+
+def test_csr_matrix_round_trip():
+    rng = np.random.default_rng(0)
+    mtrx = make_sparse_matrix(rng, (12, 30), 0.1)
+    # including empty rows at both ends
+    mtrx[0] = 0
+    mtrx[-1] = 0
+
+    csr = CSRMatrix.from_dense(mtrx)
+    assert csr.nnz == np.count_nonzero(mtrx)
+    assert np.array_equal(csr.toarray(), mtrx)
+    assert np.array_equal(csr.row_slice(3, 8).toarray(), mtrx[3:8])
+    assert csr.sum() == mtrx.sum()
+
+
+def test_sparse_range_sums_equal_dense_range_sums():
+    rng = np.random.default_rng(1)
+    for _ in range(20):
+        mtrx = make_sparse_matrix(rng, (25, 40), 0.05)
+        csr = CSRMatrix.from_dense(mtrx)
+        # overlapping, nested and single index ranges
+        row_ranges = np.sort(rng.integers(0, 25, size=(7, 2)), axis=1)
+        col_ranges = np.sort(rng.integers(0, 40, size=(5, 2)), axis=1)
+        row_ranges[0] = [0, 24]
+
+        expected = range_sums(prefix_sums(mtrx), row_ranges, col_ranges)
+        assert np.allclose(sparse_range_sums(csr, row_ranges, col_ranges), expected)
+        assert np.allclose(aggregate(csr, row_ranges, col_ranges), expected)
+
+
+def test_sparse_range_sums_of_an_empty_matrix():
+    csr = CSRMatrix.from_dense(np.zeros((4, 5)))
+    sums = sparse_range_sums(csr, [[0, 3], [1, 1]], [[0, 4]])
+    assert np.array_equal(sums, np.zeros((2, 1)))
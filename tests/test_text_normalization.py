@@ -0,0 +1,28 @@
+import os
+import random
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'research_trends'))
+from bench_text_normalization import make_paper, get_section_texts, reference_normalize_text
+from text_normalization import MAX_NESTED_PASSES, normalize_text, normalize_texts
+
+
+def test_normalize_text_equals_reference_on_papers():
+    rnd = random.Random(0)
+    texts = [text for _ in range(5) for text in get_section_texts(make_paper(rnd, 20))]
+    assert normalize_texts(texts) == [reference_normalize_text(text) for text in texts]
+
+
+def test_normalize_text_equals_reference_on_random_texts():
+    # unbalanced and deeply nested braces, newlines, punctuation and upper case letters
+    rnd = random.Random(1)
+    for _ in range(2000):
+        text = ''.join(rnd.choice('aB c{}\n.,') for _ in range(rnd.randint(0, 40)))
+        assert normalize_text(text) == reference_normalize_text(text), repr(text)
+
+
+def test_normalize_text_of_nested_and_unbalanced_brackets():
+    deeply_nested = 'a ' + '{' * (MAX_NESTED_PASSES + 2) + 'x' + '}' * (MAX_NESTED_PASSES + 2) + ' b'
+    assert normalize_text(deeply_nested) == ['a', 'b']
+    assert normalize_text('Word}} kept {dropped} Kept') == reference_normalize_text('Word}} kept {dropped} Kept')
+    assert normalize_text('Word {never closed') == ['word']